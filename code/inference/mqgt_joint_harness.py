@@ -12,6 +12,7 @@ Usage:
   python mqgt_joint_harness.py run --qrng_N1 5000123 --qrng_N0 4999877 --out results_joint/
   python mqgt_joint_harness.py run --qrng_bits bits.csv --qrng_col bit --out results_joint/
   python mqgt_joint_harness.py run --config joint_config.json --out results_joint/
+  python mqgt_joint_harness.py update --run results_joint/ --qrng_N1 5000456 --qrng_N0 4999544 --out results_joint_v2/
 
 Notes:
 - Higgs mapping uses EFT portal-width formula (as in v5), feeding CMS q(B).
@@ -25,6 +26,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 
 from constraints import alpha_limit  # Higgs uses analytic q(B) in v11
+from mqgt_posterior_cache import PosteriorCache
 
 HBARC_EVM = 1.973269804e-7  # eV*m
 MH_GEV = 125.25
@@ -111,7 +113,108 @@ def log_loguniform(x, low, high):
         return -math.inf
     return -math.log(x) - math.log(math.log(high/low))
 
-def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path):
+# ---- Analytic gradients (for gradient-based samplers, e.g. simulations/mqgt_hmc.py) ----
+
+def grad_loglik_qrng(eta: float, N1: int, N0: int, E1: float, E0: float, base_logodds: float=0.0) -> float:
+    dE = (E1-E0)
+    p1 = 1/(1+math.exp(-(base_logodds + eta*dE)))
+    return dE*(N1 - (N1+N0)*p1)
+
+def grad_loglik_higgs(g_phi: float, m_c: float):
+    """(d/dg_phi, d/dm_c) of loglik_higgs; zero where B is clipped or closed."""
+    B = br_inv_from_portal(g_phi, m_c)
+    if B <= 0.0 or B >= 0.6:
+        return 0.0, 0.0
+    mS = m_c * 1e-9
+    phase = math.sqrt(1.0 - 4.0*(mS**2)/(MH_GEV**2))
+    c = V_GEV**2/(8.0*math.pi*MH_GEV)
+    Gamma = g_phi**2 * c * phase
+    sigma = SIGMA_PLUS if B >= B_HAT else SIGMA_MINUS
+    dll_dGamma = -(B - B_HAT)/sigma**2 * GAMMA_SM_GEV/(GAMMA_SM_GEV + Gamma)**2
+    dGamma_dm = -g_phi**2 * c * 4.0*mS/(MH_GEV**2 * phase) * 1e-9
+    return dll_dGamma * 2.0*g_phi*c*phase, dll_dGamma * dGamma_dm
+
+def grad_loglik_fifth(alpha: float, m_c: float, delta95_decades: float=0.3):
+    """(d/dalpha, d/dm_c) of loglik_fifth, using the local log-log slope of the envelope."""
+    lam_raw = HBARC_EVM/max(m_c,1e-30)
+    lam = float(np.clip(lam_raw, 2e-5, 1e-3))
+    amax = float(alpha_limit(np.array([lam]))[0])
+    if alpha <= amax:
+        return 0.0, 0.0
+    q95 = 2.71
+    d = (math.log10(alpha/amax))/delta95_decades
+    dll_dd = -q95*d
+    slope = 0.0
+    if lam == lam_raw:
+        h = 1e-6
+        a = np.log10(alpha_limit(np.array([lam*10**h, lam*10**-h])))
+        slope = float(a[0]-a[1])/(2*h)
+    dlog10lam_dm = -1.0/(m_c*math.log(10))
+    return (dll_dd/(alpha*math.log(10)*delta95_decades),
+            dll_dd*(-slope*dlog10lam_dm/delta95_decades))
+
+def grad_loglik_cosmo(w0: float, wa: float, mu: np.ndarray, Sinv: np.ndarray) -> np.ndarray:
+    return -Sinv @ (np.array([w0, wa]) - mu)
+
+def grad_log_normal(x, mu, sigma):
+    return -(x-mu)/sigma**2
+
+def grad_log_uniform(x, low, high):
+    return 0.0
+
+def grad_log_loguniform(x, low, high):
+    return -1.0/x
+
+JOINT_PARAMS = ("eta", "g_phi", "m_c", "alpha_ff", "w0", "wa")
+
+def joint_log_post_grad(cfg: dict, N1: int, N0: int):
+    """log posterior of mcmc_joint and its gradient over a vector ordered as JOINT_PARAMS."""
+    mu_cos, Sigma, Sinv, cos_json = load_cosmo_cov(Path(cfg["digitized_dir"]))
+    pri = cfg["priors"]
+    q = cfg["qrng"]
+    delta = cfg["fifth_force"]["delta95_decades"]
+
+    def log_post_grad(x):
+        eta, g_phi, m_c, alpha_ff, w0, wa = (float(v) for v in x)
+        lp = (log_normal(eta, pri["eta"]["mu"], pri["eta"]["sigma"])
+              + log_uniform(g_phi, pri["g_phi"]["low"], pri["g_phi"]["high"])
+              + log_loguniform(m_c, pri["m_c"]["low"], pri["m_c"]["high"])
+              + log_loguniform(alpha_ff, pri["alpha_ff"]["low"], pri["alpha_ff"]["high"])
+              + log_normal(w0, pri["w0"]["mu"], pri["w0"]["sigma"])
+              + log_normal(wa, pri["wa"]["mu"], pri["wa"]["sigma"]))
+        grad = np.zeros(6)
+        if not np.isfinite(lp):
+            return -math.inf, grad
+        lp += (loglik_qrng(eta, N1, N0, q["E1"], q["E0"], q.get("base_logodds",0.0))
+               + loglik_higgs(g_phi, m_c)
+               + loglik_fifth(alpha_ff, m_c, delta)
+               + loglik_cosmo(w0, wa, mu_cos, Sinv))
+        dh = grad_loglik_higgs(g_phi, m_c)
+        df = grad_loglik_fifth(alpha_ff, m_c, delta)
+        grad[0] = (grad_log_normal(eta, pri["eta"]["mu"], pri["eta"]["sigma"])
+                   + grad_loglik_qrng(eta, N1, N0, q["E1"], q["E0"], q.get("base_logodds",0.0)))
+        grad[1] = dh[0]
+        grad[2] = grad_log_loguniform(m_c, pri["m_c"]["low"], pri["m_c"]["high"]) + dh[1] + df[1]
+        grad[3] = grad_log_loguniform(alpha_ff, pri["alpha_ff"]["low"], pri["alpha_ff"]["high"]) + df[0]
+        grad[4:] = grad_loglik_cosmo(w0, wa, mu_cos, Sinv)
+        grad[4] += grad_log_normal(w0, pri["w0"]["mu"], pri["w0"]["sigma"])
+        grad[5] += grad_log_normal(wa, pri["wa"]["mu"], pri["wa"]["sigma"])
+        return lp, grad
+
+    return log_post_grad
+
+def joint_cache_key(cache, cfg: dict, N1: int, N0: int, cos_json: dict) -> str:
+    """PosteriorCache key of an mcmc_joint run: data, priors, config (minus n_steps) and code."""
+    config = {k: v for k, v in cfg.items() if k not in ("priors", "digitized_dir")}
+    config["mcmc"] = {k: v for k, v in cfg["mcmc"].items() if k != "n_steps"}
+    constraints = Path(alpha_limit.__code__.co_filename)
+    code = [Path(__file__), constraints]
+    code += [constraints.parent/n for n in ("fifth_force_alpha_lambda_envelope.csv",
+                                            "cms_hinv_profilelik_digitized_unique.csv")
+             if (constraints.parent/n).exists()]
+    return cache.key({"N1": N1, "N0": N0, "cosmo": cos_json}, cfg["priors"], config, code)
+
+def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path, cache=None):
     rng = np.random.default_rng(cfg.get("seed", 123))
     mu_cos, Sigma, Sinv, cos_json = load_cosmo_cov(Path(cfg["digitized_dir"]))
 
@@ -153,8 +256,36 @@ def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path):
     samples=[]
     acc=0
     n_steps=cfg["mcmc"]["n_steps"]; burn=cfg["mcmc"]["burn"]; thin=cfg["mcmc"]["thin"]
-
-    for i in range(n_steps):
+    n_acc=[]  # accepted moves up to each stored sample (for cached prefixes)
+    start=0
+
+    key = entry = None
+    if cache is not None:
+        key = joint_cache_key(cache, cfg, N1, N0, cos_json)
+        entry = cache.load(key)
+    if entry is not None:
+        cmeta, rows = entry["meta"], entry["arrays"]["samples"]
+        cols = cmeta["columns"]
+        if cmeta["n_steps"] >= n_steps:
+            # shorter (or equal) run: its stored samples are a prefix of the cached chain
+            keep = len(range(burn, n_steps, thin))
+            samples = [dict(zip(cols, map(float, r))) for r in rows[:keep]]
+            n_acc = list(entry["arrays"]["n_accepted"][:keep])
+            start = n_steps
+            if cmeta["n_steps"] == n_steps:
+                acc = cmeta["state"]["acc"]
+            elif keep:
+                # acceptance up to the last stored sample, scaled to n_steps
+                acc = n_acc[-1]*n_steps/(burn + (keep-1)*thin + 1)
+        else:
+            # longer run: resume the cached chain exactly where it stopped
+            samples = [dict(zip(cols, map(float, r))) for r in rows]
+            n_acc = list(entry["arrays"]["n_accepted"])
+            th, cur, acc = cmeta["state"]["th"], cmeta["state"]["cur"], cmeta["state"]["acc"]
+            rng.bit_generator.state = cmeta["state"]["rng"]
+            start = cmeta["n_steps"]
+
+    for i in range(start, n_steps):
         cand = dict(th)
         cand["eta"] = th["eta"] + rng.normal(0, prop["eta"])
         cand["g_phi"] = max(0.0, th["g_phi"] + rng.normal(0, prop["g_phi"]))
@@ -169,6 +300,19 @@ def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path):
         if i>=burn and ((i-burn)%thin==0):
             br = br_inv_from_portal(th["g_phi"], th["m_c"])
             samples.append({**th, "BRinv": br, "logpost": cur})
+            n_acc.append(acc)
+
+    if cache is not None and start < n_steps:
+        cols = list(samples[0]) if samples else []
+        cache.store(key, {
+            "samples": np.array([[r[c] for c in cols] for r in samples], dtype=float).reshape(-1, len(cols)),
+            "n_accepted": np.array(n_acc, dtype=np.int64),
+        }, {
+            "columns": cols,
+            "n_steps": n_steps,
+            "accept_rate": acc/n_steps,
+            "state": {"th": th, "cur": cur, "acc": acc, "rng": rng.bit_generator.state},
+        })
 
     df = pd.DataFrame(samples)
     outdir.mkdir(parents=True, exist_ok=True)
@@ -182,6 +326,8 @@ def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path):
         summ[c]={"median": float(np.median(arr)), "ci95":[q(arr,0.025), q(arr,0.975)], "mean": float(np.mean(arr))}
     meta = {
         "accept_rate": acc/n_steps,
+        "cache_key": key,
+        "cache_hit": entry is not None,
         "n_samples": len(df),
         "N1": N1, "N0": N0,
         "config": cfg,
@@ -189,24 +335,122 @@ def mcmc_joint(cfg: dict, N1: int, N0: int, outdir: Path):
         "posterior_summary": summ
     }
     (outdir/"joint_summary.json").write_text(json.dumps(meta, indent=2))
+    plot_marginals(df, outdir)
+    return meta
 
-    # plots
+def plot_marginals(df: pd.DataFrame, outdir: Path, weights=None):
+    label = "count" if weights is None else "weight"
     for c in ["eta","g_phi","m_c","alpha_ff","w0","wa","BRinv"]:
         plt.figure()
-        plt.hist(df[c].values, bins=80)
-        plt.xlabel(c); plt.ylabel("count")
+        plt.hist(df[c].values, bins=80, weights=weights)
+        plt.xlabel(c); plt.ylabel(label)
         plt.title(f"Joint posterior marginal: {c}")
         plt.savefig(outdir/f"posterior_{c}.png", dpi=200, bbox_inches="tight")
         plt.close()
 
     plt.figure()
-    plt.hist2d(df["w0"], df["wa"], bins=80)
+    plt.hist2d(df["w0"], df["wa"], bins=80, weights=weights)
     plt.xlabel("w0"); plt.ylabel("wa")
     plt.title("Joint posterior density: (w0, wa)")
-    plt.colorbar(label="count")
+    plt.colorbar(label=label)
     plt.savefig(outdir/"posterior_w0_wa.png", dpi=200, bbox_inches="tight")
     plt.close()
 
+# ---- Importance reweighting of stored runs (new QRNG counts / alternative priors) ----
+# A stored joint_samples.csv targets the posterior of its run (N1, N0, priors).
+# For new counts or priors each draw gets weight p_new/p_old; only the QRNG term
+# and the priors change, so the weights are a few array operations. The Kish
+# ESS = 1/sum(w^2) says how many independent-equivalent draws survive.
+
+PRIOR_FORMS = {"eta": "normal", "g_phi": "uniform", "m_c": "loguniform",
+               "alpha_ff": "loguniform", "w0": "normal", "wa": "normal"}
+
+def loglik_qrng_batch(eta, N1: int, N0: int, E1: float, E0: float, base_logodds: float=0.0):
+    logit = base_logodds + np.asarray(eta, dtype=float)*(E1-E0)
+    return -N1*np.logaddexp(0.0, -logit) - N0*np.logaddexp(0.0, logit)
+
+def log_prior_batch(df: pd.DataFrame, pri: dict) -> np.ndarray:
+    lp = np.zeros(len(df))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for c, form in PRIOR_FORMS.items():
+            x = df[c].to_numpy(float); p = pri[c]
+            if form == "normal":
+                lp += -0.5*((x-p["mu"])/p["sigma"])**2 - math.log(p["sigma"]*math.sqrt(2*math.pi))
+            elif form == "uniform":
+                lp += np.where((x >= p["low"]) & (x <= p["high"]), 0.0, -np.inf)
+            else:
+                inside = (x > 0) & (x >= p["low"]) & (x <= p["high"])
+                lp += np.where(inside, -np.log(x) - math.log(math.log(p["high"]/p["low"])), -np.inf)
+    return lp
+
+def reweight_joint(df: pd.DataFrame, cfg: dict, N1: int, N0: int,
+                   new_N1: int=None, new_N0: int=None, new_priors: dict=None) -> dict:
+    """Importance weights taking draws of the (cfg, N1, N0) posterior to new counts / priors."""
+    q = cfg["qrng"]
+    log_w = np.zeros(len(df))
+    if "weight" in df:  # already reweighted run: weights relative to its own draws
+        with np.errstate(divide="ignore"):
+            log_w += np.log(df["weight"].to_numpy(float))
+    if new_N1 is not None and new_N0 is not None:
+        eta = df["eta"].to_numpy(float)
+        args = (q["E1"], q["E0"], q.get("base_logodds", 0.0))
+        log_w += loglik_qrng_batch(eta, new_N1, new_N0, *args) - loglik_qrng_batch(eta, N1, N0, *args)
+    if new_priors:
+        pri = {**cfg["priors"], **new_priors}
+        log_w += log_prior_batch(df, pri) - log_prior_batch(df, cfg["priors"])
+    log_w = np.where(np.isnan(log_w), -np.inf, log_w)
+    if np.isfinite(log_w).any():
+        w = np.exp(log_w - np.max(log_w)); w /= w.sum()
+        ess = float(1.0/np.sum(w**2))
+    else:
+        w, ess = np.zeros(len(df)), 0.0
+    return {"weights": w, "log_weights": log_w, "ess": ess, "ess_fraction": ess/len(df)}
+
+def weighted_quantile(x, w, p):
+    order = np.argsort(x)
+    cw = np.cumsum(w[order]) - 0.5*w[order]
+    return float(np.interp(p, cw/cw[-1], x[order]))
+
+def update_joint(run_dir: Path, outdir: Path, N1: int=None, N0: int=None, new_priors: dict=None,
+                 min_ess_fraction: float=0.1, cache=None) -> dict:
+    """
+    Update a stored mcmc_joint run to new QRNG counts and/or priors.
+
+    Reweights the run's joint_samples.csv; only when the ESS fraction drops
+    below min_ess_fraction is mcmc_joint rerun with the new inputs. The
+    output bundle has the layout of mcmc_joint (samples CSV with a `weight`
+    column, summary JSON with a `reweighting` block, plots).
+    """
+    run_dir, outdir = Path(run_dir), Path(outdir)
+    prev = json.loads((run_dir/"joint_summary.json").read_text())
+    cfg = prev["config"]
+    N1 = prev["N1"] if N1 is None else N1
+    N0 = prev["N0"] if N0 is None else N0
+    new_cfg = {**cfg, "priors": {**cfg["priors"], **(new_priors or {})}}
+    df = pd.read_csv(run_dir/"joint_samples.csv")
+    rw = reweight_joint(df, cfg, prev["N1"], prev["N0"], N1, N0, new_priors)
+    info = {"source": str(run_dir), "ess": rw["ess"], "ess_fraction": rw["ess_fraction"],
+            "min_ess_fraction": min_ess_fraction, "rerun": rw["ess_fraction"] < min_ess_fraction}
+
+    if info["rerun"]:
+        meta = mcmc_joint(new_cfg, N1, N0, outdir, cache=cache)
+    else:
+        w = rw["weights"]
+        # logpost stays that of the source run; weight carries the update
+        df = df.drop(columns="weight", errors="ignore").assign(weight=w)
+        outdir.mkdir(parents=True, exist_ok=True)
+        df.to_csv(outdir/"joint_samples.csv", index=False)
+        summ = {}
+        for c in ["eta","g_phi","m_c","alpha_ff","w0","wa","BRinv"]:
+            arr = df[c].to_numpy(float)
+            summ[c] = {"median": weighted_quantile(arr, w, 0.5),
+                       "ci95": [weighted_quantile(arr, w, 0.025), weighted_quantile(arr, w, 0.975)],
+                       "mean": float(np.sum(w*arr))}
+        meta = {**prev, "n_samples": len(df), "N1": N1, "N0": N0, "config": new_cfg,
+                "posterior_summary": summ}
+        plot_marginals(df, outdir, weights=w)
+    meta["reweighting"] = info
+    (outdir/"joint_summary.json").write_text(json.dumps(meta, indent=2))
     return meta
 
 def default_config(digitized_dir: str) -> dict:
@@ -237,8 +481,29 @@ def main():
     run.add_argument("--qrng_N0", type=int, default=None)
     run.add_argument("--qrng_bits", type=str, default=None)
     run.add_argument("--qrng_col", type=str, default="bit")
+    run.add_argument("--cache", type=str, default=None, help="posterior cache directory (reuse / extend identical runs)")
+    upd = sub.add_parser("update", help="reweight a stored run to new QRNG counts / priors")
+    upd.add_argument("--run", required=True, help="directory of a previous run")
+    upd.add_argument("--out", required=True)
+    upd.add_argument("--qrng_N1", type=int, default=None)
+    upd.add_argument("--qrng_N0", type=int, default=None)
+    upd.add_argument("--qrng_bits", type=str, default=None)
+    upd.add_argument("--qrng_col", type=str, default="bit")
+    upd.add_argument("--priors", type=str, default=None, help="JSON file of prior overrides")
+    upd.add_argument("--min_ess", type=float, default=0.1, help="ESS fraction below which the run is redone")
+    upd.add_argument("--cache", type=str, default=None)
     args = ap.parse_args()
 
+    if args.cmd == "update":
+        N1, N0 = ingest_bits(Path(args.qrng_bits), args.qrng_col) if args.qrng_bits else (args.qrng_N1, args.qrng_N0)
+        priors = json.loads(Path(args.priors).read_text()) if args.priors else None
+        cache = PosteriorCache(args.cache) if args.cache else None
+        meta = update_joint(Path(args.run), Path(args.out), N1, N0, priors, args.min_ess, cache)
+        rw = meta["reweighting"]
+        print("Wrote joint bundle to", args.out)
+        print(f"Reweighting ESS: {rw['ess']:.0f} ({rw['ess_fraction']:.1%})", "-> rerun" if rw["rerun"] else "")
+        return
+
     outdir = Path(args.out)
     digitized_dir = str((Path(__file__).resolve().parent/"digitized").resolve())
 
@@ -255,7 +520,8 @@ def main():
         N1, N0 = args.qrng_N1, args.qrng_N0
 
     (outdir/"used_config.json").write_text(json.dumps(cfg, indent=2))
-    meta = mcmc_joint(cfg, N1, N0, outdir)
+    cache = PosteriorCache(args.cache) if args.cache else None
+    meta = mcmc_joint(cfg, N1, N0, outdir, cache=cache)
     print("Wrote joint bundle to", outdir)
     print("Acceptance rate:", meta["accept_rate"])
 
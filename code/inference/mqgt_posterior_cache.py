@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""MQGT Posterior Cache: content-addressed storage of sampler chains and summaries
+
+A cache key is the sha256 of a canonical JSON document holding
+  - the channel data (counts, digitized curves, ...),
+  - the priors,
+  - the sampler configuration (everything that changes the chain except
+    the requested length),
+  - the sha256 of every analysis-code / data file the run depends on
+    (hashed like mqgt_manifest_sign.sha256_file),
+so any change to data, priors, settings or code gives a new entry.
+
+Each entry is <dir>/<key[:2]>/<key>.npz (chains as raw float/int arrays,
+no pickles) plus <key>.json (summary and resume state). Samplers store
+the chain length with the entry; a later request for a shorter chain is
+served from the prefix, a longer one resumes from the stored state and
+only samples the missing part (see mqgt_joint_harness.mcmc_joint and
+MQGT_SCF_Inference.mcmc_sample).
+"""
+
+import json, os
+from pathlib import Path
+
+import numpy as np
+
+from mqgt_manifest_sign import sha256_bytes, sha256_file
+
+
+def _plain(obj):
+    # JSON-safe, order-independent view of configs holding numpy values
+    if isinstance(obj, dict):
+        return {str(k): _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _plain(obj.tolist())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Path):
+        return str(obj)
+    return obj
+
+def canonical_hash(obj) -> str:
+    blob = json.dumps(_plain(obj), sort_keys=True, separators=(",",":")).encode("utf-8")
+    return sha256_bytes(blob)
+
+
+class PosteriorCache:
+    """Directory of content-addressed posterior runs."""
+
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, data, priors, config, code_paths=()) -> str:
+        code = {Path(p).name: sha256_file(Path(p)) for p in code_paths}
+        return canonical_hash({"data": data, "priors": priors, "config": config, "code": code})
+
+    def _paths(self, key: str):
+        sub = self.dir/key[:2]
+        return sub/f"{key}.npz", sub/f"{key}.json"
+
+    def load(self, key: str):
+        """{'arrays': {...}, 'meta': {...}} or None when the key is not cached."""
+        npz, meta = self._paths(key)
+        if not (npz.exists() and meta.exists()):
+            return None
+        with np.load(npz, allow_pickle=False) as f:
+            arrays = {name: f[name] for name in f.files}
+        return {"arrays": arrays, "meta": json.loads(meta.read_text())}
+
+    def store(self, key: str, arrays: dict, meta: dict):
+        npz, meta_path = self._paths(key)
+        npz.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so a crashed run never leaves a half entry
+        tmp = npz.with_suffix(".tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, npz)
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_plain(meta), indent=2))
+        os.replace(tmp, meta_path)
+
+    def __contains__(self, key: str) -> bool:
+        return all(p.exists() for p in self._paths(key))
@@ -0,0 +1,254 @@
+"""
+ABC-SMC calibration of lattice-simulator parameters.
+
+Approximate Bayesian Computation with sequential Monte Carlo (population
+Monte Carlo in the style of Beaumont et al. 2009): each generation perturbs
+the previous weighted particles with a Gaussian kernel whose covariance is
+twice the weighted population covariance, simulates all proposals as one
+batch, keeps those within the current tolerance and reweights them by
+prior / kernel-mixture density. Tolerances shrink adaptively as a quantile
+of the previous generation's distances.
+
+Parameters are handled in a transformed space (log for 'log_uniform'
+priors) so kernels behave on parameters spanning decades, e.g. the leak.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from mqgt_ensemble import run_ensemble
+
+SUMMARY_KEYS = ("Aglob", "Anear", "Afar", "gap")
+
+
+def lattice_summary(res: Dict) -> np.ndarray:
+    """Summary statistics of a `run_once` result: A-rates and basin gap."""
+    gap = res["A_phiE"] - res["B_phiE"]
+    return np.array([res["Aglob"], res["Anear"], res["Afar"], gap])
+
+
+def lattice_simulator(summary: Callable[[Dict], np.ndarray] = lattice_summary,
+                      processes: Optional[int] = None,
+                      pool: Optional[Executor] = None,
+                      **run_kwargs) -> Callable:
+    """
+    Build `simulate(thetas, seeds) -> (n, n_stats)` backed by `run_ensemble`.
+
+    Each theta is a dict of `run_once` keyword arguments (collapse_bias,
+    eta_tel, leak, ...); one call runs the whole population as one batch.
+    Pass a `pool` that lives for the whole `abc_smc` run so the workers
+    start (and JIT the lattice kernels) once rather than every batch.
+    """
+    def simulate(thetas, seeds):
+        configs = [dict(run_kwargs, seed=int(s), **th)
+                   for th, s in zip(thetas, seeds)]
+        results = run_ensemble(configs, processes=processes, pool=pool)
+        return np.array([summary(r) for r in results], dtype=float)
+    return simulate
+
+
+# ----------------------------
+# Priors in transformed space
+# ----------------------------
+def _to_internal(prior: Dict, x):
+    return np.log(x) if prior["type"] == "log_uniform" else x
+
+
+def _to_natural(prior: Dict, u):
+    return np.exp(u) if prior["type"] == "log_uniform" else u
+
+
+def _sample_prior(priors: Dict, names: Sequence[str], n: int, rng) -> np.ndarray:
+    out = np.empty((n, len(names)))
+    for k, name in enumerate(names):
+        p = priors[name]
+        if p["type"] == "uniform":
+            out[:, k] = rng.uniform(p["low"], p["high"], n)
+        elif p["type"] == "log_uniform":
+            out[:, k] = rng.uniform(np.log(p["low"]), np.log(p["high"]), n)
+        elif p["type"] == "normal":
+            out[:, k] = rng.normal(p["mean"], p["std"], n)
+        else:
+            raise ValueError(f"Unsupported prior type for ABC: {p['type']}")
+    return out
+
+
+def _log_prior(priors: Dict, names: Sequence[str], u: np.ndarray) -> np.ndarray:
+    """Log prior density of internal-space points (up to a constant)."""
+    lp = np.zeros(len(u))
+    for k, name in enumerate(names):
+        p = priors[name]
+        if p["type"] == "normal":
+            lp += -0.5 * ((u[:, k] - p["mean"]) / p["std"])**2
+        else:
+            lo = _to_internal(p, p["low"])
+            hi = _to_internal(p, p["high"])
+            lp[(u[:, k] < lo) | (u[:, k] > hi)] = -np.inf
+    return lp
+
+
+def _kernel_log_mixture(u_new, u_old, w_old, cov) -> np.ndarray:
+    """log sum_j w_j N(u_new_i; u_old_j, cov) for every new particle."""
+    chol = np.linalg.cholesky(cov)
+    diff = u_new[:, None, :] - u_old[None, :, :]
+    z = np.linalg.solve(chol, diff.reshape(-1, diff.shape[-1]).T).T
+    maha = np.sum(z**2, axis=1).reshape(len(u_new), len(u_old))
+    a = -0.5 * maha + np.log(w_old)[None, :]
+    amax = a.max(axis=1, keepdims=True)
+    return (amax + np.log(np.exp(a - amax).sum(axis=1, keepdims=True)))[:, 0]
+
+
+def abc_smc(priors: Dict[str, Dict],
+            target: Sequence[float],
+            simulate: Callable,
+            n_particles: int = 200,
+            n_generations: int = 8,
+            quantile: float = 0.5,
+            eps_min: float = 0.0,
+            min_acceptance: float = 0.01,
+            batch_size: Optional[int] = None,
+            scale: Optional[Sequence[float]] = None,
+            seed: int = 123) -> Dict:
+    """
+    Run ABC-SMC and return the final weighted particle population.
+
+    Parameters:
+    -----------
+    priors : dict
+        name -> {'type': 'uniform'|'log_uniform', 'low', 'high'}
+        or {'type': 'normal', 'mean', 'std'}
+    target : array-like
+        Observed summary statistics
+    simulate : callable
+        simulate(thetas, seeds) -> (n, n_stats) array, thetas a list of dicts;
+        called once per batch (see `lattice_simulator`)
+    n_particles : int
+        Population size
+    n_generations : int
+        Maximum number of generations after the prior generation
+    quantile : float
+        Next tolerance = this quantile of the current accepted distances
+    eps_min : float
+        Stop once the tolerance falls below this value
+    min_acceptance : float
+        Stop when a generation's acceptance rate drops below this value
+    batch_size : int, optional
+        Proposals simulated per batch (default: n_particles)
+    scale : array-like, optional
+        Per-statistic distance scale (default: MAD of prior-predictive draws)
+    seed : int
+        Seed for proposals and simulator seeds
+
+    Returns:
+    --------
+    result : dict
+        'names', 'particles' (natural space), 'weights', 'distances',
+        'epsilons', 'acceptance', 'ess', 'n_simulations'
+    """
+    rng = np.random.default_rng(seed)
+    names = list(priors)
+    target = np.asarray(target, dtype=float)
+    batch_size = batch_size or n_particles
+    n_sims = 0
+
+    def run(u):
+        nonlocal n_sims
+        thetas = [{name: float(_to_natural(priors[name], u[i, k]))
+                   for k, name in enumerate(names)} for i in range(len(u))]
+        seeds = rng.integers(0, 2**31 - 1, len(u))
+        n_sims += len(u)
+        return simulate(thetas, seeds)
+
+    # Generation 0: prior predictive
+    u = _sample_prior(priors, names, n_particles, rng)
+    stats = run(u)
+    if scale is None:
+        med = np.median(stats, axis=0)
+        scale = 1.4826 * np.median(np.abs(stats - med), axis=0)
+        scale = np.where(scale > 0, scale, 1.0)
+    scale = np.asarray(scale, dtype=float)
+
+    def distance(s):
+        return np.sqrt(np.sum(((s - target) / scale)**2, axis=1))
+
+    d = distance(stats)
+    w = np.full(n_particles, 1.0 / n_particles)
+    epsilons = [float(np.max(d))]
+    acceptance = [1.0]
+
+    for _ in range(n_generations):
+        eps = float(np.quantile(d, quantile))
+        if eps <= eps_min:
+            break
+        cov = 2.0 * np.atleast_2d(np.cov(u, rowvar=False, aweights=w))
+        cov += 1e-12 * np.eye(len(names))
+
+        acc_u, acc_d = [], []
+        n_prop = 0
+        while sum(len(x) for x in acc_u) < n_particles:
+            idx = rng.choice(n_particles, size=batch_size, p=w)
+            cand = u[idx] + rng.multivariate_normal(np.zeros(len(names)), cov,
+                                                    batch_size)
+            # proposals outside the prior support are rejected unsimulated
+            cand = cand[np.isfinite(_log_prior(priors, names, cand))]
+            n_prop += batch_size
+            if len(cand):
+                dc = distance(run(cand))
+                keep = dc <= eps
+                acc_u.append(cand[keep])
+                acc_d.append(dc[keep])
+            if sum(len(x) for x in acc_u) / n_prop < min_acceptance:
+                break
+        n_acc = sum(len(x) for x in acc_u)
+        if n_acc < n_particles:
+            break
+
+        u_new = np.concatenate(acc_u)[:n_particles]
+        d_new = np.concatenate(acc_d)[:n_particles]
+        logw = _log_prior(priors, names, u_new) - _kernel_log_mixture(u_new, u, w, cov)
+        w_new = np.exp(logw - logw.max())
+        u, d, w = u_new, d_new, w_new / w_new.sum()
+        epsilons.append(eps)
+        acceptance.append(n_acc / n_prop)
+
+    particles = np.column_stack([_to_natural(priors[name], u[:, k])
+                                 for k, name in enumerate(names)])
+    return {
+        "names": names,
+        "particles": particles,
+        "weights": w,
+        "distances": d,
+        "epsilons": epsilons,
+        "acceptance": acceptance,
+        "ess": float(1.0 / np.sum(w**2)),
+        "n_simulations": n_sims,
+    }
+
+
+def weighted_summary(result: Dict) -> Dict[str, Dict[str, float]]:
+    """Weighted posterior mean and standard deviation per parameter."""
+    w = result["weights"]
+    out = {}
+    for k, name in enumerate(result["names"]):
+        x = result["particles"][:, k]
+        mean = float(np.sum(w * x))
+        out[name] = {"mean": mean, "sd": float(np.sqrt(np.sum(w * (x - mean)**2)))}
+    return out
+
+
+if __name__ == "__main__":
+    priors = {
+        "collapse_bias": {"type": "uniform", "low": 0.0, "high": 6.0},
+        "eta_tel": {"type": "uniform", "low": 0.02, "high": 0.2},
+        "leak": {"type": "log_uniform", "low": 1e-3, "high": 2.4e-2},
+    }
+    with ProcessPoolExecutor() as pool:
+        simulate = lattice_simulator(pool=pool, steps=400)
+        target = simulate([{"collapse_bias": 3.0, "eta_tel": 0.10, "leak": 0.002}], [7])[0]
+        res = abc_smc(priors, target, simulate, n_particles=64, n_generations=4)
+    print("epsilons:", np.round(res["epsilons"], 3))
+    print("ESS:", round(res["ess"], 1), "simulations:", res["n_simulations"])
+    for name, s in weighted_summary(res).items():
+        print(f"{name}: {s['mean']:.4g} +/- {s['sd']:.2g}")
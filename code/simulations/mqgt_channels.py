@@ -0,0 +1,140 @@
+"""
+Channel-likelihood registry for MQGT_SCF_Inference.
+
+Each experimental channel is registered once with
+  - the parameters it reads (and their values when a parameter is not
+    part of the parameter set),
+  - a batched log-likelihood loglik(data, **params) taking one array per
+    declared parameter and returning one value per point,
+  - optionally the gradient grad(data, **params) -> {param: d loglik / d param}.
+The inference engine evaluates whichever registered channels have data, so
+a new channel (stellar cooling, neutrinos, GW, Casimir, ...) is a
+`register_channel` call, not an edit of the engine.
+
+The four built-in channels below are the numpy copy of the channel
+densities: `MQGT_SCF_Inference.likelihood_*` are single-point wrappers over
+them. mqgt_posterior keeps a second, numba-compiled copy of the same four
+for the compiled samplers (the two are tested against each other on random
+points, so a change to one must be made to both). Channels registered
+without a compiled kernel are evaluated through this registry instead.
+"""
+
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+from scipy.special import expit, gammaln
+
+from mqgt_posterior import GAMMA_0, GAMMA_SM, LIKELIHOOD_DEFAULTS, LIKELIHOOD_PARAMS
+
+_DEFAULTS = dict(zip(LIKELIHOOD_PARAMS, LIKELIHOOD_DEFAULTS))
+_LOG_SQRT_2PI = 0.5 * np.log(2 * np.pi)
+
+
+class Channel(NamedTuple):
+    name: str
+    params: tuple
+    defaults: Dict[str, float]
+    loglik: Callable
+    grad: Optional[Callable] = None
+
+
+CHANNELS: Dict[str, Channel] = {}
+
+
+def register_channel(name: str, params: Sequence[str], loglik: Callable,
+                     grad: Optional[Callable] = None,
+                     defaults: Optional[Dict[str, float]] = None,
+                     replace: bool = False) -> Channel:
+    """
+    Register a channel likelihood.
+
+    Parameters:
+    -----------
+    name : str
+        Channel name used with `add_channel_data`
+    params : sequence of str
+        Parameters read by the channel
+    loglik : callable
+        loglik(data, **params) -> array (n,), params as arrays (n,)
+    grad : callable, optional
+        grad(data, **params) -> {param: array (n,)}
+    defaults : dict, optional
+        Values of declared parameters missing from the parameter set
+        (default 0.0)
+    replace : bool
+        Allow overwriting an existing registration
+
+    Returns:
+    --------
+    channel : Channel
+    """
+    if name in CHANNELS and not replace:
+        raise ValueError(f"Channel {name!r} is already registered")
+    params = tuple(params)
+    defaults = {p: float((defaults or {}).get(p, 0.0)) for p in params}
+    channel = Channel(name, params, defaults, loglik, grad)
+    CHANNELS[name] = channel
+    return channel
+
+
+# ---- built-in channels ----
+
+def _qrng_counts(data):
+    N_0, N_1 = float(data['N_0']), float(data['N_1'])
+    dE = data.get('E_1', 1.0) - data.get('E_0', 0.0)
+    return N_0, N_1, dE
+
+
+def _qrng_loglik(data, eta):
+    N_0, N_1, dE = _qrng_counts(data)
+    z = eta * dE
+    log_p1 = -np.logaddexp(0.0, -z)
+    log_c = gammaln(N_0 + N_1 + 1) - gammaln(N_0 + 1) - gammaln(N_1 + 1)
+    return log_c + N_1 * log_p1 + N_0 * (log_p1 - z)
+
+
+def _qrng_grad(data, eta):
+    N_0, N_1, dE = _qrng_counts(data)
+    return {'eta': dE * (N_1 - (N_0 + N_1) * expit(eta * dE))}
+
+
+def _higgs_model(data, g_phi, theta):
+    sigma = data.get('sigma_Gamma', 0.1 * data['Gamma_inv'])
+    pred = GAMMA_SM + g_phi**2 * np.sin(theta)**2 * GAMMA_0
+    return (data['Gamma_inv'] - pred) / sigma, sigma
+
+
+def _higgs_loglik(data, g_phi, theta):
+    r, sigma = _higgs_model(data, g_phi, theta)
+    return -0.5 * r**2 - np.log(sigma) - _LOG_SQRT_2PI
+
+
+def _higgs_grad(data, g_phi, theta):
+    r, sigma = _higgs_model(data, g_phi, theta)
+    dpred = r / sigma
+    return {'g_phi': dpred * 2 * g_phi * np.sin(theta)**2 * GAMMA_0,
+            'theta': dpred * g_phi**2 * np.sin(2 * theta) * GAMMA_0}
+
+
+def _fifth_force_loglik(data, alpha, m_c):
+    # m_c is the proxy for the scalar mass m_phi
+    excluded = (alpha > data.get('alpha_bound', 1e-10)) | (m_c < data.get('m_phi_bound', 1e-4))
+    return np.where(excluded, -np.inf, 0.0)
+
+
+def _fifth_force_grad(data, alpha, m_c):
+    return {'alpha': np.zeros_like(alpha), 'm_c': np.zeros_like(m_c)}
+
+
+def _cosmology_loglik(data):
+    # placeholder w(z) = -1 prediction: no parameter dependence yet
+    sigma_w = data.get('sigma_w', 0.1)
+    r = (data.get('w_obs', -1.0) + 1.0) / sigma_w
+    return -0.5 * r**2 - np.log(sigma_w) - _LOG_SQRT_2PI
+
+
+register_channel('qrng', ('eta',), _qrng_loglik, _qrng_grad, _DEFAULTS)
+register_channel('higgs', ('g_phi', 'theta'), _higgs_loglik, _higgs_grad, _DEFAULTS)
+register_channel('fifth_force', ('alpha', 'm_c'), _fifth_force_loglik, _fifth_force_grad,
+                 _DEFAULTS)
+register_channel('cosmology', (), _cosmology_loglik, lambda data: {})
@@ -0,0 +1,113 @@
+"""
+Spatial and radial collapse-statistics accumulators.
+
+The near/far split in `collapse_events()` answers one question per run (a
+single `horizon_radius` threshold). A CollapseStats accumulator is updated
+inside the collapse loop with per-cell and per-radial-bin counts of A
+outcomes and totals, using a radius-bin lookup table precomputed once for
+the lattice, so one run yields the full A-rate versus distance-from-horizon
+profile. Accumulators from ensemble replicas are summed with `reduce`.
+"""
+
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class CollapseStats:
+    """
+    Per-cell and per-radial-bin A / total collapse counts.
+
+    Parameters:
+    -----------
+    shape : tuple
+        Lattice shape (h, w)
+    center : tuple, optional
+        Horizon centre (default: lattice centre, as in `collapse_events`)
+    bin_edges : array-like, optional
+        Radial bin edges; defaults to unit-width bins out to the corner
+    """
+
+    def __init__(self, shape: Tuple[int, int],
+                 center: Optional[Tuple[int, int]] = None,
+                 bin_edges: Optional[Sequence[float]] = None):
+        h, w = shape
+        self.shape = (h, w)
+        self.center = center if center is not None else (h // 2, w // 2)
+        cx, cy = self.center
+        ii, jj = np.indices(self.shape)
+        self.radius = np.hypot(ii - cx, jj - cy)
+        if bin_edges is None:
+            bin_edges = np.arange(0.0, np.ceil(self.radius.max()) + 1.0)
+        self.bin_edges = np.asarray(bin_edges, dtype=float)
+        n_bins = len(self.bin_edges) - 1
+        # radius-bin lookup table; cells beyond the last edge go to an overflow slot
+        lut = np.digitize(self.radius, self.bin_edges) - 1
+        lut[(lut < 0) | (lut >= n_bins)] = n_bins
+        self.bin_lut = lut.astype(np.intp)
+
+        self.cell_A = np.zeros(self.shape, dtype=np.int64)
+        self.cell_total = np.zeros(self.shape, dtype=np.int64)
+        self.radial_A = np.zeros(n_bins + 1, dtype=np.int64)
+        self.radial_total = np.zeros(n_bins + 1, dtype=np.int64)
+
+    def add(self, i, j, is_A):
+        """Count collapse events at cells (i, j): one event, or arrays of events."""
+        if np.ndim(i) == 0:
+            b = self.bin_lut[i, j]
+            self.cell_total[i, j] += 1
+            self.radial_total[b] += 1
+            if is_A:
+                self.cell_A[i, j] += 1
+                self.radial_A[b] += 1
+            return
+        i, j = np.asarray(i), np.asarray(j)
+        is_A = np.asarray(is_A, dtype=bool)
+        b = self.bin_lut[i, j]
+        np.add.at(self.cell_total, (i, j), 1)
+        np.add.at(self.radial_total, b, 1)
+        np.add.at(self.cell_A, (i[is_A], j[is_A]), 1)
+        np.add.at(self.radial_A, b[is_A], 1)
+
+    def merge(self, other: "CollapseStats") -> "CollapseStats":
+        """Add another accumulator's counts in place (same lattice and bins)."""
+        if other.shape != self.shape or not np.array_equal(other.bin_edges, self.bin_edges):
+            raise ValueError("CollapseStats must share lattice shape and bin edges")
+        self.cell_A += other.cell_A
+        self.cell_total += other.cell_total
+        self.radial_A += other.radial_A
+        self.radial_total += other.radial_total
+        return self
+
+    @classmethod
+    def reduce(cls, parts: Iterable["CollapseStats"]) -> "CollapseStats":
+        """Sum accumulators from ensemble replicas into a new one."""
+        parts = list(parts)
+        if not parts:
+            raise ValueError("Nothing to reduce")
+        first = parts[0]
+        out = cls(first.shape, first.center, first.bin_edges)
+        for p in parts:
+            out.merge(p)
+        return out
+
+    def a_rate_map(self) -> np.ndarray:
+        """Per-cell A-rate (NaN where no events landed)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.cell_total > 0, self.cell_A / self.cell_total, np.nan)
+
+    def radial_profile(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(bin centres, A-rate, totals) versus distance from the horizon centre."""
+        centres = 0.5 * (self.bin_edges[:-1] + self.bin_edges[1:])
+        a, tot = self.radial_A[:-1], self.radial_total[:-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(tot > 0, a / tot, np.nan)
+        return centres, rate, tot
+
+    def near_far(self, radius: float) -> Tuple[float, float]:
+        """(Anear, Afar) for any horizon radius, from the per-cell counts."""
+        near = self.radius < radius
+        n_near = self.cell_total[near].sum()
+        n_far = self.cell_total[~near].sum()
+        return (self.cell_A[near].sum() / max(1, n_near),
+                self.cell_A[~near].sum() / max(1, n_far))
@@ -0,0 +1,52 @@
+"""
+Ensemble execution for the lattice simulator (mqgt_simulation.run_once).
+Runs batches of independent configurations serially or across a process pool.
+"""
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from mqgt_simulation import run_once
+
+
+def _run_config(config: Dict) -> Dict:
+    return run_once(**config)
+
+
+def run_ensemble(configs: Sequence[Dict],
+                 processes: Optional[int] = None,
+                 pool: Optional[Executor] = None) -> List[Dict]:
+    """
+    Run `run_once` once per configuration.
+
+    Parameters:
+    -----------
+    configs : sequence of dict
+        Keyword arguments for `run_once` (seed, steps, collapse_bias, leak, ...)
+    processes : int, optional
+        Worker processes; None uses os.cpu_count(), 1 runs in-process
+    pool : Executor, optional
+        Existing pool to run on (overrides `processes`); reusing one pool
+        across many small batches avoids restarting and re-JITting workers
+
+    Returns:
+    --------
+    results : list of dict
+        `run_once` result dicts, in the same order as `configs`
+    """
+    configs = list(configs)
+    if pool is not None:
+        return list(pool.map(_run_config, configs))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(configs))
+    if processes <= 1:
+        return [_run_config(c) for c in configs]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_run_config, configs))
+
+
+def replicate(config: Dict, seeds: Sequence[int]) -> List[Dict]:
+    """Copies of `config` differing only in seed."""
+    return [dict(config, seed=int(s)) for s in seeds]
@@ -0,0 +1,190 @@
+"""
+Compact binary collapse-event log for replay and offline reanalysis.
+
+`collapse_events()` only returns aggregate counters; with a recorder attached
+every event is also written as a packed record (tick, i, j, outcome, pA) to an
+append-only file that can be memory-mapped later. A sidecar tick index maps
+each tick to its first record, so time windows are a slice, and statistics
+over millions of events are computed with vectorised numpy without touching
+the simulator.
+
+Layout of a log directory:
+  events.bin  packed EVENT_DTYPE records (13 bytes each)
+  ticks.idx   (tick, first_record) pairs, one per recorded tick
+  meta.json   run metadata (grid shape, horizon centre, collapse_bias, ...)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ("tick", "<u4"),
+    ("i", "<u2"),
+    ("j", "<u2"),
+    ("outcome", "u1"),  # 1 = A (ordering), 0 = B (disordering)
+    ("pA", "<f4"),
+])
+INDEX_DTYPE = np.dtype([("tick", "<u4"), ("start", "<u8")])
+
+
+class EventRecorder:
+    """
+    Append-only writer for collapse events.
+
+    Pass as `recorder=` to `collapse_events` (or `event_log=` to `run_once`).
+    Records are buffered and flushed in blocks of `buffer_size`.
+
+    A new log refuses a directory that already holds events, so two runs are
+    never joined under one run's metadata. With `resume=True` an existing
+    log is continued instead: `meta` (if given) must equal the stored
+    metadata and ticks must not precede the last recorded one.
+    """
+
+    def __init__(self, directory, meta: Optional[Dict] = None,
+                 buffer_size: int = 1 << 16, resume: bool = False):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        meta_path = self.dir / "meta.json"
+        events_path, index_path = self.dir / "events.bin", self.dir / "ticks.idx"
+        meta = None if meta is None else json.loads(json.dumps(dict(meta, format=1)))
+        exists = any(p.exists() and p.stat().st_size for p in (events_path, index_path))
+        self._last_tick = -1
+        if resume and exists:
+            stored = json.loads(meta_path.read_text()) if meta_path.exists() else None
+            if meta is not None and meta != stored:
+                raise ValueError(f"Cannot resume {self.dir}: metadata differs from the stored log")
+            index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+            if len(index):
+                self._last_tick = int(index["tick"][-1])
+        else:
+            if exists:
+                raise FileExistsError(f"{self.dir} already holds an event log "
+                                      f"(use a new directory or resume=True)")
+            meta_path.write_text(json.dumps(meta or {"format": 1}, indent=2))
+        self._events = open(events_path, "ab")
+        self._index = open(index_path, "ab")
+        self._n = self._events.tell() // EVENT_DTYPE.itemsize
+        self._buf = []
+        self._buffered = 0
+        self.buffer_size = buffer_size
+
+    def append(self, tick: int, i, j, outcome, pA):
+        """Record all events of one `collapse_events` call at `tick`."""
+        n = len(i)
+        if n == 0:
+            return
+        if tick < self._last_tick:
+            # the tick index must stay sorted for EventLog.window
+            raise ValueError(f"tick {tick} precedes recorded tick {self._last_tick}")
+        rec = np.empty(n, dtype=EVENT_DTYPE)
+        rec["tick"] = tick
+        rec["i"] = i
+        rec["j"] = j
+        rec["outcome"] = outcome
+        rec["pA"] = pA
+        if tick != self._last_tick:
+            self._index.write(np.array([(tick, self._n + self._buffered)],
+                                       dtype=INDEX_DTYPE).tobytes())
+            self._last_tick = tick
+        self._buf.append(rec)
+        self._buffered += n
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._events.write(np.concatenate(self._buf).tobytes())
+            self._n += self._buffered
+            self._buf, self._buffered = [], 0
+        self._events.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._events.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventLog:
+    """
+    Read-only, memory-mapped view of a recorded event log.
+
+    All queries operate on the `events` structured array (or a tick window of
+    it) with vectorised numpy.
+    """
+
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.meta = json.loads((self.dir / "meta.json").read_text())
+        path = self.dir / "events.bin"
+        if path.stat().st_size:
+            self.events = np.memmap(path, dtype=EVENT_DTYPE, mode="r")
+        else:
+            self.events = np.empty(0, dtype=EVENT_DTYPE)
+        self.index = np.fromfile(self.dir / "ticks.idx", dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.events)
+
+    def window(self, t0: int = 0, t1: Optional[int] = None) -> np.ndarray:
+        """Events with t0 <= tick < t1, located through the tick index."""
+        ticks = self.index["tick"]
+        a = np.searchsorted(ticks, t0, side="left")
+        start = int(self.index["start"][a]) if a < len(ticks) else len(self.events)
+        if t1 is None:
+            return self.events[start:]
+        b = np.searchsorted(ticks, t1, side="left")
+        stop = int(self.index["start"][b]) if b < len(ticks) else len(self.events)
+        return self.events[start:stop]
+
+    def a_rate_by_tick(self, events: Optional[np.ndarray] = None
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(ticks, A counts, totals) per recorded tick."""
+        ev = self.events if events is None else events
+        ticks, inv = np.unique(ev["tick"], return_inverse=True)
+        total = np.bincount(inv)
+        n_a = np.bincount(inv, weights=ev["outcome"]).astype(np.int64)
+        return ticks, n_a, total
+
+    def a_rate_map(self, shape: Optional[Tuple[int, int]] = None,
+                   events: Optional[np.ndarray] = None
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-cell (A counts, totals) on the lattice."""
+        ev = self.events if events is None else events
+        h, w = shape or tuple(self.meta["shape"])
+        flat = ev["i"].astype(np.int64) * w + ev["j"]
+        total = np.bincount(flat, minlength=h * w).reshape(h, w)
+        n_a = np.bincount(flat, weights=ev["outcome"], minlength=h * w)
+        return n_a.reshape(h, w).astype(np.int64), total
+
+    def radial_profile(self, bins, center: Optional[Tuple[float, float]] = None,
+                       events: Optional[np.ndarray] = None
+                       ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(bin edges, A counts, totals) versus distance from the horizon centre."""
+        ev = self.events if events is None else events
+        cx, cy = center or tuple(self.meta["center"])
+        r = np.hypot(ev["i"].astype(np.float64) - cx, ev["j"].astype(np.float64) - cy)
+        edges = np.asarray(bins, dtype=float)
+        if edges.ndim == 0:
+            edges = np.linspace(0.0, r.max() + 1e-9 if len(r) else 1.0, int(bins) + 1)
+        total, _ = np.histogram(r, bins=edges)
+        n_a, _ = np.histogram(r, bins=edges, weights=ev["outcome"])
+        return edges, n_a.astype(np.int64), total
+
+    def phi_eth_at_collapse(self, events: Optional[np.ndarray] = None) -> np.ndarray:
+        """Local phi*eth at each event, inverted from pA = 1/(1+exp(-2*bias*phi*eth))."""
+        ev = self.events if events is None else events
+        bias = self.meta["collapse_bias"]
+        if bias == 0:
+            raise ValueError("phi*eth is not recoverable from pA when collapse_bias=0")
+        p = np.clip(ev["pA"].astype(np.float64), 1e-7, 1 - 1e-7)
+        return np.log(p / (1 - p)) / (2.0 * bias)
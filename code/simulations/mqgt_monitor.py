@@ -0,0 +1,104 @@
+"""
+Numerical-health monitor for field evolutions and the lattice simulator.
+
+A StabilityMonitor is handed to an integration loop, which calls
+`observe` every `cadence` steps (checked with `due`, so the energy and the
+amplitude scan are only computed on those steps). Each observation records
+  - the conserved quantity (total energy for the field solvers, the
+    budgeted Φ + E total for the lattice) and its relative drift,
+  - the maximum absolute field amplitude,
+  - the CFL margin 1 - dt/dt_max of the fixed-step scheme (NaN where the
+    integrator controls its own step),
+and the run is aborted with FieldHealthError as soon as a value is
+non-finite, the amplitude exceeds `max_amplitude` or the drift exceeds
+`max_drift`, instead of integrating a diverged solution to the end.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+HEALTH_DTYPE = np.dtype([
+    ("step", "i8"),
+    ("t", "f8"),
+    ("energy", "f8"),
+    ("drift", "f8"),
+    ("max_amplitude", "f8"),
+    ("cfl_margin", "f8"),
+])
+
+
+class FieldHealthError(RuntimeError):
+    """A monitored run diverged; `history` holds the records up to the failure."""
+
+    def __init__(self, message: str, history: np.ndarray):
+        super().__init__(message)
+        self.history = history
+
+
+class StabilityMonitor:
+    """
+    Periodic energy / amplitude / CFL checks with abort on blow-up.
+
+    Parameters:
+    -----------
+    cadence : int
+        Observe every this many steps
+    max_amplitude : float
+        Abort when max |field| exceeds this
+    max_drift : float, optional
+        Abort when |E - E0| / |E0| exceeds this (default: never)
+    """
+
+    def __init__(self, cadence: int = 10, max_amplitude: float = 1e6,
+                 max_drift: Optional[float] = None):
+        self.cadence = max(1, int(cadence))
+        self.max_amplitude = max_amplitude
+        self.max_drift = max_drift
+        self.start()
+
+    def start(self, cfl_margin: float = np.nan):
+        """Reset the records for a new run with a fixed CFL margin."""
+        self.cfl_margin = float(cfl_margin)
+        self._records = []
+        self._e0 = None
+
+    def due(self, step: int) -> bool:
+        return step % self.cadence == 0
+
+    def observe(self, step: int, t: float, fields: np.ndarray,
+                energy: Optional[float] = None):
+        """Record one observation; raises FieldHealthError on blow-up."""
+        amp = float(max(np.max(fields), -np.min(fields)))
+        drift = np.nan
+        if energy is not None:
+            if self._e0 is None:
+                self._e0 = energy
+            drift = abs(energy - self._e0) / max(abs(self._e0), np.finfo(float).tiny)
+        self._records.append((step, t, np.nan if energy is None else energy,
+                              drift, amp, self.cfl_margin))
+
+        reason = None
+        if not np.isfinite(amp) or (energy is not None and not np.isfinite(energy)):
+            reason = "non-finite field values"
+        elif amp > self.max_amplitude:
+            reason = f"max amplitude {amp:.3g} > {self.max_amplitude:.3g}"
+        elif self.max_drift is not None and drift > self.max_drift:
+            reason = f"energy drift {drift:.3g} > {self.max_drift:.3g}"
+        if reason is not None:
+            raise FieldHealthError(f"Aborted at step {step} (t={t:g}): {reason}",
+                                   self.history())
+
+    def history(self) -> np.ndarray:
+        """All observations so far as a HEALTH_DTYPE structured array."""
+        return np.array(self._records, dtype=HEALTH_DTYPE)
+
+    def summary(self) -> Dict[str, float]:
+        """Worst values seen so far."""
+        h = self.history()
+        drift = h["drift"][np.isfinite(h["drift"])]
+        return {
+            "max_drift": float(drift.max()) if len(drift) else np.nan,
+            "max_amplitude": float(h["max_amplitude"].max()) if len(h) else np.nan,
+            "cfl_margin": self.cfl_margin,
+        }
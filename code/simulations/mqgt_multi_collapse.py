@@ -0,0 +1,234 @@
+"""
+Multi-outcome collapse engine for the lattice simulator.
+
+Generalises the two-outcome A/B choice of `collapse_events()` to K outcomes
+with the ethically weighted Born rule of `MQGT_SCF_Simulator`:
+
+    P(k | cell) ∝ |c_k|² exp(kappa_bias * phi * eth * E_k)
+
+where |c_k|² and E_k may be global (shape (K,)) or per-cell fields
+(shape (K, h, w)). With |c|² = (1/2, 1/2) and E = (+1, -1) this is exactly
+the A/B rule.
+
+Sampling tables (Vose alias tables, or cumulative distributions searched
+by bisection) are kept per cell across ticks, keyed on the cell's tilt
+kappa_bias * phi * eth, and a tick rebuilds only the cells it hits whose
+tilt has changed since their table was built. Building a table costs O(K);
+drawing from it costs O(1) (alias) or O(log K) (cumulative). In `run_once`
+diffusion moves phi and eth in every cell every tick, so practically every
+hit cell is rebuilt and either method costs O(K) per event: the cache only
+saves work when the fields hold still between ticks (frozen fields, or
+many events landing on unchanged cells). Each outcome's field update is
+declared as a row of OUTCOME_DTYPE rather than as code.
+"""
+
+import numpy as np
+from numba import njit
+
+# Field update applied when an outcome is selected at cell (i, j):
+#   rho <- clip((1 - rho_mix) * rho + rho_mix * rho[i+1, j] + d_rho)
+#   phi <- clip(phi + d_phi);  eth <- clip(eth + d_eth)
+# `ordering` marks outcomes counted as "A" in the collapse_events counters.
+OUTCOME_DTYPE = np.dtype([
+    ("d_rho", "f8"),
+    ("d_phi", "f8"),
+    ("d_eth", "f8"),
+    ("rho_mix", "f8"),
+    ("ordering", "?"),
+])
+
+
+def ab_outcomes() -> np.ndarray:
+    """The two outcomes of `collapse_events()` (A: ordering, B: disordering)."""
+    return np.array([
+        (0.0, 0.03, 0.02, 0.2, True),
+        (0.15, -0.03, -0.02, 0.0, False),
+    ], dtype=OUTCOME_DTYPE)
+
+
+@njit
+def build_alias_tables(p):
+    """Vose alias tables for each row of a (M, K) probability matrix."""
+    M, K = p.shape
+    prob = np.empty((M, K))
+    alias = np.zeros((M, K), dtype=np.int64)
+    small = np.empty(K, dtype=np.int64)
+    large = np.empty(K, dtype=np.int64)
+    for m in range(M):
+        q = p[m] * K
+        ns = nl = 0
+        for k in range(K):
+            if q[k] < 1.0:
+                small[ns] = k
+                ns += 1
+            else:
+                large[nl] = k
+                nl += 1
+        while ns > 0 and nl > 0:
+            ns -= 1
+            s = small[ns]
+            g = large[nl - 1]
+            prob[m, s] = q[s]
+            alias[m, s] = g
+            q[g] = (q[g] + q[s]) - 1.0
+            if q[g] < 1.0:
+                nl -= 1
+                small[ns] = g
+                ns += 1
+        for r in range(nl):
+            prob[m, large[r]] = 1.0
+        for r in range(ns):
+            prob[m, small[r]] = 1.0
+    return prob, alias
+
+
+@njit
+def _search_rows(cdf, rows, u):
+    # binary search of u[n] in cdf[rows[n]]
+    n_ev = len(u)
+    K = cdf.shape[1]
+    out = np.empty(n_ev, dtype=np.int64)
+    for n in range(n_ev):
+        c = cdf[rows[n]]
+        lo, hi = 0, K - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if c[mid] < u[n]:
+                lo = mid + 1
+            else:
+                hi = mid
+        out[n] = lo
+    return out
+
+
+@njit
+def _apply_outcomes(rho, phi, eth, ii, jj, kk, d_rho, d_phi, d_eth, rho_mix):
+    h = rho.shape[0]
+    for n in range(len(kk)):
+        i, j, k = ii[n], jj[n], kk[n]
+        r = (1.0 - rho_mix[k]) * rho[i, j] + rho_mix[k] * rho[(i+1) % h, j] + d_rho[k]
+        rho[i, j] = min(max(r, 0.0), 1.0)
+        phi[i, j] = min(max(phi[i, j] + d_phi[k], 0.0), 1.0)
+        eth[i, j] = min(max(eth[i, j] + d_eth[k], 0.0), 1.0)
+
+
+class MultiOutcomeCollapse:
+    """
+    K-outcome collapse engine, a drop-in for `collapse_events`.
+
+    Parameters:
+    -----------
+    outcomes : structured array of OUTCOME_DTYPE, shape (K,)
+        Field update per outcome
+    amplitudes : array, shape (K,) or (K, h, w)
+        Born weights |c_k|² (need not be normalised)
+    E_labels : array, shape (K,) or (K, h, w)
+        Ethical label E_k of each outcome
+    method : str
+        'alias' (Vose tables) or 'cumulative' (binary search in the CDF)
+    """
+
+    def __init__(self, outcomes: np.ndarray, amplitudes, E_labels,
+                 method: str = "alias"):
+        if method not in ("alias", "cumulative"):
+            raise ValueError(f"Unknown sampling method: {method}")
+        self.outcomes = np.asarray(outcomes, dtype=OUTCOME_DTYPE)
+        K = len(self.outcomes)
+        with np.errstate(divide="ignore"):
+            self.log_amp = np.log(np.asarray(amplitudes, dtype=float))
+        self.E = np.asarray(E_labels, dtype=float)
+        if self.log_amp.shape[0] != K or self.E.shape[0] != K:
+            raise ValueError("amplitudes and E_labels need one entry per outcome")
+        self.method = method
+        self.counts = np.zeros(K, dtype=np.int64)
+        self._tilt = None  # per-cell tilt each cached table was built for
+
+    @property
+    def K(self) -> int:
+        return len(self.outcomes)
+
+    def _per_event(self, field, i, j):
+        return field[:, i, j].T if field.ndim == 3 else np.broadcast_to(field, (len(i), self.K))
+
+    def probabilities(self, phi, eth, i, j, kappa_bias):
+        """(n, K) outcome probabilities at cells (i, j), normalised in log space."""
+        logw = self._per_event(self.log_amp, i, j) \
+            + (kappa_bias * phi[i, j] * eth[i, j])[:, None] * self._per_event(self.E, i, j)
+        logw = logw - logw.max(axis=1, keepdims=True)
+        w = np.exp(logw)
+        return w / w.sum(axis=1, keepdims=True)
+
+    def sample(self, p, rows, rng):
+        """Draw one outcome per event from rows of the per-cell probability table."""
+        n = len(rows)
+        if self.method == "alias":
+            prob, alias = build_alias_tables(p)
+            k = rng.integers(0, self.K, n)
+            keep = rng.random(n) < prob[rows, k]
+            return np.where(keep, k, alias[rows, k])
+        cdf = np.cumsum(p, axis=1)
+        cdf[:, -1] = 1.0
+        return _search_rows(cdf, rows, rng.random(n))
+
+    def _refresh_tables(self, phi, eth, cells, kappa_bias):
+        """Rebuild the cached tables of `cells` whose tilt has changed."""
+        h, w = phi.shape
+        if self._tilt is None or self._tilt.shape[0] != h * w:
+            self._tilt = np.full(h * w, np.nan)
+            self._pA = np.empty(h * w)
+            self._prob = np.empty((h * w, self.K))
+            if self.method == "alias":
+                self._alias = np.empty((h * w, self.K), dtype=np.int64)
+        ci, cj = cells // w, cells % w
+        tilt = kappa_bias * phi[ci, cj] * eth[ci, cj]
+        stale = ~(self._tilt[cells] == tilt)
+        if not stale.any():
+            return
+        cells = cells[stale]
+        p = self.probabilities(phi, eth, ci[stale], cj[stale], kappa_bias)
+        if self.method == "alias":
+            self._prob[cells], self._alias[cells] = build_alias_tables(p)
+        else:
+            cdf = np.cumsum(p, axis=1)
+            cdf[:, -1] = 1.0
+            self._prob[cells] = cdf
+        self._pA[cells] = p[:, self.outcomes["ordering"]].sum(axis=1)
+        self._tilt[cells] = tilt[stale]
+
+    def _draw(self, cell_of_event, rng):
+        n = len(cell_of_event)
+        if self.method == "alias":
+            k = rng.integers(0, self.K, n)
+            keep = rng.random(n) < self._prob[cell_of_event, k]
+            return np.where(keep, k, self._alias[cell_of_event, k])
+        return _search_rows(self._prob, cell_of_event, rng.random(n))
+
+    def __call__(self, rho, phi, eth, kappa, num_events, kappa_bias, rng,
+                 horizon_radius, recorder=None, tick=0, stats=None):
+        h, w = rho.shape
+        cx, cy = h // 2, w // 2
+        i = rng.integers(0, h, num_events)
+        j = rng.integers(0, w, num_events)
+
+        # tables for the cells hit this tick, from start-of-tick fields
+        cell = i * w + j
+        self._refresh_tables(phi, eth, np.unique(cell), kappa_bias)
+        k = self._draw(cell, rng)
+
+        out = self.outcomes
+        _apply_outcomes(rho, phi, eth, i, j, k,
+                        out["d_rho"], out["d_phi"], out["d_eth"], out["rho_mix"])
+
+        counts = np.bincount(k, minlength=self.K)
+        self.counts += counts
+        is_A = out["ordering"][k]
+        near = (i - cx)**2 + (j - cy)**2 < horizon_radius**2
+        count_A = int(is_A.sum())
+        near_A = int((is_A & near).sum())
+        near_total = int(near.sum())
+        if recorder is not None:
+            recorder.append(tick, i, j, is_A.astype(np.uint8), self._pA[cell])
+        if stats is not None:
+            stats.add(i, j, is_A)
+        return (rho, phi, eth, kappa, count_A, num_events - count_A,
+                near_A, near_total, count_A - near_A, num_events - near_total)
@@ -0,0 +1,146 @@
+"""
+Nested sampling (Skilling 2006) for MQGT-SCF model comparison.
+
+Evidence Z = ∫ L(θ) π(θ) dθ is accumulated over shells of prior volume X:
+the live points are drawn from the prior through its unit-cube transform,
+the lowest-likelihood points are repeatedly replaced by prior draws with a
+higher likelihood, and each removal shrinks X by a factor e^(-1/n) in
+expectation.
+
+Replacement is parallel: each iteration removes the `n_parallel` lowest
+live points at once (X shrinks as for sequential removals with n, n-1, ...
+live points) and refills them with one batch of constrained random walks
+in the unit cube, started from surviving live points, stepping with the
+live-point covariance and evaluating the likelihood for the whole batch
+per step. The uncertainty of log Z is the usual sqrt(H / n_live) with H
+the information.
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _walk(logl_batch: Callable, transform: Callable, U: np.ndarray, L: np.ndarray,
+          logl_star: float, chol: np.ndarray, scale: float, n_steps: int,
+          rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, float]:
+    # random walk in the unit cube restricted to L > logl_star, all walkers at once
+    U, L = U.copy(), L.copy()
+    k, d = U.shape
+    accepted = 0
+    for _ in range(n_steps):
+        prop = U + scale * rng.standard_normal((k, d)) @ chol.T
+        inside = np.all((prop > 0.0) & (prop < 1.0), axis=1)
+        Lp = np.full(k, -np.inf)
+        if inside.any():
+            Lp[inside] = logl_batch(transform(prop[inside]))
+        ok = inside & (Lp > logl_star)
+        U[ok] = prop[ok]
+        L[ok] = Lp[ok]
+        accepted += int(ok.sum())
+    return U, L, accepted / (k * n_steps)
+
+
+def nested_sample(logl_batch: Callable, transform: Callable, ndim: int,
+                  n_live: int = 400, n_parallel: Optional[int] = None,
+                  walk_steps: int = 25, dlogz: float = 0.01,
+                  max_iter: int = 100000, seed: Optional[int] = None) -> Dict:
+    """
+    Estimate the log-evidence and weighted posterior samples.
+
+    Parameters:
+    -----------
+    logl_batch : callable
+        Log-likelihood of each row of a parameter array (n, d)
+    transform : callable
+        Unit-cube points (n, ndim) -> parameter array (n, d)
+    ndim : int
+        Dimension of the unit cube
+    n_live : int
+        Live points
+    n_parallel : int, optional
+        Points replaced per iteration (default: n_live // 10)
+    walk_steps : int
+        Random-walk steps per replacement
+    dlogz : float
+        Stop when the remaining live evidence could change log Z by less
+    max_iter : int
+        Iteration limit
+    seed : int, optional
+        Generator seed
+
+    Returns:
+    --------
+    result : dict
+        log_evidence, log_evidence_err, information, samples (n, d),
+        weights (n,) normalised posterior weights, log_likelihood (n,),
+        n_calls, n_iter
+    """
+    rng = np.random.default_rng(seed)
+    k = max(1, n_live // 10) if n_parallel is None else int(n_parallel)
+    if not 1 <= k < n_live:
+        raise ValueError("n_parallel must lie in [1, n_live)")
+    U = rng.random((n_live, ndim))
+    L = logl_batch(transform(U))
+    n_calls = n_live
+    # per-removal log shrinkage when removing with n, n-1, ..., n-k+1 live points
+    log_shrink = -1.0 / (n_live - np.arange(k))
+    log_dw = np.log(-np.expm1(log_shrink))
+
+    dead_U, dead_L, dead_logw = [], [], []
+    log_X, log_Z, scale = 0.0, -np.inf, 1.0
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        order = np.argsort(L)
+        worst, keep = order[:k], order[k:]
+        for j, i in enumerate(worst):
+            dead_U.append(U[i].copy())
+            dead_L.append(L[i])
+            dead_logw.append(log_X + log_dw[j])
+            log_X += log_shrink[j]
+            log_Z = np.logaddexp(log_Z, dead_logw[-1] + L[i])
+        logl_star = L[worst[-1]]
+
+        # refill from random surviving points with a constrained walk
+        cov = np.cov(U[keep].T).reshape(ndim, ndim) + 1e-12 * np.eye(ndim)
+        chol = np.linalg.cholesky(cov)
+        starts = rng.choice(keep, size=k)
+        new_U, new_L, acc = _walk(logl_batch, transform, U[starts], L[starts],
+                                  logl_star, chol, scale, walk_steps, rng)
+        n_calls += k * walk_steps
+        scale *= np.exp(np.clip(acc - 0.5, -0.5, 0.5))
+        U[worst], L[worst] = new_U, new_L
+
+        live_max = np.max(L) + log_X
+        if np.isfinite(log_Z) and np.logaddexp(log_Z, live_max) - log_Z < dlogz:
+            break
+
+    # remaining live points share the final volume
+    log_w_live = log_X - np.log(n_live)
+    for i in range(n_live):
+        dead_U.append(U[i].copy())
+        dead_L.append(L[i])
+        dead_logw.append(log_w_live)
+        log_Z = np.logaddexp(log_Z, log_w_live + L[i])
+
+    dead_L = np.array(dead_L)
+    log_p = np.array(dead_logw) + dead_L - log_Z
+    weights = np.exp(log_p)
+    finite = weights > 0
+    information = float(np.sum(weights[finite] * (dead_L[finite] - log_Z)))
+    return {
+        'log_evidence': float(log_Z),
+        'log_evidence_err': float(np.sqrt(max(information, 0.0) / n_live)),
+        'information': information,
+        'samples': transform(np.array(dead_U)),
+        'weights': weights / weights.sum(),
+        'log_likelihood': dead_L,
+        'n_calls': n_calls,
+        'n_iter': n_iter,
+    }
+
+
+def bayes_factor(a: Dict, b: Dict) -> Tuple[float, float]:
+    """log B_ab = log Z_a - log Z_b and its uncertainty from two runs."""
+    return (a['log_evidence'] - b['log_evidence'],
+            float(np.hypot(a['log_evidence_err'], b['log_evidence_err'])))
@@ -0,0 +1,284 @@
+"""
+Adaptive phase-boundary tracing for the lattice simulator.
+
+Instead of sweeping a uniform grid, the tracer walks along one parameter axis
+and, at each station, bisects the other axis for the point where a (noisy)
+binary classifier of `run_once` output flips. Each station starts from a
+narrow bracket around the previous boundary point (continuation), so only a
+handful of runs are spent away from the transition curve.
+
+Classifier noise is handled with replicated seeds: a point is assigned to a
+side only when the Wilson interval of its replica vote excludes 1/2, and the
+band of undecidable points is returned as the confidence band.
+"""
+
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from mqgt_ensemble import replicate, run_ensemble
+
+# Seeds are shared between stations (common random numbers), so neighbouring
+# points differ only through the parameters, not the replica noise.
+SEED_BASE = 1000
+
+
+# ----------------------------
+# Classifiers on run_once results
+# ----------------------------
+def basin_winner(res: Dict) -> bool:
+    """True when basin A (near the horizon) ends with the larger phi*E."""
+    return res["A_phiE"] > res["B_phiE"]
+
+
+def near_far_split(res: Dict, threshold: float = 0.05) -> bool:
+    """True when Anear exceeds Afar by more than `threshold`."""
+    return (res["Anear"] - res["Afar"]) > threshold
+
+
+def rescue_holds(res: Dict, tol: float = 0.05) -> bool:
+    """True when ZORA rescue keeps the basin gap within `tol`."""
+    return abs(res["A_phiE"] - res["B_phiE"]) <= tol
+
+
+CLASSIFIERS = {
+    "winner": basin_winner,
+    "near_far": near_far_split,
+    "rescue": rescue_holds,
+}
+
+
+def wilson_interval(k: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for k successes in n trials."""
+    if n == 0:
+        return 0.0, 1.0
+    p = k / n
+    denom = 1.0 + z**2 / n
+    centre = (p + z**2 / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denom
+    return centre - half, centre + half
+
+
+def lattice_evaluator(x_name: str, y_name: str,
+                      classify: Callable[[Dict], bool] = basin_winner,
+                      processes: Optional[int] = None,
+                      pool: Optional[Executor] = None,
+                      **run_kwargs) -> Callable:
+    """
+    Build an `evaluate(x, y, seeds)` callable backed by `run_once`.
+
+    Parameters:
+    -----------
+    x_name, y_name : str
+        `run_once` keyword arguments spanning the slice (e.g. 'leak', 'collapse_bias')
+    classify : callable
+        Maps a `run_once` result dict to a bool
+    processes : int, optional
+        Passed to `run_ensemble`; the replicas of one point run as one batch
+    pool : Executor, optional
+        Shared pool for all evaluations (see `trace_lattice_boundary`)
+    run_kwargs : dict
+        Fixed `run_once` arguments (steps, N, zora_mode, ...)
+    """
+    def evaluate(x, y, seeds):
+        base = dict(run_kwargs, **{x_name: float(x), y_name: float(y)})
+        results = run_ensemble(replicate(base, seeds), processes=processes, pool=pool)
+        return np.array([bool(classify(r)) for r in results])
+    return evaluate
+
+
+class _Station:
+    """Replicated, memoised classifier along one line x = const."""
+
+    def __init__(self, evaluate, x, replicas, max_replicas, z, log):
+        self.evaluate = evaluate
+        self.x = x
+        self.replicas = replicas
+        self.max_replicas = max_replicas
+        self.z = z
+        self.log = log
+        self.side = {}
+        self.prob = {}
+
+    def __call__(self, y):
+        if y in self.side:
+            return self.side[y]
+        k = n = 0
+        side = 0
+        while n < self.max_replicas:
+            batch = min(self.replicas, self.max_replicas - n)
+            seeds = SEED_BASE + np.arange(n, n + batch)
+            k += int(np.sum(self.evaluate(self.x, y, seeds)))
+            n += batch
+            lo, hi = wilson_interval(k, n, self.z)
+            side = 1 if lo > 0.5 else (-1 if hi < 0.5 else 0)
+            if side != 0:
+                break
+        self.log.append((self.x, y, k, n))
+        self.side[y] = side
+        self.prob[y] = k / n
+        return side
+
+    def bisect(self, a, b, tol):
+        """Shrink [a, b] where side(a) is decided and side(b) differs."""
+        sa = self(a)
+        while abs(b - a) > tol:
+            m = 0.5 * (a + b)
+            if self(m) == sa:
+                a = m
+            else:
+                b = m
+        return a, b
+
+    def band(self, lo, hi, tol):
+        """Confidence band and p=1/2 crossing between decided ends lo < hi."""
+        s_lo, s_hi = self(lo), self(hi)
+        # inner edge of the lower side
+        a = max(y for y, s in self.side.items() if s == s_lo and y < hi)
+        b = min(y for y, s in self.side.items() if s != s_lo and y > a)
+        a, _ = self.bisect(a, b, tol)
+        # inner edge of the upper side (free when nothing was ambiguous)
+        c = min(y for y, s in self.side.items() if s == s_hi and y > a)
+        d = max(y for y, s in self.side.items() if s != s_hi and y < c)
+        c, _ = self.bisect(c, d, tol)
+
+        ys = np.array(sorted(y for y in self.prob if a <= y <= c))
+        ps = np.array([self.prob[y] for y in ys]) - 0.5
+        y_mid = 0.5 * (a + c)
+        cross = np.nonzero(np.sign(ps[:-1]) != np.sign(ps[1:]))[0]
+        if len(cross):
+            i = cross[0]
+            if ps[i + 1] != ps[i]:
+                y_mid = ys[i] - ps[i] * (ys[i + 1] - ys[i]) / (ps[i + 1] - ps[i])
+        return float(y_mid), float(a), float(c)
+
+
+def trace_boundary(evaluate: Callable,
+                   x_range: Tuple[float, float],
+                   y_range: Tuple[float, float],
+                   n_x: int = 9,
+                   tol: Optional[float] = None,
+                   replicas: int = 4,
+                   max_replicas: int = 16,
+                   z: float = 1.96,
+                   window: Optional[float] = None) -> Dict:
+    """
+    Trace the transition curve of a noisy binary classifier in a 2-D slice.
+
+    Parameters:
+    -----------
+    evaluate : callable
+        evaluate(x, y, seeds) -> bool array, one entry per seed
+        (see `lattice_evaluator`)
+    x_range, y_range : tuple
+        Slice bounds; the boundary is followed along x and bisected along y
+    n_x : int
+        Number of stations along x
+    tol : float, optional
+        Bisection resolution along y (default: 1/64 of the y range)
+    replicas, max_replicas : int
+        Seeds per batch and per point; more are added only while undecided
+    z : float
+        Wilson-interval width used to decide a side
+    window : float, optional
+        Initial continuation half-width (default: 1/8 of the y range)
+
+    Returns:
+    --------
+    result : dict
+        'x', 'y' (boundary polyline, NaN where no crossing),
+        'y_lower', 'y_upper' (confidence band), 'evaluations'
+        (rows of x, y, k, n), 'n_runs', and 'grid_runs' (cost of a uniform
+        grid at the same resolution and replica count)
+    """
+    y0, y1 = float(y_range[0]), float(y_range[1])
+    span = y1 - y0
+    tol = span / 64 if tol is None else tol
+    window = span / 8 if window is None else window
+
+    xs = np.linspace(x_range[0], x_range[1], n_x)
+    ys = np.full(n_x, np.nan)
+    y_lower = np.full(n_x, np.nan)
+    y_upper = np.full(n_x, np.nan)
+    log = []
+    prev = None
+    w = window
+
+    for ix, x in enumerate(xs):
+        station = _Station(evaluate, float(x), replicas, max_replicas, z, log)
+        if prev is None:
+            lo, hi = y0, y1
+        else:
+            lo, hi = max(y0, prev - w), min(y1, prev + w)
+        while True:
+            s_lo, s_hi = station(lo), station(hi)
+            if s_lo != 0 and s_hi != 0 and s_lo != s_hi:
+                break
+            if lo == y0 and hi == y1:
+                lo = hi = None
+                break
+            # no clean bracket: widen towards whichever end fails
+            w *= 2
+            lo, hi = max(y0, lo - w), min(y1, hi + w)
+        if lo is None:
+            prev = None
+            w = window
+            continue
+        ys[ix], y_lower[ix], y_upper[ix] = station.band(lo, hi, tol)
+        prev = ys[ix]
+        w = max(2.0 * (y_upper[ix] - y_lower[ix]), 4.0 * tol)
+
+    evaluations = np.array(log, dtype=float).reshape(-1, 4)
+    return {
+        "x": xs,
+        "y": ys,
+        "y_lower": y_lower,
+        "y_upper": y_upper,
+        "evaluations": evaluations,
+        "n_runs": int(evaluations[:, 3].sum()),
+        "grid_runs": int(n_x * (round(span / tol) + 1) * replicas),
+    }
+
+
+def trace_lattice_boundary(x_name: str, y_name: str,
+                           x_range: Tuple[float, float],
+                           y_range: Tuple[float, float],
+                           classify: str = "winner",
+                           processes: Optional[int] = None,
+                           run_kwargs: Optional[Dict] = None,
+                           **trace_kwargs) -> Dict:
+    """
+    Trace a `run_once` phase boundary, e.g. basin winner in leak x collapse_bias.
+
+    `classify` is a key of CLASSIFIERS or a callable on the result dict;
+    remaining keyword arguments go to `trace_boundary`. All evaluations
+    share one process pool (started once, so the workers JIT the lattice
+    kernels once) unless `processes=1`.
+    """
+    if isinstance(classify, str):
+        classify = CLASSIFIERS[classify]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    with ExitStack() as stack:
+        pool = None
+        if processes > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=processes))
+        evaluate = lattice_evaluator(x_name, y_name, classify=classify,
+                                     processes=processes, pool=pool, **(run_kwargs or {}))
+        res = trace_boundary(evaluate, x_range, y_range, **trace_kwargs)
+    res["x_name"], res["y_name"] = x_name, y_name
+    return res
+
+
+if __name__ == "__main__":
+    res = trace_lattice_boundary(
+        "leak", "collapse_bias", (0.001, 0.024), (0.0, 6.0),
+        classify="winner", run_kwargs={"steps": 600}, n_x=6, tol=0.25,
+    )
+    for x, y, lo, hi in zip(res["x"], res["y"], res["y_lower"], res["y_upper"]):
+        print(f"leak={x:.4f}  collapse_bias={y:.3f}  [{lo:.3f}, {hi:.3f}]")
+    print(f"{res['n_runs']} runs (grid at same resolution: {res['grid_runs']})")
@@ -0,0 +1,338 @@
+"""
+Compiled, array-based MQGT-SCF posterior for the samplers.
+
+`MQGT_SCF_Inference.log_posterior` works on parameter dicts and calls
+scipy.stats per parameter per evaluation. Here the priors and channel data
+of an inference engine are packed once into flat arrays, and the
+closed-form log-prior / log-likelihood (the same densities, including
+normalising constants) are numba kernels over a flat parameter vector x
+ordered as `names`. The Metropolis chain is compiled too and writes into
+preallocated sample arrays.
+
+Prior codes: 0 none, 1 normal(mean, std), 2 uniform(low, high),
+3 log_normal(mean, std) (of log x).
+"""
+
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+from numba import njit
+from scipy.special import gammaln, ndtri
+
+PRIOR_CODES = {'normal': 1, 'uniform': 2, 'log_normal': 3}
+
+# Parameters read by the channel likelihoods and their defaults when a
+# parameter is not sampled (as in MQGT_SCF_Inference.log_likelihood)
+LIKELIHOOD_PARAMS = ('eta', 'g_phi', 'theta', 'alpha', 'm_c')
+LIKELIHOOD_DEFAULTS = (0.0, 0.0, 0.0, 0.0, 1e-4)
+CHANNELS = ('qrng', 'higgs', 'fifth_force', 'cosmology')
+
+# Higgs portal forward model constants (MQGT_SCF_Inference.likelihood_higgs)
+GAMMA_SM = 4.07e-3
+GAMMA_0 = 1e-3
+
+_LOG_SQRT_2PI = 0.5 * math.log(2 * math.pi)
+
+
+@njit(cache=True)
+def _log_prior(x, ptype, pa, pb):
+    lp = 0.0
+    for k in range(x.shape[0]):
+        t = ptype[k]
+        v = x[k]
+        if t == 1:
+            z = (v - pa[k]) / pb[k]
+            lp += -0.5 * z * z - math.log(pb[k]) - _LOG_SQRT_2PI
+        elif t == 2:
+            if v < pa[k] or v > pb[k]:
+                return -np.inf
+        elif t == 3:
+            if v <= 0.0:
+                return -np.inf
+            z = (math.log(v) - pa[k]) / pb[k]
+            lp += -0.5 * z * z - math.log(v * pb[k]) - _LOG_SQRT_2PI
+    return lp
+
+
+@njit(cache=True)
+def _param(x, idx, default, k):
+    return x[idx[k]] if idx[k] >= 0 else default[k]
+
+
+@njit(cache=True)
+def _log_sigmoid(z):
+    # log(1 / (1 + exp(-z))) without overflow
+    if z >= 0.0:
+        return -math.log1p(math.exp(-z))
+    return z - math.log1p(math.exp(z))
+
+
+@njit(cache=True)
+def _log_likelihood(x, idx, default, on, data):
+    # data: N_0, N_1, E_0, E_1, log C(N, N_1), Gamma_obs, sigma_Gamma,
+    #       alpha_bound, m_phi_bound, cosmology constant
+    ll = 0.0
+    if on[0]:
+        z = _param(x, idx, default, 0) * (data[3] - data[2])
+        log_p1 = _log_sigmoid(z)
+        ll += data[4] + data[1] * log_p1 + data[0] * (log_p1 - z)
+    if on[1]:
+        g = _param(x, idx, default, 1)
+        s = math.sin(_param(x, idx, default, 2))
+        pred = GAMMA_SM + g * g * s * s * GAMMA_0
+        r = (data[5] - pred) / data[6]
+        ll += -0.5 * r * r - math.log(data[6]) - _LOG_SQRT_2PI
+    if on[2]:
+        if _param(x, idx, default, 3) > data[7] or _param(x, idx, default, 4) < data[8]:
+            return -np.inf
+    if on[3]:
+        ll += data[9]
+    return ll
+
+
+@njit(cache=True)
+def _log_posterior(x, ptype, pa, pb, idx, default, on, data):
+    lp = _log_prior(x, ptype, pa, pb)
+    if not np.isfinite(lp):
+        return -np.inf
+    ll = _log_likelihood(x, idx, default, on, data)
+    if not np.isfinite(ll):
+        return -np.inf
+    return lp + ll
+
+
+@njit(cache=True)
+def _log_posterior_batch(X, ptype, pa, pb, idx, default, on, data):
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        out[i] = _log_posterior(X[i], ptype, pa, pb, idx, default, on, data)
+    return out
+
+
+@njit(cache=True)
+def _log_likelihood_batch(X, idx, default, on, data):
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        out[i] = _log_likelihood(X[i], idx, default, on, data)
+    return out
+
+
+@njit(cache=True)
+def _grad_log_prior(x, ptype, pa, pb, grad):
+    # adds d log prior / dx into grad (zero inside uniform bounds)
+    for k in range(x.shape[0]):
+        t = ptype[k]
+        if t == 1:
+            grad[k] -= (x[k] - pa[k]) / pb[k]**2
+        elif t == 3:
+            grad[k] -= ((math.log(x[k]) - pa[k]) / pb[k]**2 + 1.0) / x[k]
+
+
+@njit(cache=True)
+def _grad_log_likelihood(x, idx, default, on, data, grad):
+    # adds d log likelihood / dx into grad for the sampled likelihood
+    # parameters; the fifth-force truncation and cosmology are flat
+    if on[0] and idx[0] >= 0:
+        dE = data[3] - data[2]
+        p1 = 1.0 / (1.0 + math.exp(-x[idx[0]] * dE))
+        grad[idx[0]] += dE * (data[1] - (data[0] + data[1]) * p1)
+    if on[1] and (idx[1] >= 0 or idx[2] >= 0):
+        g = _param(x, idx, default, 1)
+        th = _param(x, idx, default, 2)
+        s = math.sin(th)
+        pred = GAMMA_SM + g * g * s * s * GAMMA_0
+        dpred = (data[5] - pred) / data[6]**2
+        if idx[1] >= 0:
+            grad[idx[1]] += dpred * 2.0 * g * s * s * GAMMA_0
+        if idx[2] >= 0:
+            grad[idx[2]] += dpred * g * g * math.sin(2.0 * th) * GAMMA_0
+
+
+@njit(cache=True)
+def _log_posterior_grad(x, grad, ptype, pa, pb, idx, default, on, data):
+    grad[:] = 0.0
+    lp = _log_posterior(x, ptype, pa, pb, idx, default, on, data)
+    if np.isfinite(lp):
+        _grad_log_prior(x, ptype, pa, pb, grad)
+        _grad_log_likelihood(x, idx, default, on, data, grad)
+    return lp
+
+
+@njit(cache=True)
+def _metropolis(x0, scale, n_samples, n_warmup, seed,
+                ptype, pa, pb, idx, default, on, data):
+    np.random.seed(seed)
+    d = x0.shape[0]
+    samples = np.empty((n_samples, d))
+    log_post = np.empty(n_samples)
+    x = x0.copy()
+    prop = np.empty(d)
+    cur = _log_posterior(x, ptype, pa, pb, idx, default, on, data)
+    accepted = 0
+    for i in range(n_samples + n_warmup):
+        for k in range(d):
+            prop[k] = x[k] + scale[k] * np.random.standard_normal()
+        new = _log_posterior(prop, ptype, pa, pb, idx, default, on, data)
+        # nan (-inf - -inf) rejects, as exp(nan) did
+        if math.log(np.random.random()) < new - cur:
+            x[:] = prop
+            cur = new
+            accepted += 1
+        if i >= n_warmup:
+            samples[i - n_warmup] = x
+            log_post[i - n_warmup] = cur
+    return samples, log_post, accepted
+
+
+class CompiledPosterior:
+    """
+    Flat-vector view of an MQGT_SCF_Inference posterior.
+
+    Parameters:
+    -----------
+    names : sequence of str
+        Parameter order of x
+    priors : dict
+        `MQGT_SCF_Inference.priors`
+    data : dict
+        `MQGT_SCF_Inference.data` (channel name -> data dict)
+    channels : sequence of str
+        Active channels
+    """
+
+    def __init__(self, names: Sequence[str], priors: Dict, data: Dict,
+                 channels: Sequence[str]):
+        self.names = list(names)
+        d = len(self.names)
+        self.ptype = np.zeros(d, dtype=np.int64)
+        self.pa = np.zeros(d)
+        self.pb = np.ones(d)
+        for k, name in enumerate(self.names):
+            prior = priors.get(name)
+            if prior is None:
+                continue
+            self.ptype[k] = PRIOR_CODES[prior['type']]
+            if prior['type'] == 'uniform':
+                self.pa[k], self.pb[k] = prior['low'], prior['high']
+            else:
+                self.pa[k], self.pb[k] = prior['mean'], prior['std']
+
+        self.idx = np.array([self.names.index(p) if p in self.names else -1
+                             for p in LIKELIHOOD_PARAMS], dtype=np.int64)
+        self.default = np.array(LIKELIHOOD_DEFAULTS, dtype=float)
+        self.on = np.array([c in channels for c in CHANNELS])
+        self.data = np.zeros(10)
+        if 'qrng' in channels:
+            q = data['qrng']
+            N_0, N_1 = float(q['N_0']), float(q['N_1'])
+            self.data[:5] = (N_0, N_1, q.get('E_0', 0.0), q.get('E_1', 1.0),
+                             gammaln(N_0 + N_1 + 1) - gammaln(N_0 + 1) - gammaln(N_1 + 1))
+        if 'higgs' in channels:
+            h = data['higgs']
+            self.data[5] = h['Gamma_inv']
+            self.data[6] = h.get('sigma_Gamma', 0.1 * h['Gamma_inv'])
+        if 'fifth_force' in channels:
+            f = data['fifth_force']
+            self.data[7] = f.get('alpha_bound', 1e-10)
+            self.data[8] = f.get('m_phi_bound', 1e-4)
+        if 'cosmology' in channels:
+            c = data['cosmology']
+            sigma_w = c.get('sigma_w', 0.1)
+            r = (c.get('w_obs', -1.0) + 1.0) / sigma_w
+            self.data[9] = -0.5 * r * r - math.log(sigma_w) - _LOG_SQRT_2PI
+
+    @property
+    def ndim(self) -> int:
+        return len(self.names)
+
+    @property
+    def _packs(self):
+        return (self.ptype, self.pa, self.pb, self.idx, self.default, self.on, self.data)
+
+    def log_prior(self, x: np.ndarray) -> float:
+        return _log_prior(np.asarray(x, dtype=float), self.ptype, self.pa, self.pb)
+
+    def log_likelihood(self, x: np.ndarray) -> float:
+        return _log_likelihood(np.asarray(x, dtype=float), self.idx, self.default,
+                               self.on, self.data)
+
+    def log_likelihood_batch(self, X: np.ndarray) -> np.ndarray:
+        """Log-likelihood at each row of X (n, d)."""
+        return _log_likelihood_batch(np.ascontiguousarray(X, dtype=float), self.idx,
+                                     self.default, self.on, self.data)
+
+    def logp(self, x: np.ndarray) -> float:
+        """Log-posterior at one parameter vector."""
+        return _log_posterior(np.asarray(x, dtype=float), *self._packs)
+
+    def logp_batch(self, X: np.ndarray) -> np.ndarray:
+        """Log-posterior at each row of X (n, d)."""
+        return _log_posterior_batch(np.ascontiguousarray(X, dtype=float), *self._packs)
+
+    def logp_grad(self, x: np.ndarray):
+        """Log-posterior and its analytic gradient (d,) at x."""
+        x = np.asarray(x, dtype=float)
+        grad = np.empty_like(x)
+        return _log_posterior_grad(x, grad, *self._packs), grad
+
+    def to_vector(self, params: Dict) -> np.ndarray:
+        return np.array([params[name] for name in self.names], dtype=float)
+
+    def to_dict(self, x: np.ndarray) -> Dict:
+        return {name: x[..., k] for k, name in enumerate(self.names)}
+
+    def sample_prior(self, n: int, rng: np.random.Generator,
+                     fixed: np.ndarray) -> np.ndarray:
+        """
+        n draws (n, d) from the priors; parameters without a prior are set
+        to their entry of `fixed`.
+        """
+        X = np.tile(np.asarray(fixed, dtype=float), (n, 1))
+        for k, t in enumerate(self.ptype):
+            if t == 1:
+                X[:, k] = rng.normal(self.pa[k], self.pb[k], n)
+            elif t == 2:
+                if not np.isfinite(self.pa[k]) or not np.isfinite(self.pb[k]):
+                    raise ValueError(f"Cannot draw from the improper prior of {self.names[k]}")
+                X[:, k] = rng.uniform(self.pa[k], self.pb[k], n)
+            elif t == 3:
+                X[:, k] = np.exp(rng.normal(self.pa[k], self.pb[k], n))
+        return X
+
+    def prior_transform(self, U: np.ndarray, fixed: np.ndarray) -> np.ndarray:
+        """
+        Map unit-cube points U (n, d) to parameters distributed as the
+        priors (inverse CDFs); parameters without a prior take `fixed`.
+        """
+        U = np.asarray(U, dtype=float)
+        X = np.broadcast_to(np.asarray(fixed, dtype=float), U.shape).copy()
+        for k, t in enumerate(self.ptype):
+            if t == 1:
+                X[:, k] = self.pa[k] + self.pb[k] * ndtri(U[:, k])
+            elif t == 2:
+                if not np.isfinite(self.pa[k]) or not np.isfinite(self.pb[k]):
+                    raise ValueError(f"Improper prior for {self.names[k]} has no transform")
+                X[:, k] = self.pa[k] + (self.pb[k] - self.pa[k]) * U[:, k]
+            elif t == 3:
+                X[:, k] = np.exp(self.pa[k] + self.pb[k] * ndtri(U[:, k]))
+        return X
+
+    def metropolis(self, x0: np.ndarray, scale: np.ndarray, n_samples: int,
+                   n_warmup: int = 0, seed: int = 0) -> Dict:
+        """
+        Random-walk Metropolis chain compiled end to end.
+
+        Returns:
+        --------
+        result : dict
+            samples (n_samples, d), log_post (n_samples,), acceptance
+        """
+        samples, log_post, accepted = _metropolis(
+            np.asarray(x0, dtype=float), np.asarray(scale, dtype=float),
+            int(n_samples), int(n_warmup), int(seed), *self._packs)
+        return {
+            'samples': samples,
+            'log_post': log_post,
+            'acceptance': accepted / max(1, n_samples + n_warmup),
+        }
@@ -3,12 +3,92 @@ Multi-Channel Joint Inference Pipeline for MQGT-SCF
 Bayesian framework for parameter estimation across all experimental channels
 """
 
+import inspect
 import numpy as np
 import scipy.stats as stats
 from scipy.optimize import minimize
 from typing import Dict, List, Tuple, Optional
 import matplotlib.pyplot as plt
 from mqgt_scf_simulation import MQGT_SCF_Simulator
+from mqgt_posterior import CHANNELS as COMPILED_CHANNELS, CompiledPosterior, _grad_log_prior
+from mqgt_channels import CHANNELS
+from mqgt_chains import run_chains
+from mqgt_stretch import stretch_sample
+from mqgt_hmc import Transform, hmc_sample
+from mqgt_nested import nested_sample
+
+
+# step of the central differences for channels registered without a gradient
+_FD_STEP = np.sqrt(np.finfo(float).eps)
+
+
+class _RegistryPosterior(CompiledPosterior):
+    """
+    CompiledPosterior evaluated through the engine's channel registry, for
+    channels without a compiled kernel. Densities go through
+    `log_posterior_batch`; gradients combine the compiled prior gradient
+    with the channel gradients (central differences of the likelihood when
+    a channel registered none); the Metropolis chain is a Python loop over
+    the same densities. Slower than the compiled kernels, same interface.
+    """
+
+    def __init__(self, engine: 'MQGT_SCF_Inference', names: List[str]):
+        compiled = [c for c in engine.channels if c in COMPILED_CHANNELS]
+        super().__init__(names, engine.priors, engine.data, compiled)
+        self.engine = engine
+
+    def log_likelihood_batch(self, X: np.ndarray) -> np.ndarray:
+        return self.engine.log_likelihood_batch(self.to_dict(np.atleast_2d(X)))
+
+    def logp_batch(self, X: np.ndarray) -> np.ndarray:
+        return self.engine.log_posterior_batch(self.to_dict(np.atleast_2d(X)))
+
+    def log_likelihood(self, x: np.ndarray) -> float:
+        return float(self.log_likelihood_batch(np.asarray(x, dtype=float))[0])
+
+    def logp(self, x: np.ndarray) -> float:
+        return float(self.logp_batch(np.asarray(x, dtype=float))[0])
+
+    def logp_grad(self, x: np.ndarray):
+        x = np.asarray(x, dtype=float)
+        grad = np.zeros_like(x)
+        lp = self.logp(x)
+        if not np.isfinite(lp):
+            return lp, grad
+        _grad_log_prior(x, self.ptype, self.pa, self.pb, grad)
+        try:
+            grad += self.to_vector(self.engine.log_likelihood_grad(self.to_dict(x))[1])
+        except NotImplementedError:
+            h = _FD_STEP * np.maximum(np.abs(x), 1.0)
+            ll = self.log_likelihood_batch(np.concatenate([x + np.diag(h), x - np.diag(h)]))
+            grad += (ll[:len(x)] - ll[len(x):]) / (2 * h)
+        return lp, grad
+
+    def metropolis(self, x0: np.ndarray, scale: np.ndarray, n_samples: int,
+                   n_warmup: int = 0, seed: int = 0) -> Dict:
+        rng = np.random.default_rng(seed)
+        x = np.array(x0, dtype=float)
+        scale = np.asarray(scale, dtype=float)
+        samples = np.empty((n_samples, len(x)))
+        log_post = np.empty(n_samples)
+        cur = self.logp(x)
+        accepted = 0
+        for i in range(n_samples + n_warmup):
+            prop = x + scale * rng.standard_normal(len(x))
+            new = self.logp(prop)
+            # nan (-inf - -inf) rejects, as in the compiled chain
+            if np.log(rng.random()) < new - cur:
+                x, cur = prop, new
+                accepted += 1
+            if i >= n_warmup:
+                samples[i - n_warmup] = x
+                log_post[i - n_warmup] = cur
+        return {
+            'samples': samples,
+            'log_post': log_post,
+            'acceptance': accepted / max(1, n_samples + n_warmup),
+        }
+
 
 class MQGT_SCF_Inference:
     """
@@ -84,14 +164,24 @@ class MQGT_SCF_Inference:
         Parameters:
         -----------
         channel_name : str
-            'qrng', 'higgs', 'fifth_force', 'cosmology'
+            'qrng', 'higgs', 'fifth_force', 'cosmology' or any channel
+            registered with mqgt_channels.register_channel
         data : dict
-            Experimental data (counts, measurements, etc.)
+            Experimental data (counts, measurements, etc.); replace it with
+            a new call rather than mutating it in place (log_likelihood_batch
+            caches compare data by identity)
         """
         self.data[channel_name] = data
         if channel_name not in self.channels:
             self.channels.append(channel_name)
     
+    @staticmethod
+    def _channel_value(name: str, data: Dict, **params) -> float:
+        # likelihood_* evaluate the registered densities (mqgt_channels), the
+        # same code as log_likelihood_batch
+        args = {p: np.array([v], dtype=float) for p, v in params.items()}
+        return float(np.ravel(CHANNELS[name].loglik(data, **args))[0])
+    
     def likelihood_qrng(self, eta: float, data: Dict) -> float:
         """
         Likelihood for QRNG channel (Channel 1).
@@ -107,26 +197,7 @@ class MQGT_SCF_Inference:
         --------
         log_likelihood : float
         """
-        N_0 = data['N_0']
-        N_1 = data['N_1']
-        E_0 = data.get('E_0', 0.0)
-        E_1 = data.get('E_1', 1.0)
-        
-        # Expected probabilities
-        P_0_standard = 0.5
-        P_1_standard = 0.5
-        
-        # Ethically weighted
-        amplitudes = np.array([P_0_standard, P_1_standard])
-        E_values = np.array([E_0, E_1])
-        unnormalized = amplitudes * np.exp(eta * E_values)
-        P_1 = unnormalized[1] / np.sum(unnormalized)
-        P_0 = 1 - P_1
-        
-        # Binomial likelihood
-        log_likelihood = stats.binom.logpmf(N_1, N_0 + N_1, P_1)
-        
-        return log_likelihood
+        return self._channel_value('qrng', data, eta=eta)
     
     def likelihood_higgs(self, g_phi: float, theta: float, data: Dict) -> float:
         """
@@ -145,18 +216,7 @@ class MQGT_SCF_Inference:
         --------
         log_likelihood : float
         """
-        Gamma_obs = data['Gamma_inv']
-        sigma_Gamma = data.get('sigma_Gamma', 0.1 * Gamma_obs)
-        
-        # Forward model
-        Gamma_SM = 4.07e-3
-        Gamma_0 = 1e-3
-        Gamma_pred = Gamma_SM + g_phi**2 * np.sin(theta)**2 * Gamma_0
-        
-        # Gaussian likelihood
-        log_likelihood = stats.norm.logpdf(Gamma_obs, loc=Gamma_pred, scale=sigma_Gamma)
-        
-        return log_likelihood
+        return self._channel_value('higgs', data, g_phi=g_phi, theta=theta)
     
     def likelihood_fifth_force(self, alpha: float, m_phi: float, 
                                data: Dict) -> float:
@@ -176,17 +236,7 @@ class MQGT_SCF_Inference:
         --------
         log_likelihood : float
         """
-        # Simplified: assume null result gives upper bound
-        # More sophisticated: use actual force measurements
-        alpha_bound = data.get('alpha_bound', 1e-10)
-        m_phi_bound = data.get('m_phi_bound', 1e-4)
-        
-        # Truncated likelihood (penalize if exceeds bounds)
-        if alpha > alpha_bound or m_phi < m_phi_bound:
-            return -np.inf
-        
-        # Flat likelihood within bounds (null result)
-        return 0.0
+        return self._channel_value('fifth_force', data, alpha=alpha, m_c=m_phi)
     
     def likelihood_cosmology(self, params: Dict, data: Dict) -> float:
         """
@@ -203,17 +253,7 @@ class MQGT_SCF_Inference:
         --------
         log_likelihood : float
         """
-        # Simplified: compare predicted w(z) to observations
-        # Full implementation would use actual survey data
-        w_obs = data.get('w_obs', -1.0)
-        sigma_w = data.get('sigma_w', 0.1)
-        
-        # Placeholder: would compute w(z) from field evolution
-        w_pred = -1.0  # Dark energy-like
-        
-        log_likelihood = stats.norm.logpdf(w_obs, loc=w_pred, scale=sigma_w)
-        
-        return log_likelihood
+        return self._channel_value('cosmology', data)
     
     def log_prior(self, params: Dict) -> float:
         """
@@ -266,30 +306,121 @@ class MQGT_SCF_Inference:
         --------
         log_likelihood : float
         """
-        log_likelihood = 0.0
+        batch = {name: np.array([value], dtype=float) for name, value in params.items()}
+        return float(self.log_likelihood_batch(batch)[0])
+    
+    def log_likelihood_batch(self, params: Dict[str, np.ndarray],
+                             cache: Optional[Dict] = None) -> np.ndarray:
+        """
+        Joint log-likelihood at a batch of points, one pass per channel.
         
-        # Channel 1: QRNG
-        if 'qrng' in self.channels:
-            eta = params.get('eta', 0.0)
-            log_likelihood += self.likelihood_qrng(eta, self.data['qrng'])
+        Every registered channel with data (mqgt_channels.CHANNELS) is
+        evaluated on the arrays of its declared parameters (channel
+        defaults for parameters not given).
         
-        # Channel 2: Higgs portal
-        if 'higgs' in self.channels:
-            g_phi = params.get('g_phi', 0.0)
-            theta = params.get('theta', 0.0)
-            log_likelihood += self.likelihood_higgs(g_phi, theta, self.data['higgs'])
+        A caller-owned `cache` dict (start with {}) lets repeated calls skip
+        channels whose data object and parameter arrays are all unchanged
+        since the previous call with that dict, e.g. a costly registered
+        channel while only the cosmology parameters move. The check compares
+        the arrays, so it only pays off for channels that are expensive
+        compared to the closed-form built-ins.
         
-        # Channel 3: Fifth force
-        if 'fifth_force' in self.channels:
-            alpha = params.get('alpha', 0.0)
-            m_phi = params.get('m_c', 1e-4)  # Use m_c as proxy
-            log_likelihood += self.likelihood_fifth_force(alpha, m_phi, self.data['fifth_force'])
+        Parameters:
+        -----------
+        params : dict
+            Parameter name -> array (n,) (scalars broadcast)
+        cache : dict, optional
+            Channel -> (data, parameter arrays, log-likelihoods), updated
+            in place
+            
+        Returns:
+        --------
+        log_likelihood : array (n,)
+        """
+        arrays = [np.asarray(v, dtype=float) for v in params.values()]
+        n = np.broadcast_shapes(*[a.shape for a in arrays])[0] if arrays else 1
+        total = np.zeros(n)
+        for name in self.channels:
+            channel = CHANNELS.get(name)
+            if channel is None:
+                continue
+            data = self.data[name]
+            args = {p: np.broadcast_to(np.asarray(params.get(p, channel.defaults[p]),
+                                                  dtype=float), (n,))
+                    for p in channel.params}
+            cached = None if cache is None else cache.get(name)
+            if (cached is not None and cached[0] is data
+                    and all(np.array_equal(a, cached[1][p]) for p, a in args.items())):
+                values = cached[2]
+            else:
+                values = np.array(np.broadcast_to(channel.loglik(data, **args), (n,)),
+                                  dtype=float)
+                if cache is not None:
+                    cache[name] = (data, {p: a.copy() for p, a in args.items()}, values)
+            total += values
+        return total
+    
+    def log_likelihood_grad(self, params: Dict) -> Tuple[float, Dict[str, float]]:
+        """
+        Joint log-likelihood and its gradient from the channel gradients.
         
-        # Channel 4: Cosmology
-        if 'cosmology' in self.channels:
-            log_likelihood += self.likelihood_cosmology(params, self.data['cosmology'])
+        Parameters:
+        -----------
+        params : dict
+            Parameter values
+            
+        Returns:
+        --------
+        log_likelihood : float
+        grad : dict
+            Parameter -> d log L / d parameter (for the parameters in params)
+        """
+        grad = {name: 0.0 for name in params}
+        batch = {name: np.array([value], dtype=float) for name, value in params.items()}
+        for name in self.channels:
+            channel = CHANNELS.get(name)
+            if channel is None:
+                continue
+            if channel.grad is None:
+                raise NotImplementedError(f"Channel {name!r} has no gradient")
+            args = {p: batch.get(p, np.array([channel.defaults[p]])) for p in channel.params}
+            for p, g in channel.grad(self.data[name], **args).items():
+                if p in grad:
+                    grad[p] += float(np.asarray(g)[0])
+        return self.log_likelihood(params), grad
+    
+    def log_posterior_batch(self, params: Dict[str, np.ndarray]) -> np.ndarray:
+        """Log-posterior at a batch of points (dict of arrays, as log_likelihood_batch)."""
+        arrays = {name: np.asarray(v, dtype=float) for name, v in params.items()}
+        n = np.broadcast_shapes(*[a.shape for a in arrays.values()])[0] if arrays else 1
+        log_prior = np.zeros(n)
+        for name, value in arrays.items():
+            prior = self.priors.get(name)
+            if prior is None:
+                continue
+            log_prior += self._log_prior_array(prior, np.broadcast_to(value, (n,)))
         
-        return log_likelihood
+        out = np.full(n, -np.inf)
+        ok = np.isfinite(log_prior)
+        if ok.any():
+            # likelihoods only where the prior allows the point
+            ll = self.log_likelihood_batch({name: np.broadcast_to(v, (n,))[ok]
+                                            for name, v in arrays.items()})
+            out[ok] = np.where(np.isfinite(ll), log_prior[ok] + ll, -np.inf)
+        return out
+    
+    @staticmethod
+    def _log_prior_array(prior: Dict, value: np.ndarray) -> np.ndarray:
+        # log density of one prior over an array of values
+        if prior['type'] == 'normal':
+            return stats.norm.logpdf(value, loc=prior['mean'], scale=prior['std'])
+        if prior['type'] == 'uniform':
+            return np.where((value < prior['low']) | (value > prior['high']), -np.inf, 0.0)
+        if prior['type'] == 'log_normal':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                lp = stats.lognorm.logpdf(value, s=prior['std'], scale=np.exp(prior['mean']))
+            return np.where(value > 0, lp, -np.inf)
+        return np.zeros(np.shape(value))
     
     def log_posterior(self, params: Dict) -> float:
         """
@@ -314,11 +445,46 @@ class MQGT_SCF_Inference:
         
         return log_prior + log_likelihood
     
+    def compile_posterior(self, names: Optional[List[str]] = None) -> CompiledPosterior:
+        """
+        Flat-vector, compiled form of `log_posterior` (see mqgt_posterior).
+
+        Registered channels without a compiled kernel (mqgt_channels) are
+        evaluated through the registry instead: the returned posterior has
+        the same interface, so every sampler works, but its densities,
+        gradients and Metropolis chain run in Python.
+
+        Parameters:
+        -----------
+        names : list of str, optional
+            Parameter order (default: the prior parameters)
+
+        Returns:
+        --------
+        posterior : CompiledPosterior
+        """
+        if names is None:
+            names = list(self.priors)
+        if all(c in COMPILED_CHANNELS for c in self.channels if c in CHANNELS):
+            return CompiledPosterior(names, self.priors, self.data, self.channels)
+        return _RegistryPosterior(self, names)
+
     def mcmc_sample(self, n_samples: int = 10000, n_warmup: int = 1000,
-                    initial_params: Optional[Dict] = None) -> Dict:
+                    initial_params: Optional[Dict] = None,
+                    seed: Optional[int] = None, cache=None) -> Dict:
         """
         MCMC sampling of posterior (simplified Metropolis-Hastings).
         
+        The chain runs on a flat parameter vector through the compiled
+        posterior of `compile_posterior`; only parameters with a prior are
+        perturbed.
+        
+        With a `cache` (mqgt_posterior_cache.PosteriorCache) the chain is
+        stored under a key of data, priors, sampler settings and code; a
+        repeated call is served from the cache, a shorter one from its
+        prefix, and a longer one only samples the missing draws, continuing
+        from the last stored state.
+        
         Parameters:
         -----------
         n_samples : int
@@ -327,57 +493,579 @@ class MQGT_SCF_Inference:
             Warmup samples to discard
         initial_params : dict, optional
             Starting point
+        seed : int, optional
+            Chain seed (default: drawn from np.random; required with cache)
+        cache : PosteriorCache, optional
+            Chain cache
             
         Returns:
         --------
         samples : dict
-            Parameter samples
+            Parameter samples (one array of length n_samples per parameter)
         """
-        # Simplified implementation
-        # Full version would use emcee, pymc3, or similar
-        
         if initial_params is None:
             initial_params = {name: prior.get('mean', 0.0) 
                             for name, prior in self.priors.items()}
         
-        samples = {name: [] for name in initial_params.keys()}
-        current_params = initial_params.copy()
-        current_log_post = self.log_posterior(current_params)
+        posterior = self.compile_posterior(list(initial_params))
+        x0 = posterior.to_vector(initial_params)
         
         # Proposal scale (would be adaptive in real implementation)
-        proposal_scale = {name: 0.1 * abs(val) if abs(val) > 0 else 0.01
-                          for name, val in initial_params.items()}
+        scale = np.where(np.abs(x0) > 0, 0.1 * np.abs(x0), 0.01)
+        scale *= [name in self.priors for name in posterior.names]
         
-        accepted = 0
+        if cache is not None:
+            return posterior.to_dict(self._cached_metropolis(
+                cache, posterior, x0, scale, n_samples, n_warmup, seed))
+        if seed is None:
+            seed = np.random.randint(2**31 - 1)
+        chain = posterior.metropolis(x0, scale, n_samples, n_warmup, seed)
+        print(f"MCMC acceptance rate: {chain['acceptance']:.2%}")
         
-        for i in range(n_samples + n_warmup):
-            # Propose new parameters
-            proposed_params = {}
-            for name, value in current_params.items():
-                if name in self.priors:
-                    scale = proposal_scale.get(name, 0.01)
-                    proposed_params[name] = value + np.random.normal(0, scale)
-                else:
-                    proposed_params[name] = value
+        return posterior.to_dict(chain['samples'])
+    
+    def _cached_metropolis(self, cache, posterior: CompiledPosterior, x0: np.ndarray,
+                           scale: np.ndarray, n_samples: int, n_warmup: int,
+                           seed: Optional[int]) -> np.ndarray:
+        if seed is None:
+            raise ValueError("A cached chain needs a fixed seed")
+        config = {'sampler': 'metropolis', 'names': list(posterior.names), 'x0': x0,
+                  'scale': scale, 'n_warmup': int(n_warmup), 'seed': int(seed)}
+        code = {inspect.getsourcefile(f) for f in
+                (MQGT_SCF_Inference, CompiledPosterior,
+                 *(CHANNELS[name].loglik for name in self.data if name in CHANNELS))}
+        key = cache.key(self.data, self.priors, config, sorted(code - {None}))
+        entry = cache.load(key)
+        
+        if entry is None:
+            chain = posterior.metropolis(x0, scale, n_samples, n_warmup, seed)
+            samples, log_post = chain['samples'], chain['log_post']
+            n_steps, n_accepted = n_samples + n_warmup, chain['acceptance'] * (n_samples + n_warmup)
+        else:
+            samples, log_post = entry['arrays']['samples'], entry['arrays']['log_post']
+            n_steps, n_accepted = entry['meta']['n_steps'], entry['meta']['n_accepted']
+            if len(samples) >= n_samples:
+                print(f"MCMC acceptance rate: {n_accepted / n_steps:.2%} (cached)")
+                return samples[:n_samples]
+            # continue from the last stored draw with a seed derived from the stored length
+            n_more = n_samples - len(samples)
+            sub_seed = int(np.random.SeedSequence([int(seed), len(samples)]).generate_state(1)[0])
+            chain = posterior.metropolis(samples[-1], scale, n_more, 0, sub_seed)
+            samples = np.concatenate([samples, chain['samples']])
+            log_post = np.concatenate([log_post, chain['log_post']])
+            n_steps, n_accepted = n_steps + n_more, n_accepted + chain['acceptance'] * n_more
+        
+        cache.store(key, {'samples': samples, 'log_post': log_post},
+                    {'names': list(posterior.names), 'n_samples': len(samples),
+                     'n_steps': n_steps, 'n_accepted': float(n_accepted)})
+        print(f"MCMC acceptance rate: {n_accepted / n_steps:.2%}")
+        return samples
+    
+    def mcmc_chains(self, n_chains: int = 4, n_warmup: int = 1000,
+                    block: int = 1000, max_samples: int = 100000,
+                    target_ess: float = 400.0, max_rhat: float = 1.01,
+                    initial_params: Optional[Dict] = None,
+                    processes: Optional[int] = 1,
+                    seed: Optional[int] = None) -> Dict:
+        """
+        Parallel Metropolis chains that stop at target ESS and R-hat.
+        
+        Same starting point and proposal scales as `mcmc_sample`; chains
+        run in blocks of `block` draws (see mqgt_chains.run_chains) until
+        every sampled parameter has ESS >= target_ess and split-R-hat
+        <= max_rhat, or max_samples draws per chain are kept.
+        
+        Parameters:
+        -----------
+        n_chains : int
+            Number of chains
+        n_warmup : int
+            Warmup samples to discard per chain
+        block : int
+            Draws per chain between convergence checks
+        max_samples : int
+            Upper limit on kept draws per chain
+        target_ess, max_rhat : float
+            Convergence targets
+        initial_params : dict, optional
+            Starting point (dispersed per chain)
+        processes : int, optional
+            Worker processes (None: one per CPU)
+        seed : int, optional
+            Root SeedSequence entropy
+            
+        Returns:
+        --------
+        result : dict
+            samples (parameter -> (n_chains, n) array), rhat / ess
+            (parameter -> float), acceptance, converged, history
+        """
+        if initial_params is None:
+            initial_params = {name: prior.get('mean', 0.0)
+                            for name, prior in self.priors.items()}
+        
+        posterior = self.compile_posterior(list(initial_params))
+        x0 = posterior.to_vector(initial_params)
+        scale = np.where(np.abs(x0) > 0, 0.1 * np.abs(x0), 0.01)
+        scale *= [name in self.priors for name in posterior.names]
+        
+        run = run_chains(posterior, x0, scale, n_chains=n_chains, n_warmup=n_warmup,
+                         block=block, max_samples=max_samples, target_ess=target_ess,
+                         max_rhat=max_rhat, processes=processes, seed=seed)
+        status = "converged" if run['converged'] else "not converged"
+        print(f"MCMC {n_chains} chains x {run['samples'].shape[1]} samples ({status}), "
+              f"acceptance {np.mean(run['acceptance']):.2%}")
+        
+        return {
+            'samples': posterior.to_dict(run['samples']),
+            'log_post': run['log_post'],
+            'rhat': dict(zip(posterior.names, run['rhat'])),
+            'ess': dict(zip(posterior.names, run['ess'])),
+            'acceptance': run['acceptance'],
+            'converged': run['converged'],
+            'history': run['history'],
+        }
+    
+    def ensemble_sample(self, n_samples: int = 2000, n_warmup: int = 500,
+                        n_walkers: Optional[int] = None,
+                        initial_params: Optional[Dict] = None,
+                        seed: Optional[int] = None) -> Dict:
+        """
+        Affine-invariant ensemble sampling (stretch move, see mqgt_stretch).
+        
+        Walkers start from prior draws (redrawn while the posterior is
+        zero), so no proposal scale has to be chosen.
+        
+        Parameters:
+        -----------
+        n_samples : int
+            Recorded ensemble states
+        n_warmup : int
+            Discarded ensemble states
+        n_walkers : int, optional
+            Ensemble size (default: max(32, 4 x number of parameters))
+        initial_params : dict, optional
+            Parameter set; entries without a prior are held fixed at their
+            value (default: the prior parameters)
+        seed : int, optional
+            Generator seed
             
-            # Evaluate posterior
-            proposed_log_post = self.log_posterior(proposed_params)
+        Returns:
+        --------
+        result : dict
+            samples (parameter -> (n_samples, n_walkers) array), log_post,
+            acceptance (per walker), ess (parameter -> float), n_evals
+        """
+        if initial_params is None:
+            initial_params = {name: prior.get('mean', 0.0)
+                            for name, prior in self.priors.items()}
+        
+        posterior = self.compile_posterior(list(initial_params))
+        if n_walkers is None:
+            n_walkers = max(32, 4 * posterior.ndim)
+        n_walkers += n_walkers % 2
+        
+        rng = np.random.default_rng(seed)
+        fixed = posterior.to_vector(initial_params)
+        X = posterior.sample_prior(n_walkers, rng, fixed)
+        lp = posterior.logp_batch(X)
+        for _ in range(100):
+            bad = ~np.isfinite(lp)
+            if not bad.any():
+                break
+            X[bad] = posterior.sample_prior(int(bad.sum()), rng, fixed)
+            lp[bad] = posterior.logp_batch(X[bad])
+        
+        run = stretch_sample(posterior.logp_batch, X, n_samples, n_warmup,
+                             seed=rng.integers(2**63))
+        print(f"Ensemble acceptance rate: {np.mean(run['acceptance']):.2%}")
+        
+        return {
+            'samples': posterior.to_dict(run['chain']),
+            'log_post': run['log_post'],
+            'acceptance': run['acceptance'],
+            'ess': dict(zip(posterior.names, run['ess'])),
+            'n_evals': run['n_evals'],
+        }
+    
+    def hmc_sample(self, n_samples: int = 2000, n_warmup: int = 1000,
+                   initial_params: Optional[Dict] = None, n_leapfrog: int = 16,
+                   target_accept: float = 0.8, seed: Optional[int] = None) -> Dict:
+        """
+        Hamiltonian Monte Carlo with analytic gradients (see mqgt_hmc).
+        
+        Prior parameters are sampled in unconstrained coordinates (log for
+        log-normal, logit for bounded uniform priors) with a diagonal mass
+        matrix started from the prior widths and adapted during warmup;
+        parameters without a prior stay fixed.
+        
+        Parameters:
+        -----------
+        n_samples : int
+            Number of samples
+        n_warmup : int
+            Adaptation samples to discard
+        initial_params : dict, optional
+            Starting point and fixed parameters (default: prior medians)
+        n_leapfrog : int
+            Leapfrog steps per trajectory
+        target_accept : float
+            Step-size adaptation target
+        seed : int, optional
+            Generator seed
             
-            # Metropolis acceptance
-            if np.random.rand() < np.exp(proposed_log_post - current_log_post):
-                current_params = proposed_params
-                current_log_post = proposed_log_post
-                accepted += 1
+        Returns:
+        --------
+        result : dict
+            samples (parameter -> array), log_post, accept_stat, step_size,
+            n_grad, n_divergent
+        """
+        posterior, x0, free, transform, width, logp_grad = self._unconstrained(initial_params)
+        
+        run = hmc_sample(logp_grad, transform.inverse(x0[free]),
+                         n_samples, n_warmup, n_leapfrog=n_leapfrog,
+                         inv_mass=np.square(width), target_accept=target_accept,
+                         seed=seed)
+        print(f"HMC acceptance statistic: {run['accept_stat']:.2%}, "
+              f"{run['n_divergent']} divergent")
+        
+        X = np.tile(x0, (n_samples, 1))
+        X[:, free] = transform.forward(run['samples'])
+        return {
+            'samples': posterior.to_dict(X),
+            'log_post': posterior.logp_batch(X),
+            'accept_stat': run['accept_stat'],
+            'step_size': run['step_size'],
+            'n_grad': run['n_grad'],
+            'n_divergent': run['n_divergent'],
+        }
+    
+    def fit_laplace(self, initial_params: Optional[Dict] = None,
+                    confidence: float = 0.95, n_check: int = 2000,
+                    min_ess_fraction: float = 0.7,
+                    seed: Optional[int] = None) -> Dict:
+        """
+        Laplace approximation around the MAP (no MCMC).
+        
+        The MAP is found with L-BFGS and analytic gradients in the
+        unconstrained coordinates of `hmc_sample` (log / logit for bounded
+        priors), where the posterior is closest to Gaussian; the Hessian
+        there comes from central differences of the analytic gradient.
+        Credible intervals are Gaussian quantiles mapped back through the
+        transform, so they respect the parameter bounds.
+        
+        The approximation is checked by importance sampling n_check draws
+        of the Gaussian against the exact posterior: if the normalised
+        importance weights have an effective sample size below
+        min_ess_fraction * n_check, or the Hessian is not negative
+        definite, 'mcmc_needed' is set.
+        
+        Parameters:
+        -----------
+        initial_params : dict, optional
+            Optimiser start and fixed parameters (default: prior medians)
+        confidence : float
+            Credible level of the intervals
+        n_check : int
+            Importance-sampling draws for the diagnostic
+        min_ess_fraction : float
+            Diagnostic threshold
+        seed : int, optional
+            Seed of the diagnostic draws
             
-            # Store sample (after warmup)
-            if i >= n_warmup:
-                for name, value in current_params.items():
-                    samples[name].append(value)
+        Returns:
+        --------
+        result : dict
+            map (parameter -> value), intervals (as compute_credible_intervals,
+            median = MAP of the unconstrained Gaussian), cov (unconstrained
+            coordinates), cov_x (delta-method covariance of the parameters),
+            std (parameter -> float), log_post, log_evidence (Laplace),
+            diagnostic (ess_fraction, positive_definite, optimizer_success,
+            mcmc_needed)
+        """
+        posterior, x0, free, transform, width, logp_grad = self._unconstrained(initial_params)
+        names = [name for name, f in zip(posterior.names, free) if f]
+        u0 = transform.inverse(x0[free])
         
-        acceptance_rate = accepted / (n_samples + n_warmup)
-        print(f"MCMC acceptance rate: {acceptance_rate:.2%}")
+        # optimise in prior-width units so eta ~1e-5 and g_phi ~1e-2 are alike;
+        # outside the support a large finite value lets the line search back off
+        lp0 = logp_grad(u0)[0]
+        if not np.isfinite(lp0):
+            raise ValueError("Initial point has zero posterior density")
+        wall = 1e10 + 10.0 * abs(lp0)
         
-        return samples
+        def objective(v):
+            lp, grad = logp_grad(u0 + width * v)
+            if not np.isfinite(lp):
+                return wall, np.zeros_like(v)
+            return -lp, -grad * width
+        
+        opt = minimize(objective, np.zeros(len(u0)), jac=True, method='L-BFGS-B')
+        u_map = u0 + width * opt.x
+        lp_map = -opt.fun
+        
+        # Hessian by central differences of the analytic gradient
+        d = len(u_map)
+        H = np.empty((d, d))
+        for k in range(d):
+            h = 1e-4 * width[k]
+            step = np.zeros(d)
+            step[k] = h
+            H[k] = (logp_grad(u_map + step)[1] - logp_grad(u_map - step)[1]) / (2 * h)
+        H = 0.5 * (H + H.T)
+        try:
+            chol = np.linalg.cholesky(-H)
+            positive_definite = True
+        except np.linalg.LinAlgError:
+            positive_definite = False
+        
+        x_map = transform.forward(u_map)
+        z = stats.norm.ppf(0.5 + confidence / 2)
+        result = {
+            'map': dict(zip(names, x_map)),
+            'log_post': lp_map,
+            'success': bool(opt.success),
+            'message': str(opt.message),
+        }
+        if not positive_definite:
+            result['diagnostic'] = {'ess_fraction': 0.0, 'positive_definite': False,
+                                    'optimizer_success': bool(opt.success),
+                                    'mcmc_needed': True}
+            print("Laplace approximation failed (Hessian not negative definite); use MCMC")
+            return result
+        
+        cov = np.linalg.inv(-H)
+        sd = np.sqrt(np.diag(cov))
+        jac = np.ones(d)
+        jac[transform.codes == 1] = x_map[transform.codes == 1]
+        logit = transform.codes == 2
+        s = (x_map[logit] - transform.low[logit]) / (transform.high[logit] - transform.low[logit])
+        jac[logit] = (transform.high[logit] - transform.low[logit]) * s * (1 - s)
+        cov_x = cov * np.outer(jac, jac)
+        lower = transform.forward(u_map - z * sd)
+        upper = transform.forward(u_map + z * sd)
+        
+        # importance-sampling check of the Gaussian against the posterior
+        rng = np.random.default_rng(seed)
+        U = u_map + rng.standard_normal((n_check, d)) @ np.linalg.inv(chol)
+        X = np.tile(x0, (n_check, 1))
+        X[:, free] = transform.forward(U)
+        log_target = posterior.logp_batch(X) + transform.log_jacobian(U)
+        log_q = -0.5 * np.sum(((U - u_map) @ chol)**2, axis=1)
+        log_w = np.where(np.isfinite(log_target), log_target - log_q, -np.inf)
+        w = np.exp(log_w - np.max(log_w))
+        ess_fraction = float(np.sum(w)**2 / np.sum(w**2) / n_check)
+        mcmc_needed = ess_fraction < min_ess_fraction or not opt.success
+        
+        result.update({
+            'intervals': {name: {'median': x_map[k], 'lower': lower[k], 'upper': upper[k],
+                                 'confidence': confidence}
+                          for k, name in enumerate(names)},
+            'cov': cov,
+            'cov_x': cov_x,
+            'std': dict(zip(names, np.sqrt(np.diag(cov_x)))),
+            'log_evidence': lp_map + 0.5 * d * np.log(2 * np.pi)
+                            - np.sum(np.log(np.diag(chol))),
+            'diagnostic': {'ess_fraction': ess_fraction, 'positive_definite': True,
+                           'optimizer_success': bool(opt.success),
+                           'mcmc_needed': mcmc_needed},
+        })
+        if mcmc_needed:
+            print(f"Laplace approximation poor (importance ESS {ess_fraction:.0%}); use MCMC")
+        return result
+    
+    def nested_sample(self, n_live: int = 400, n_parallel: Optional[int] = None,
+                      initial_params: Optional[Dict] = None, walk_steps: int = 25,
+                      dlogz: float = 0.01, seed: Optional[int] = None) -> Dict:
+        """
+        Log-evidence by nested sampling (see mqgt_nested).
+        
+        The prior parameters are drawn through their inverse-CDF prior
+        transforms (all priors must be proper); parameters in
+        initial_params without a prior are held fixed, so e.g. the eta = 0
+        model is `initial_params={'eta': 0.0, ...}` on an engine without
+        an eta prior. Compare runs with mqgt_nested.bayes_factor.
+        
+        Parameters:
+        -----------
+        n_live : int
+            Live points
+        n_parallel : int, optional
+            Live points replaced per iteration (default: n_live // 10)
+        initial_params : dict, optional
+            Parameter set and fixed values (default: the prior parameters)
+        walk_steps : int
+            Constrained random-walk steps per replacement
+        dlogz : float
+            Stopping tolerance on log Z
+        seed : int, optional
+            Generator seed
+            
+        Returns:
+        --------
+        result : dict
+            log_evidence, log_evidence_err, information, samples
+            (parameter -> array), weights, n_calls, n_iter
+        """
+        if initial_params is None:
+            initial_params = {name: self._prior_median(prior)
+                            for name, prior in self.priors.items()}
+        
+        posterior = self.compile_posterior(list(initial_params))
+        fixed = posterior.to_vector(initial_params)
+        free = np.array([name in self.priors for name in posterior.names])
+        
+        def transform(U):
+            X = np.tile(fixed, (len(U), 1))
+            X[:, free] = U
+            return posterior.prior_transform(X, fixed)
+        
+        run = nested_sample(posterior.log_likelihood_batch, transform, int(free.sum()),
+                            n_live=n_live, n_parallel=n_parallel, walk_steps=walk_steps,
+                            dlogz=dlogz, seed=seed)
+        print(f"log Z = {run['log_evidence']:.3f} +/- {run['log_evidence_err']:.3f} "
+              f"({run['n_calls']} likelihood calls)")
+        
+        run['samples'] = posterior.to_dict(run['samples'])
+        return run
+    
+    def _unconstrained(self, initial_params: Optional[Dict] = None):
+        """
+        Compiled posterior over the prior parameters in unconstrained
+        coordinates: (posterior, x0, free mask, Transform, prior widths,
+        logp_grad(u)). Parameters without a prior are fixed at x0.
+        """
+        if initial_params is None:
+            initial_params = {name: self._prior_median(prior)
+                            for name, prior in self.priors.items()}
+        
+        posterior = self.compile_posterior(list(initial_params))
+        x0 = posterior.to_vector(initial_params)
+        free = np.array([name in self.priors for name in posterior.names])
+        codes, low, high, width = [], [], [], []
+        for name in np.array(posterior.names)[free]:
+            prior = self.priors[name]
+            bounded = (prior['type'] == 'uniform' and np.isfinite(prior['low'])
+                       and np.isfinite(prior['high']))
+            codes.append('logit' if bounded else
+                         'log' if prior['type'] == 'log_normal' else 'identity')
+            low.append(prior['low'] if bounded else 0.0)
+            high.append(prior['high'] if bounded else 1.0)
+            width.append(prior['std'] if prior['type'] != 'uniform' else 1.0)
+        transform = Transform(codes, low, high)
+        
+        def logp_grad(x_free):
+            x = x0.copy()
+            x[free] = x_free
+            lp, grad = posterior.logp_grad(x)
+            return lp, grad[free]
+        
+        return posterior, x0, free, transform, np.array(width), transform.wrap(logp_grad)
+    
+    @staticmethod
+    def _prior_median(prior: Dict) -> float:
+        if prior['type'] == 'uniform':
+            return 0.5 * (prior['low'] + prior['high'])
+        if prior['type'] == 'log_normal':
+            return float(np.exp(prior['mean']))
+        return prior['mean']
+    
+    def reweight(self, samples: Dict, data: Optional[Dict] = None,
+                 priors: Optional[Dict] = None, min_ess_fraction: float = 0.1,
+                 rerun: bool = True, seed: Optional[int] = None,
+                 **mcmc_kwargs) -> Dict:
+        """
+        Importance-reweight posterior samples to updated data or priors.
+        
+        The weight of each draw is the ratio of the updated to the current
+        posterior. Only the changed channel likelihoods and priors are
+        evaluated, over the whole sample array at once. If the effective
+        sample size of the weights (Kish: 1 / sum w^2) falls below
+        min_ess_fraction of the draws, the reweighted sample cannot be
+        trusted; with `rerun` the posterior is then resampled with
+        `mcmc_sample` under the updated data and priors (through the
+        registry fallback of `compile_posterior` for custom channels). The
+        engine itself is not modified.
+        
+        Parameters:
+        -----------
+        samples : dict
+            Parameter arrays of one common shape, e.g. from mcmc_sample,
+            mcmc_chains (chains, n) or ensemble_sample (n, walkers); the
+            leading axes are flattened into one draw axis
+        data : dict, optional
+            Channel name -> updated data
+        priors : dict, optional
+            Parameter -> replacement prior (as in self.priors)
+        min_ess_fraction : float
+            ESS / n below which the weights count as collapsed
+        rerun : bool
+            Resample when the weights collapse
+        seed : int, optional
+            Seed of the rerun
+        mcmc_kwargs : dict
+            Further mcmc_sample arguments of the rerun (n_warmup, ...)
+            
+        Returns:
+        --------
+        result : dict
+            samples (flattened), weights (normalised), log_weights, ess,
+            ess_fraction, mean and std (weighted, per parameter), rerun (True if the
+            samples were redrawn, with uniform weights)
+        """
+        data, priors = data or {}, priors or {}
+        shapes = {np.shape(v) for v in samples.values()}
+        if len(shapes) != 1:
+            raise ValueError(f"Sample arrays differ in shape: {sorted(shapes)}")
+        arrays = {name: np.asarray(v, dtype=float).reshape(-1) for name, v in samples.items()}
+        n = len(next(iter(arrays.values())))
+        
+        log_w = np.zeros(n)
+        for name, new in data.items():
+            channel = CHANNELS.get(name)
+            if channel is None:
+                raise ValueError(f"No registered likelihood for channel {name!r}")
+            args = {p: np.broadcast_to(arrays.get(p, channel.defaults[p]), (n,))
+                    for p in channel.params}
+            log_w += channel.loglik(new, **args)
+            if name in self.data:
+                log_w -= channel.loglik(self.data[name], **args)
+        for name, prior in priors.items():
+            if name not in arrays:
+                continue
+            log_w += self._log_prior_array(prior, arrays[name])
+            if name in self.priors:
+                log_w -= self._log_prior_array(self.priors[name], arrays[name])
+        
+        log_w = np.where(np.isnan(log_w), -np.inf, log_w)
+        if np.isfinite(log_w).any():
+            w = np.exp(log_w - np.max(log_w))
+            w /= w.sum()
+            ess = float(1.0 / np.sum(w**2))
+        else:
+            w, ess = np.zeros(n), 0.0
+        
+        result = {'samples': arrays, 'weights': w, 'log_weights': log_w,
+                  'ess': ess, 'ess_fraction': ess / n, 'rerun': False}
+        if ess < min_ess_fraction * n:
+            print(f"Reweighting ESS {ess / n:.1%} below {min_ess_fraction:.0%}")
+            if rerun:
+                updated = MQGT_SCF_Inference(self.sim)
+                updated.priors = {**self.priors, **priors}
+                for name in self.channels + [c for c in data if c not in self.channels]:
+                    updated.add_channel_data(name, data.get(name, self.data.get(name)))
+                initial = mcmc_kwargs.pop('initial_params', None) or {
+                    name: float(np.median(a)) for name, a in arrays.items()}
+                result['samples'] = updated.mcmc_sample(n_samples=n, initial_params=initial,
+                                                        seed=seed, **mcmc_kwargs)
+                result['weights'] = np.full(n, 1.0 / n)
+                result['rerun'] = True
+        
+        result['mean'] = {name: float(np.sum(result['weights'] * a))
+                          for name, a in result['samples'].items()}
+        result['std'] = {name: float(np.sqrt(np.sum(result['weights'] * (a - result['mean'][name])**2)))
+                         for name, a in result['samples'].items()}
+        return result
     
     def compute_credible_intervals(self, samples: Dict, 
                                    confidence: float = 0.95) -> Dict:
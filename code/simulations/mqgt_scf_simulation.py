@@ -5,9 +5,68 @@ Canonical implementation for field dynamics and experimental predictions
 
 import numpy as np
 import scipy.integrate as integrate
-from scipy.special import erf
+import scipy.sparse as sparse
+from scipy.special import erf, logsumexp
 from typing import Tuple, Callable, Optional
 import matplotlib.pyplot as plt
+from numba import njit
+
+# Integrators that use a Jacobian (and hence benefit from jac_sparsity)
+IMPLICIT_METHODS = ('BDF', 'Radau', 'LSODA')
+
+# Record layouts of the batched forward models
+QRNG_DTYPE = np.dtype([
+    ('N_0', 'i8'), ('N_1', 'i8'), ('N_total', 'i8'), ('T', 'f8'), ('E_T', 'f8'),
+    ('P_0', 'f8'), ('P_1', 'f8'), ('eta', 'f8'),
+])
+HIGGS_DTYPE = np.dtype([
+    ('Gamma_inv', 'f8'), ('Gamma_SM', 'f8'), ('Gamma_excess', 'f8'),
+    ('g_phi', 'f8'), ('theta', 'f8'),
+])
+FIFTH_FORCE_DTYPE = np.dtype([
+    ('r', 'f8'), ('alpha', 'f8'), ('m_phi', 'f8'), ('V', 'f8'),
+])
+
+
+@njit(cache=True)
+def _canon_A_accel(phi, E, a_phi, a_E, N, inv_dx2, m_c2, lambda_c, m_E2,
+                   lambda_E, lambda_int, periodic):
+    """
+    Canon-A accelerations (∂²Φc/∂t², ∂²E/∂t²) written into a_phi, a_E.
+
+    3-point Laplacian; periodic or reflecting (zero-flux) boundaries.
+    """
+    for i in range(N):
+        if periodic:
+            im = (i - 1) % N
+            ip = (i + 1) % N
+        else:
+            im = 1 if i == 0 else i - 1
+            ip = N - 2 if i == N - 1 else i + 1
+        lap_phi = (phi[ip] - 2.0 * phi[i] + phi[im]) * inv_dx2
+        lap_E = (E[ip] - 2.0 * E[i] + E[im]) * inv_dx2
+        a_phi[i] = lap_phi - (m_c2 * phi[i] + lambda_c * phi[i]**3) - lambda_int * E[i]
+        a_E[i] = lap_E - (m_E2 * E[i] + lambda_E * E[i]**3) - lambda_int * phi[i]
+
+
+@njit(cache=True)
+def _canon_A_rhs(y, out, N, inv_dx2, m_c2, lambda_c, m_E2, lambda_E,
+                 lambda_int, periodic):
+    """Canon-A right-hand side written into `out` (no temporaries)."""
+    out[:N] = y[N:2*N]
+    out[2*N:3*N] = y[3*N:]
+    _canon_A_accel(y[:N], y[2*N:3*N], out[N:2*N], out[3*N:], N, inv_dx2,
+                   m_c2, lambda_c, m_E2, lambda_E, lambda_int, periodic)
+    return out
+
+
+def _laplacian_stencil(N: int, periodic: bool) -> sparse.csr_matrix:
+    """Sparsity pattern of the 1-D 3-point Laplacian."""
+    lap = sparse.diags([1, 1, 1], [-1, 0, 1], shape=(N, N), format='lil', dtype=np.int8)
+    if periodic and N > 2:
+        lap[0, N - 1] = 1
+        lap[N - 1, 0] = 1
+    return lap.tocsr()
 
 class MQGT_SCF_Simulator:
     """
@@ -102,36 +161,130 @@ class MQGT_SCF_Simulator:
         d = np.where(d > 1e-10, d, 1e-10)  # Avoid division by zero
         return np.exp(-m_K * d) / d
     
+    def kernel_scale(self, kernel: str = 'gaussian') -> float:
+        """ell_K for the Gaussian kernel, m_K for the Yukawa kernel."""
+        return self.params['ell_K'] if kernel == 'gaussian' else self.params.get('m_K', 1.0)
+    
+    def nonlocal_term(self, field: np.ndarray, spacing, kernel: str = 'gaussian') -> np.ndarray:
+        """
+        Nonlocal Canon-B term κ ∫K(x,x')Φ(x')dx' on a periodic grid.
+        
+        FFT convolution with the kernel spectrum cached per ell_K / m_K
+        (see mqgt_kernels); O(N log N) instead of pairwise O(N²).
+        """
+        from mqgt_kernels import convolve_periodic
+        
+        return self.params['kappa'] * convolve_periodic(
+            field, kernel, self.kernel_scale(kernel), spacing)
+    
     def field_equations_canon_A(self, t: float, y: np.ndarray, 
-                                x_grid: np.ndarray) -> np.ndarray:
+                                x_grid: np.ndarray, out: Optional[np.ndarray] = None,
+                                bc: str = 'neumann') -> np.ndarray:
         """
         Field equations for Canon-A.
         
-        Returns time derivatives of (Φc, ∂Φc/∂t, E, ∂E/∂t)
+        Returns time derivatives of (Φc, ∂Φc/∂t, E, ∂E/∂t), laid out as
+        y = [Φc, ∂Φc/∂t, E, ∂E/∂t] with N points each. Uses a compiled
+        3-point Laplacian (1D, uniform grid).
+        
+        Parameters:
+        -----------
+        out : array, optional
+            Preallocated length-4N output; written in place and returned
+        bc : str
+            'neumann' (reflecting, zero-flux) or 'periodic' boundaries
         """
-        N = len(x_grid)
-        phi_c = y[:N]
-        dphi_c_dt = y[N:2*N]
-        E = y[2*N:3*N]
-        dE_dt = y[3*N:]
+        if out is None:
+            out = np.empty(4 * len(x_grid))
+        return _canon_A_rhs(y, out, *self._canon_A_args(x_grid, bc))
+    
+    def canon_A_jac_sparsity(self, N: int, bc: str = 'neumann') -> sparse.csr_matrix:
+        """
+        Sparsity pattern of the Canon-A Jacobian d(dy/dt)/dy (4N x 4N).
         
-        # Laplacian (1D for simplicity, extendable to 3D)
+        Block structure for y = [Φc, Π_Φ, E, Π_E]: identity couplings
+        Φc<-Π_Φ and E<-Π_E, tridiagonal (3-point Laplacian + local potential)
+        Π_Φ<-Φc and Π_E<-E, diagonal cross terms Π_Φ<-E and Π_E<-Φc.
+        """
+        eye = sparse.identity(N, format='csr')
+        lap = _laplacian_stencil(N, bc == 'periodic')
+        return sparse.bmat([
+            [None, eye, None, None],
+            [lap, None, eye, None],
+            [None, None, None, eye],
+            [eye, None, lap, None],
+        ], format='csr')
+    
+    def _canon_A_args(self, x_grid: np.ndarray, bc: str) -> tuple:
+        p = self.params
         dx = x_grid[1] - x_grid[0]
-        laplacian_phi = np.gradient(np.gradient(phi_c, dx), dx)
-        laplacian_E = np.gradient(np.gradient(E, dx), dx)
+        return (len(x_grid), 1.0 / dx**2, p['m_c']**2, p['lambda_c'],
+                p['m_E']**2, p['lambda_E'], p['lambda_int'], bc == 'periodic')
+    
+    def hamiltonian_density(self, y: np.ndarray, x_grid: np.ndarray,
+                            bc: str = 'neumann', psi: Optional[np.ndarray] = None,
+                            pi_psi: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Hamiltonian density of state(s) y = [Φc, ∂Φc/∂t, E, ∂E/∂t].
         
-        # Potential derivatives
-        dV_dphi = self.params['m_c']**2 * phi_c + self.params['lambda_c'] * phi_c**3
-        dV_dE = self.params['m_E']**2 * E + self.params['lambda_E'] * E**3
+        h = ½Π² + ½(∇Φ)² + V(Φc) + V(E) + λ_int Φc E, from `potential_phi_c`
+        and `potential_E`. Each squared link gradient is split between its
+        two end points and reflecting boundaries carry trapezoid weights, so
+        that Σ h dx is the energy the 3-point Laplacian of
+        `field_equations_canon_A` conserves. `y` may be (4N,) or (4N, T).
         
-        # Interaction terms
-        lambda_int = self.params['lambda_int']
+        Passing the Canon-B oversoul field `psi` (and its momentum) adds
+        ½|Π_ω|² + ½|∇Ψω|² + V_ω(|Ψω|²) + αΦc²E² + (βΦc + γE) ReΨω; the
+        nonlocal kernel term is not local and is left out.
+        """
+        N = len(x_grid)
+        dx = x_grid[1] - x_grid[0]
+        p = self.params
+        phi, pi_phi, E, pi_E = (y[k*N:(k+1)*N] for k in range(4))
+        w = np.ones(N)
+        if bc != 'periodic':
+            w[[0, -1]] = 0.5
+        w = w.reshape((N,) + (1,) * (y.ndim - 1))
         
-        # Equations of motion
-        d2phi_dt2 = laplacian_phi - dV_dphi - lambda_int * E
-        d2E_dt2 = laplacian_E - dV_dE - lambda_int * phi_c
+        def gradient_energy(u):
+            if bc == 'periodic':
+                link = np.abs(np.roll(u, -1, axis=0) - u)**2
+                return 0.25 * (link + np.roll(link, 1, axis=0)) / dx**2
+            link = np.abs(np.diff(u, axis=0))**2
+            out = np.zeros(u.shape)
+            out[:-1] += link
+            out[1:] += link
+            return 0.25 * out / dx**2
+        
+        density = w * (0.5 * (pi_phi**2 + pi_E**2) + self.potential_phi_c(phi)
+                       + self.potential_E(E) + p['lambda_int'] * phi * E)
+        density += gradient_energy(phi) + gradient_energy(E)
+        if psi is not None:
+            local = (self.potential_omega(psi) + p['alpha'] * phi**2 * E**2
+                     + (p['beta'] * phi + p['gamma'] * E) * np.real(psi))
+            if pi_psi is not None:
+                local = local + 0.5 * np.abs(pi_psi)**2
+            density += w * local + gradient_energy(psi)
+        return density
+    
+    def energy_canon_A(self, y: np.ndarray, x_grid: np.ndarray,
+                       bc: str = 'neumann') -> np.ndarray:
+        """
+        Total Canon-A energy Σ h dx of state(s) y (see `hamiltonian_density`).
+        """
+        dx = x_grid[1] - x_grid[0]
+        return dx * self.hamiltonian_density(y, x_grid, bc).sum(axis=0)
+    
+    def canon_B_engine(self, shape: Tuple[int, ...], spacing,
+                       kernel: str = 'gaussian') -> 'CanonBEngine':
+        """
+        Canon-B (Φc, E, Ψω) evolution engine on a periodic grid.
+        
+        See mqgt_canon_b.CanonBEngine; uses this simulator's parameters.
+        """
+        from mqgt_canon_b import CanonBEngine
         
-        return np.concatenate([dphi_c_dt, d2phi_dt2, dE_dt, d2E_dt2])
+        return CanonBEngine(self.params, shape, spacing, kernel=kernel)
     
     def ethically_weighted_born_rule(self, amplitudes: np.ndarray, 
                                      E_values: np.ndarray) -> np.ndarray:
@@ -150,9 +303,35 @@ class MQGT_SCF_Simulator:
         probabilities : array
             Modified probabilities
         """
-        eta = self.params['eta']
-        unnormalized = amplitudes * np.exp(eta * E_values)
-        return unnormalized / np.sum(unnormalized)
+        return self.born_rule_batch(amplitudes, E_values)
+    
+    def born_rule_batch(self, amplitudes: np.ndarray, E_values: np.ndarray,
+                        eta=None) -> np.ndarray:
+        """
+        Ethically weighted Born rule for many experiments at once.
+        
+        Outcomes run along the last axis; leading axes of amplitudes,
+        E_values and eta broadcast. Normalised in log space (logsumexp), so
+        large eta * E does not overflow.
+        
+        Parameters:
+        -----------
+        amplitudes : array (..., K)
+            |c_i|² (need not be normalised; zeros give probability 0)
+        E_values : array (..., K)
+            Ethical values E_i
+        eta : float or array (...), optional
+            Coupling per experiment (default: params['eta'])
+            
+        Returns:
+        --------
+        probabilities : array (..., K)
+        """
+        eta = self.params['eta'] if eta is None else np.asarray(eta, dtype=float)
+        with np.errstate(divide='ignore'):
+            logw = np.log(np.asarray(amplitudes, dtype=float)) \
+                + np.expand_dims(eta, -1) * np.asarray(E_values, dtype=float)
+        return np.exp(logw - logsumexp(logw, axis=-1, keepdims=True))
     
     def qrng_forward_model(self, N_trials: int, E_0: float, E_1: float) -> dict:
         """
@@ -203,6 +382,50 @@ class MQGT_SCF_Simulator:
             'eta': eta
         }
     
+    def qrng_forward_batch(self, N_trials, E_0, E_1, eta=None, rng=None) -> np.ndarray:
+        """
+        QRNG forward model (Channel 1) for many experiments in one call.
+        
+        N_trials, E_0, E_1 and eta broadcast against each other; each element
+        is one simulated experiment, as in `qrng_forward_model`.
+        
+        Parameters:
+        -----------
+        N_trials : int or array
+            Trials per experiment
+        E_0, E_1 : float or array
+            Ethical labels for outcomes 0 and 1
+        eta : float or array, optional
+            Coupling (default: params['eta'])
+        rng : numpy Generator, optional
+            Source of the binomial draws (default: global np.random)
+            
+        Returns:
+        --------
+        result : structured array of QRNG_DTYPE, broadcast shape
+        """
+        eta = self.params['eta'] if eta is None else eta
+        N_trials, E_0, E_1, eta = np.broadcast_arrays(
+            np.asarray(N_trials, dtype=np.int64), np.asarray(E_0, dtype=float),
+            np.asarray(E_1, dtype=float), np.asarray(eta, dtype=float))
+        probs = self.born_rule_batch(np.full(N_trials.shape + (2,), 0.5),
+                                     np.stack([E_0, E_1], axis=-1), eta)
+        draw = np.random if rng is None else rng
+        N_1 = np.asarray(draw.binomial(N_trials, probs[..., 1]), dtype=np.int64)
+        N_0 = N_trials - N_1
+        
+        out = np.empty(N_trials.shape, dtype=QRNG_DTYPE)
+        out['N_0'] = N_0
+        out['N_1'] = N_1
+        out['N_total'] = N_trials
+        valid = (N_0 > 0) & (N_1 > 0)
+        out['T'] = np.where(valid, np.log(np.where(valid, N_1, 1) / np.where(valid, N_0, 1)), 0.0)
+        out['E_T'] = eta * (E_1 - E_0)
+        out['P_0'] = probs[..., 0]
+        out['P_1'] = probs[..., 1]
+        out['eta'] = eta
+        return out
+    
     def higgs_portal_forward_model(self, g_phi: float, theta: float) -> dict:
         """
         Forward model for Higgs portal mixing (Channel 2).
@@ -232,6 +455,22 @@ class MQGT_SCF_Simulator:
             'theta': theta
         }
     
+    def higgs_portal_batch(self, g_phi, theta) -> np.ndarray:
+        """
+        Higgs portal forward model (Channel 2) broadcast over g_phi and theta.
+        
+        Returns:
+        --------
+        result : structured array of HIGGS_DTYPE, broadcast shape
+        """
+        g_phi, theta = np.broadcast_arrays(np.asarray(g_phi, dtype=float),
+                                           np.asarray(theta, dtype=float))
+        single = self.higgs_portal_forward_model(g_phi, theta)
+        out = np.empty(g_phi.shape, dtype=HIGGS_DTYPE)
+        for name in HIGGS_DTYPE.names:
+            out[name] = single[name]
+        return out
+    
     def fifth_force_potential(self, r: np.ndarray, alpha: float, 
                               m_phi: float) -> np.ndarray:
         """
@@ -260,9 +499,29 @@ class MQGT_SCF_Simulator:
         
         return V_newton * (1 + V_yukawa)
     
+    def fifth_force_batch(self, r, alpha, m_phi) -> np.ndarray:
+        """
+        Fifth-force potential broadcast over r, alpha and m_phi.
+        
+        Returns:
+        --------
+        result : structured array of FIFTH_FORCE_DTYPE, broadcast shape
+        """
+        r, alpha, m_phi = np.broadcast_arrays(np.asarray(r, dtype=float),
+                                              np.asarray(alpha, dtype=float),
+                                              np.asarray(m_phi, dtype=float))
+        out = np.empty(r.shape, dtype=FIFTH_FORCE_DTYPE)
+        out['r'] = r
+        out['alpha'] = alpha
+        out['m_phi'] = m_phi
+        out['V'] = self.fifth_force_potential(r, alpha, m_phi)
+        return out
+    
     def solve_field_equations(self, t_span: Tuple[float, float], 
                              initial_conditions: np.ndarray,
-                             x_grid: np.ndarray) -> dict:
+                             x_grid: np.ndarray, method: str = 'RK45',
+                             bc: str = 'neumann', stream=None, chunk: int = 64,
+                             monitor=None, **solver_kwargs) -> dict:
         """
         Solve field equations numerically.
         
@@ -274,24 +533,166 @@ class MQGT_SCF_Simulator:
             Initial field values
         x_grid : array
             Spatial grid
+        method : str
+            Any `solve_ivp` method; for 'BDF', 'Radau' and 'LSODA' the
+            banded Jacobian sparsity is passed so stiff solves stay cheap
+        bc : str
+            'neumann' or 'periodic' boundaries
+        stream : path-like, optional
+            Directory to stream y(t_eval) into (see mqgt_trajectory) instead
+            of keeping the trajectory in memory; requires `t_eval`
+        chunk : int
+            Output rows between flushes when streaming
+        monitor : StabilityMonitor, optional
+            Energy / amplitude checks every `cadence` accepted steps; aborts
+            with FieldHealthError on blow-up (no CFL margin: the adaptive
+            step size is controlled by the solver)
+        solver_kwargs : dict
+            Extra `solve_ivp` arguments (rtol, atol, t_eval, ...)
             
         Returns:
         --------
         solution : dict
-            Contains time evolution, etc.
+            Contains time evolution, etc. When streaming, `y` is a lazy
+            (4N x T) memory-mapped view and `trajectory` the Trajectory handle
         """
+        N = len(x_grid)
+        buf = np.empty(4 * N)
+        
         def rhs(t, y):
-            return self.field_equations_canon_A(t, y, x_grid)
+            # SciPy solvers keep references to returned derivatives, so hand
+            # back a copy of the in-place buffer
+            return self.field_equations_canon_A(t, y, x_grid, out=buf, bc=bc).copy()
         
-        sol = integrate.solve_ivp(rhs, t_span, initial_conditions, 
-                                 method='RK45', dense_output=True)
+        on_step = None
+        if monitor is not None:
+            monitor.start()
+            n_steps = [0]
+            
+            def on_step(t, y):
+                # called once per accepted step (as a solve_ivp event that
+                # never fires), so trial stages are not monitored
+                if monitor.due(n_steps[0]):
+                    monitor.observe(n_steps[0], t, y, self.energy_canon_A(y, x_grid, bc))
+                n_steps[0] += 1
+                return 1.0
         
-        return {
-            't': sol.t,
-            'y': sol.y,
-            'success': sol.success,
-            'message': sol.message
+        if method in IMPLICIT_METHODS and 'jac' not in solver_kwargs:
+            solver_kwargs.setdefault('jac_sparsity', self.canon_A_jac_sparsity(N, bc))
+        if stream is not None:
+            t_eval = solver_kwargs.pop('t_eval', None)
+            if t_eval is None:
+                raise ValueError("Streaming output needs t_eval (the output cadence)")
+            from mqgt_trajectory import stream_solve
+            
+            traj = stream_solve(rhs, t_span, initial_conditions, t_eval, stream,
+                                method=method, chunk=chunk,
+                                meta={'N': N, 'bc': bc, 'variant': self.variant},
+                                on_step=on_step, **solver_kwargs)
+            result = {
+                't': traj.t[:len(traj)],
+                'y': traj.y[:len(traj)].T,
+                'success': traj.success,
+                'message': traj.meta['message'],
+                'trajectory': traj
+            }
+        else:
+            if on_step is not None:
+                events = solver_kwargs.get('events')
+                events = [] if events is None else list(np.atleast_1d(events))
+                solver_kwargs['events'] = events + [on_step]
+            sol = integrate.solve_ivp(rhs, t_span, initial_conditions, 
+                                     method=method, **solver_kwargs)
+            result = {
+                't': sol.t,
+                'y': sol.y,
+                'success': sol.success,
+                'message': sol.message
+            }
+        if monitor is not None:
+            result['health'] = monitor.history()
+        return result
+
+    
+    def evolve_symplectic(self, t_span: Tuple[float, float],
+                          initial_conditions: np.ndarray, x_grid: np.ndarray,
+                          dt: Optional[float] = None, order: int = 2,
+                          bc: str = 'neumann', save_every: int = 1,
+                          monitor=None) -> dict:
+        """
+        Fixed-step symplectic evolution of Canon-A (leapfrog or Yoshida-4).
+        
+        Parameters:
+        -----------
+        t_span : tuple
+            (t_start, t_end); dt is shrunk slightly to land on t_end
+        initial_conditions : array
+            Initial state [Φc, ∂Φc/∂t, E, ∂E/∂t]
+        x_grid : array
+            Uniform spatial grid
+        dt : float, optional
+            Step size (default: params['dt']); must satisfy the CFL limit
+        order : int
+            2 (Störmer-Verlet leapfrog) or 4 (Yoshida composition)
+        bc : str
+            'neumann' or 'periodic' boundaries
+        save_every : int
+            Keep every n-th step in the output
+        monitor : StabilityMonitor, optional
+            Energy / amplitude / CFL checks at its cadence; aborts with
+            FieldHealthError on blow-up (see mqgt_monitor)
+            
+        Returns:
+        --------
+        solution : dict
+            t, y (4N x n_saved), energy per snapshot, energy_drift (max
+            relative deviation), n_rhs, success, message (and health, the
+            monitor history, when monitored)
+        """
+        from mqgt_symplectic import evolve, max_substep
+        
+        N = len(x_grid)
+        dx = x_grid[1] - x_grid[0]
+        t0, t1 = t_span
+        dt = self.params['dt'] if dt is None else dt
+        n_steps = max(1, int(np.ceil((t1 - t0) / dt - 1e-12)))
+        dt = (t1 - t0) / n_steps
+        if dt * max_substep(order) >= dx:
+            raise ValueError(f"dt={dt:g} violates the CFL limit for dx={dx:g} "
+                             f"(order {order} needs dt < {dx / max_substep(order):g})")
+        
+        if monitor is not None:
+            monitor.start(cfl_margin=1.0 - dt * max_substep(order) / dx)
+        args = self._canon_A_args(x_grid, bc)
+        
+        def accel(q, out):
+            _canon_A_accel(q[:N], q[N:], out[:N], out[N:], *args)
+        
+        def energy(q, p):
+            return self.energy_canon_A(np.concatenate([q[:N], p[:N], q[N:], p[N:]]),
+                                       x_grid, bc)
+        
+        y0 = np.asarray(initial_conditions, dtype=float)
+        q0 = np.concatenate([y0[:N], y0[2*N:3*N]])
+        p0 = np.concatenate([y0[N:2*N], y0[3*N:]])
+        res = evolve(accel, q0, p0, dt, n_steps, order=order,
+                     save_every=save_every, energy=energy, monitor=monitor)
+        
+        q, p = res['q'].T, res['p'].T
+        y = np.concatenate([q[:N], p[:N], q[N:], p[N:]])
+        success = bool(np.all(np.isfinite(y)))
+        result = {
+            't': t0 + res['t'],
+            'y': y,
+            'energy': res['energy'],
+            'energy_drift': res['energy_drift'],
+            'n_rhs': res['n_accel'],
+            'success': success,
+            'message': 'Integration finished.' if success else 'Non-finite field values.'
         }
+        if monitor is not None:
+            result['health'] = monitor.history()
+        return result
 
 
 # Example usage and testing
@@ -12,7 +12,7 @@ class ZoraLearner:
                  alloc_step=0.001, pulse_step=0.005,
                  alloc_min=0.0005, alloc_max=0.02,
                  pulse_min=0.0, pulse_max=0.08,
-                 cost_alloc=0.2, cost_pulse=0.1):
+                 cost_alloc=0.2, cost_pulse=0.1, rng=None):
         self.alloc = alloc
         self.pulse = pulse
         self.alloc_step = alloc_step
@@ -27,6 +27,8 @@ class ZoraLearner:
         self.trial = None  # (trial_alloc, trial_pulse)
         self.in_trial = False
         self.r_smooth = None
+        # proposal randomness; np.random unless a seeded Generator is given
+        self.rng = np.random if rng is None else rng
 
     def reward(self, target_phiE, other_phiE, coh_mean):
         # Goal: make target basin beat the other, keep coherence high, pay energy-cost for interventions
@@ -39,8 +41,8 @@ class ZoraLearner:
 
     def propose(self):
         # small random perturbations
-        da = (np.random.choice([-1, 1]) * self.alloc_step)
-        dp = (np.random.choice([-1, 1]) * self.pulse_step)
+        da = (self.rng.choice([-1, 1]) * self.alloc_step)
+        dp = (self.rng.choice([-1, 1]) * self.pulse_step)
         ta = float(np.clip(self.alloc + da, self.alloc_min, self.alloc_max))
         tp = float(np.clip(self.pulse + dp, self.pulse_min, self.pulse_max))
         return ta, tp
@@ -80,6 +82,13 @@ def laplacian(Z):
     return result
 
 
+@njit
+def seed_step_noise(seed):
+    # numba keeps its own RNG state for np.random inside jitted code;
+    # seed it so step() noise is reproducible per run seed
+    np.random.seed(seed)
+
+
 @njit
 def clamp01(x):
     return 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
@@ -251,13 +260,17 @@ def step(rho, phi, eth, kappa,
 # ----------------------------
 def collapse_events(rho, phi, eth, kappa,
                     num_events, kappa_bias, rng,
-                    horizon_radius):
+                    horizon_radius, recorder=None, tick=0, stats=None):
     """
     Each event chooses between two outcomes A/B at a random cell:
       A: locally increases order (rho smoothing + tiny phi boost)
       B: locally increases disorder (rho spikes + phi drop)
     Probability biased by exp(kappa_bias * phi * eth)
     Tracks statistics separately for events near and far from black hole horizon.
+    If a recorder (mqgt_event_log.EventRecorder) is given, every event is also
+    logged as (tick, i, j, outcome, pA); if stats (mqgt_collapse_stats.CollapseStats)
+    is given, per-cell and per-radial-bin counts are accumulated as well, from
+    the tick's event arrays in one call after the loop.
     """
     h, w = rho.shape
     cx, cy = h // 2, w // 2
@@ -265,8 +278,14 @@ def collapse_events(rho, phi, eth, kappa,
     count_B = 0
     near_A = near_total = 0
     far_A = far_total = 0
+    log_events = recorder is not None or stats is not None
+    if log_events:
+        ev_i = np.empty(num_events, dtype=np.int64)
+        ev_j = np.empty(num_events, dtype=np.int64)
+        ev_out = np.empty(num_events, dtype=np.uint8)
+        ev_pA = np.empty(num_events, dtype=np.float64)
     
-    for _ in range(num_events):
+    for n in range(num_events):
         i = rng.integers(0, h)
         j = rng.integers(0, w)
 
@@ -283,7 +302,11 @@ def collapse_events(rho, phi, eth, kappa,
         r2 = (i - cx)**2 + (j - cy)**2
         near = r2 < horizon_radius**2
 
-        if rng.random() < pA:
+        is_A = rng.random() < pA
+        if log_events:
+            ev_i[n], ev_j[n], ev_out[n], ev_pA[n] = i, j, is_A, pA
+
+        if is_A:
             count_A += 1
             # Outcome A: coherence-supporting
             if near:
@@ -307,6 +330,11 @@ def collapse_events(rho, phi, eth, kappa,
             phi[i, j] = np.clip(phi[i, j] - 0.03, 0, 1)
             eth[i, j] = np.clip(eth[i, j] - 0.02, 0, 1)
 
+    if recorder is not None:
+        recorder.append(tick, ev_i, ev_j, ev_out, ev_pA)
+    if stats is not None:
+        stats.add(ev_i, ev_j, ev_out.astype(bool))
+
     return rho, phi, eth, kappa, count_A, count_B, near_A, near_total, far_A, far_total
 
 
@@ -318,6 +346,7 @@ GAIN_PHI = 0.004
 LEAK_E = 0.002
 GAIN_E = 0.004
 GAP_EPS = 0.01  # hysteresis threshold
+RENDER_BUDGET = 0.1  # max fraction of wall time spent on the live view
 
 
 # ----------------------------
@@ -396,19 +425,11 @@ def main():
     near_A_total = near_total_total = 0
     far_A_total = far_total_total = 0
 
-    # Visualization
+    # Visualization (blitted, decimated to screen size, adaptive refresh)
+    from mqgt_render import LiveRenderer
     plt.ion()
-    fig, axs = plt.subplots(2, 2, figsize=(9, 8))
-    ims = []
     titles = ["Matter ρ", "Consciousness Φc", "Ethics E", "Curvature κ"]
-    fields = [rho, phi, eth, kappa]
-
-    for ax, title, field in zip(axs.ravel(), titles, fields):
-        im = ax.imshow(field, origin="lower", interpolation="nearest")
-        ax.set_title(title)
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ims.append(im)
+    view = LiveRenderer([rho, phi, eth, kappa], titles, budget=RENDER_BUDGET)
 
     steps = 1500
     for t in range(steps):
@@ -510,38 +531,36 @@ def main():
                 phi, eth = zora_allocate(phi, eth, PHI_BUDGET, E_BUDGET, B_mask, alloc_frac=zora.alloc)
                 rho, phi, eth = zora_pulse(rho, phi, eth, bx, by, radius=5, pulse=zora.pulse)
 
-        # Render
-        if t % 10 == 0:
-            ims[0].set_data(rho)
-            ims[1].set_data(phi)
-            ims[2].set_data(eth)
-            ims[3].set_data(kappa)
-
-            # autoscale lightly
-            for im in ims:
-                im.set_clim(0.0, 1.0)
-
+        # Render (the renderer decides when a refresh fits its time budget)
+        if view.due():
             if ZORA_ON:
                 zora_tag = f"ZORA={ZORA_MODE} alloc={zora.alloc:.4f} pulse={zora.pulse:.3f} bestR={zora.best_reward:.3f}"
             else:
                 zora_tag = "ZORA=OFF"
-            fig.suptitle(
+            view.update(
+                [rho, phi, eth, kappa],
                 f"step {t} | bias={collapse_bias} | {zora_tag} | "
                 f"Aglob={A_rate:.3f} | Anear={near_rate:.3f} | Afar={far_rate:.3f} | "
-                f"coh={coh_mean:.3f} | A(phiE)={A_phiE:.3f} B(phiE)={B_phiE:.3f}"
+                f"coh={coh_mean:.3f} | A(phiE)={A_phiE:.3f} B(phiE)={B_phiE:.3f}",
+                force=True
             )
-            plt.pause(0.001)
 
     plt.ioff()
     plt.show()
 
 
-def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
+def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue",
+             leak=None, N=160, eta_tel=0.10, lam_coh=0.16, beta_phi_geom=0.20,
+             event_log=None,
+             collapse_stats=False, radial_edges=None, collapse_engine=None,
+             monitor=None):
     global ZORA_MODE
     ZORA_MODE = zora_mode
-    # Use same N as main
-    N = 160
+    # leak=None keeps the module-level budgets (as set by sweep_leak)
+    leak_phi = LEAK_PHI if leak is None else leak
+    leak_e = LEAK_E if leak is None else leak
     rng = np.random.default_rng(seed)
+    seed_step_noise(seed)
     rho = rng.random((N, N)).astype(np.float64) * 0.25
     phi = np.zeros((N, N), dtype=np.float64)
     eth = np.zeros((N, N), dtype=np.float64)
@@ -564,13 +583,13 @@ def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
     B_mask = basin_mask((N, N), bx, by, radius=18)
     
     # Zora learner
-    zora = ZoraLearner(alloc=0.004, pulse=0.02)
+    zora = ZoraLearner(alloc=0.004, pulse=0.02, rng=rng)
     
     # dynamics params (match your main)
     dt = 0.08
     D_rho, D_phi, D_eth = 0.22, 0.18, 0.12
-    alpha_grav, beta_phi_geom = 0.35, 0.20
-    lam_coh, lam_ent, eta_tel = 0.16, 0.10, 0.10
+    alpha_grav = 0.35
+    lam_ent = 0.10
     noise_rho, noise_phi, noise_eth = 0.002, 0.001, 0.001
     collapse_per_step = 40
     horizon_radius = 16
@@ -578,6 +597,31 @@ def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
     A_total = B_total = 0
     nearA_total = near_total = 0
     farA_total = far_total = 0
+
+    # optional per-event log (new directory path) for offline reanalysis;
+    # EventRecorder refuses a directory that already holds a run
+    recorder = None
+    if event_log is not None:
+        from mqgt_event_log import EventRecorder
+        recorder = EventRecorder(event_log, meta={
+            "shape": [N, N], "center": [cx, cy], "horizon_radius": horizon_radius,
+            "collapse_bias": collapse_bias, "seed": seed, "steps": steps,
+        })
+
+    # optional spatial / radial A-rate accumulators (returned in the result)
+    stats = None
+    if collapse_stats:
+        from mqgt_collapse_stats import CollapseStats
+        stats = CollapseStats((N, N), (cx, cy), radial_edges)
+
+    # e.g. mqgt_multi_collapse.MultiOutcomeCollapse for K-outcome events
+    collapse = collapse_events if collapse_engine is None else collapse_engine
+
+    # optional mqgt_monitor.StabilityMonitor: tracks the budgeted phi+eth
+    # total and field amplitudes, raises FieldHealthError on blow-up;
+    # explicit diffusion on the 5-point stencil needs 4*D*dt <= 1
+    if monitor is not None:
+        monitor.start(cfl_margin=1.0 - 4.0 * max(D_rho, D_phi, D_eth) * dt)
     
     for t in range(steps):
         rho, phi, eth, kappa = step(
@@ -589,20 +633,27 @@ def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
             dt
         )
         
-        rho, phi, eth, kappa, a_ct, b_ct, nA, nT, fA, fT = collapse_events(
+        rho, phi, eth, kappa, a_ct, b_ct, nA, nT, fA, fT = collapse(
             rho, phi, eth, kappa,
             num_events=collapse_per_step,
             kappa_bias=collapse_bias,
             rng=rng,
-            horizon_radius=horizon_radius
+            horizon_radius=horizon_radius,
+            recorder=recorder,
+            tick=t,
+            stats=stats
         )
         
         nearA_total += nA; near_total += nT
         farA_total  += fA; far_total  += fT
         
         # soft budgets
-        phi = enforce_soft_budget(phi, PHI_BUDGET, leak=LEAK_PHI, gain=GAIN_PHI)
-        eth = enforce_soft_budget(eth, E_BUDGET, leak=LEAK_E, gain=GAIN_E)
+        phi = enforce_soft_budget(phi, PHI_BUDGET, leak=leak_phi, gain=GAIN_PHI)
+        eth = enforce_soft_budget(eth, E_BUDGET, leak=leak_e, gain=GAIN_E)
+
+        if monitor is not None and monitor.due(t):
+            monitor.observe(t, t * dt, np.stack((rho, phi, eth, kappa)),
+                            float(phi.sum() + eth.sum()))
         
         # compute coherence for reward (cheap proxy)
         grad_phi = periodic_grad_sum(phi)
@@ -657,6 +708,9 @@ def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
                 phi, eth = zora_allocate(phi, eth, PHI_BUDGET, E_BUDGET, B_mask, alloc_frac=zora.alloc)
                 rho, phi, eth = zora_pulse(rho, phi, eth, bx, by, radius=5, pulse=zora.pulse)
     
+    if recorder is not None:
+        recorder.close()
+
     Aglob = (nearA_total + farA_total) / max(1, (near_total + far_total))
     Anear = nearA_total / max(1, near_total)
     Afar  = farA_total / max(1, far_total)
@@ -665,11 +719,16 @@ def run_once(seed=7, steps=1200, collapse_bias=3.0, zora_mode="rescue"):
     A_phi, A_eth, A_phiE = basin_sums(phi, eth, cx, cy, radius=18)
     B_phi, B_eth, B_phiE = basin_sums(phi, eth, bx, by, radius=18)
     
-    return {
+    result = {
         "Aglob": Aglob, "Anear": Anear, "Afar": Afar, "coh": coh_mean,
         "A_phiE": A_phiE, "B_phiE": B_phiE,
         "alloc": zora.alloc, "pulse": zora.pulse, "bestR": zora.best_reward
     }
+    if stats is not None:
+        result["collapse_stats"] = stats
+    if monitor is not None:
+        result["health"] = monitor.history()
+    return result
 
 
 def sweep_leak(outfile="zora_limits_leak.csv"):
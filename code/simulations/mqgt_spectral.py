@@ -0,0 +1,250 @@
+"""
+3-D periodic pseudo-spectral solver for the Canon-A field equations.
+
+    ∂²Φc/∂t² = ∇²Φc - m_c² Φc - λ_c Φc³ - λ_int E
+    ∂²E/∂t²  = ∇²E  - m_E² E  - λ_E E³  - λ_int Φc
+
+on an n³ periodic box of side L. The Laplacian is applied in Fourier space
+with real-to-complex transforms (scipy.fft, multithreaded) against a -k²
+table built once; the local terms reuse preallocated scratch buffers, so a
+step allocates only the transform outputs. Time stepping is the symplectic
+leapfrog / Yoshida-4 of `mqgt_symplectic`.
+
+Full 3-D snapshots at 128³-256³ do not fit in memory for long runs, so
+`iter_slices` yields 2-D slices (and energies) in chunks, and `evolve`
+either collects them or streams them to an .npy file on disk.
+"""
+
+import os
+from typing import Iterator, Optional, Union
+
+import numpy as np
+import scipy.fft as sfft
+
+from mqgt_symplectic import SUBSTEPS, leapfrog_step, max_substep
+
+
+class SpectralCanonA:
+    """
+    Canon-A on a periodic 3-D box with a spectral Laplacian.
+
+    Parameters:
+    -----------
+    params : dict
+        Field parameters (m_c, m_E, lambda_c, lambda_E, lambda_int), e.g.
+        `MQGT_SCF_Simulator(...).params`
+    n : int
+        Grid points per side
+    L : float
+        Box side length
+    dtype : numpy dtype
+        float64 (default) or float32 to halve memory on large boxes
+    workers : int
+        FFT threads (-1: all cores)
+    """
+
+    def __init__(self, params: dict, n: int, L: float,
+                 dtype=np.float64, workers: int = -1):
+        self.params = params
+        self.n = n
+        self.L = L
+        self.dx = L / n
+        self.shape = (n, n, n)
+        self.dtype = np.dtype(dtype)
+        self.workers = workers
+
+        k = 2 * np.pi * sfft.fftfreq(n, d=self.dx)
+        kz = 2 * np.pi * sfft.rfftfreq(n, d=self.dx)
+        k2 = k[:, None, None]**2 + k[None, :, None]**2 + kz[None, None, :]**2
+        self.neg_k2 = (-k2).astype(self.dtype)
+        # rfft stores kz >= 0 only; interior kz columns stand for a ± pair
+        w = np.full(len(kz), 2.0)
+        w[0] = 1.0
+        if n % 2 == 0:
+            w[-1] = 1.0
+        self._parseval = (w[None, None, :] * k2).astype(self.dtype)
+        self.k2_max = float(k2.max())
+        self._scratch = np.empty(self.shape, dtype=self.dtype)
+
+    def laplacian(self, f: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Spectral Laplacian of a periodic field."""
+        F = sfft.rfftn(f, workers=self.workers)
+        F *= self.neg_k2
+        lap = sfft.irfftn(F, s=self.shape, workers=self.workers)
+        if out is None:
+            return lap
+        out[...] = lap
+        return out
+
+    def accel(self, q: np.ndarray, out: np.ndarray):
+        """Accelerations for q = (Φc, E) (flat or (2, n, n, n)), written into out."""
+        q = q.reshape((2,) + self.shape)
+        out = out.reshape((2,) + self.shape)
+        phi, E = q
+        p = self.params
+        tmp = self._scratch
+        for f, other, a, m2, lam in ((phi, E, out[0], p['m_c']**2, p['lambda_c']),
+                                     (E, phi, out[1], p['m_E']**2, p['lambda_E'])):
+            self.laplacian(f, out=a)
+            np.multiply(f, f, out=tmp)
+            tmp *= lam
+            tmp += m2
+            tmp *= f
+            a -= tmp
+            np.multiply(other, p['lambda_int'], out=tmp)
+            a -= tmp
+
+    def energy(self, q: np.ndarray, pm: np.ndarray) -> float:
+        """
+        Total energy Σ dV [½Π² + ½|∇Φ|² + V(Φc) + V(E) + λ_int Φc E].
+
+        The gradient term is evaluated through Parseval with the same k² as
+        the spectral Laplacian, so it is the energy leapfrog conserves.
+        """
+        q = q.reshape((2,) + self.shape)
+        pm = pm.reshape((2,) + self.shape)
+        phi, E = q
+        p = self.params
+        n_tot = phi.size
+        grad = 0.0
+        for f in (phi, E):
+            F = sfft.rfftn(f, workers=self.workers)
+            grad += float(np.sum(self._parseval * (F.real**2 + F.imag**2))) / n_tot
+        local = (0.5 * np.sum(pm.astype(np.float64)**2)
+                 + np.sum(0.5 * p['m_c']**2 * phi**2 + 0.25 * p['lambda_c'] * phi**4)
+                 + np.sum(0.5 * p['m_E']**2 * E**2 + 0.25 * p['lambda_E'] * E**4)
+                 + p['lambda_int'] * np.sum(phi * E))
+        return float(self.dx**3 * (float(local) + 0.5 * grad))
+
+    def max_stable_dt(self, order: int = 2) -> float:
+        """Leapfrog stability limit dt * ω_max < 2 for the stiffest mode."""
+        p = self.params
+        omega = np.sqrt(self.k2_max + max(p['m_c']**2, p['m_E']**2))
+        return 2.0 / (omega * max_substep(order))
+
+    def iter_slices(self, phi0: np.ndarray, E0: np.ndarray, dt: float, n_steps: int,
+                    pi_phi0: Optional[np.ndarray] = None,
+                    pi_E0: Optional[np.ndarray] = None, order: int = 2,
+                    save_every: int = 1, axis: int = 2, index: Optional[int] = None,
+                    chunk: int = 32, monitor=None) -> Iterator[dict]:
+        """
+        Evolve and yield field slices in chunks.
+
+        Each chunk is a dict with t (k,), phi and E slices (k, n, n) taken
+        at `index` along `axis` (default: the middle plane) and the total
+        energy per saved step. A StabilityMonitor (mqgt_monitor) is
+        observed at its own cadence and aborts with FieldHealthError on
+        blow-up.
+        """
+        if dt >= self.max_stable_dt(order):
+            raise ValueError(f"dt={dt:g} exceeds the stability limit "
+                             f"{self.max_stable_dt(order):g}")
+        if monitor is not None:
+            monitor.start(cfl_margin=1.0 - dt / self.max_stable_dt(order))
+        index = self.n // 2 if index is None else index
+        q = np.empty((2,) + self.shape, dtype=self.dtype)
+        pm = np.zeros_like(q)
+        q[0], q[1] = phi0, E0
+        if pi_phi0 is not None:
+            pm[0] = pi_phi0
+        if pi_E0 is not None:
+            pm[1] = pi_E0
+        a = np.empty_like(q)
+        self.accel(q, a)
+        weights = [w * dt for w in SUBSTEPS[order]]
+
+        def take(f):
+            return np.take(f, index, axis=axis)
+
+        buf = {'t': [], 'phi': [], 'E': [], 'energy': []}
+
+        def save(step):
+            buf['t'].append(step * dt)
+            buf['phi'].append(take(q[0]).copy())
+            buf['E'].append(take(q[1]).copy())
+            buf['energy'].append(self.energy(q, pm))
+
+        def emit():
+            out = {key: np.asarray(val) for key, val in buf.items()}
+            for val in buf.values():
+                val.clear()
+            return out
+
+        save(0)
+        for step in range(1, n_steps + 1):
+            for h in weights:
+                leapfrog_step(q, pm, a, self.accel, h)
+            if monitor is not None and monitor.due(step):
+                monitor.observe(step, step * dt, q, self.energy(q, pm))
+            if step % save_every == 0:
+                save(step)
+            if len(buf['t']) >= chunk:
+                yield emit()
+        if buf['t']:
+            yield emit()
+        self.final_state = (q[0], pm[0], q[1], pm[1])
+
+    def evolve(self, phi0: np.ndarray, E0: np.ndarray, t_end: float, dt: float,
+               path: Optional[Union[str, os.PathLike]] = None, **kwargs) -> dict:
+        """
+        Run to t_end and gather the slice output.
+
+        Parameters:
+        -----------
+        phi0, E0 : array (n, n, n)
+            Initial fields (momenta via pi_phi0 / pi_E0 keyword arguments)
+        t_end : float
+            End time; dt is shrunk slightly to land on it
+        dt : float
+            Step size
+        path : path-like, optional
+            If given, slices are streamed to an .npy file of shape
+            (n_saved, 2, n, n) (Φc, E) chunk by chunk instead of being
+            kept in memory
+        kwargs : dict
+            Passed to `iter_slices` (order, save_every, axis, index, chunk, ...)
+
+        Returns:
+        --------
+        result : dict
+            t, energy, energy_drift and either slices (n_saved, 2, n, n) or
+            path; final_state holds (Φc, Π_Φ, E, Π_E) at t_end
+        """
+        n_steps = max(1, int(np.ceil(t_end / dt - 1e-12)))
+        dt = t_end / n_steps
+        save_every = kwargs.get('save_every', 1)
+        n_saved = n_steps // save_every + 1
+
+        store = None
+        if path is not None:
+            store = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype,
+                                              shape=(n_saved, 2, self.n, self.n))
+        t, energy, slices = [], [], []
+        k = 0
+        for part in self.iter_slices(phi0, E0, dt, n_steps, **kwargs):
+            block = np.stack([part['phi'], part['E']], axis=1)
+            if store is not None:
+                store[k:k + len(block)] = block
+                store.flush()
+            else:
+                slices.append(block)
+            k += len(block)
+            t.append(part['t'])
+            energy.append(part['energy'])
+        t = np.concatenate(t)
+        energy = np.concatenate(energy)
+        result = {
+            't': t,
+            'energy': energy,
+            'energy_drift': float(np.max(np.abs(energy - energy[0]))
+                                  / max(abs(energy[0]), np.finfo(float).tiny)),
+            'final_state': self.final_state,
+        }
+        if kwargs.get('monitor') is not None:
+            result['health'] = kwargs['monitor'].history()
+        if store is not None:
+            del store
+            result['path'] = str(path)
+        else:
+            result['slices'] = np.concatenate(slices)
+        return result
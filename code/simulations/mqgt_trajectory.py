@@ -0,0 +1,159 @@
+"""
+Streaming trajectory output for the field solvers.
+
+`solve_ivp` keeps every accepted step in memory (and, with dense_output,
+an interpolant per step), so long runs on large grids run out of RAM.
+`stream_solve` drives a SciPy OdeSolver step by step instead, evaluates
+each step's local interpolant only at the requested output times, and
+writes those rows straight into a memory-mapped .npy file. Only the solver
+state and the current step are held in memory.
+
+Layout of a trajectory directory:
+  y.npy      (T, n) float64, one row per output time
+  t.npy      (T,) output times
+  meta.json  solver status and run metadata (grid size, boundary, ...)
+
+`Trajectory` reopens the directory lazily for post-hoc slicing.
+"""
+
+import json
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.integrate as integrate
+
+# State layout of the Canon-A solvers: y = [Φc, ∂Φc/∂t, E, ∂E/∂t]
+CANON_A_LAYOUT = ('phi', 'dphi_dt', 'E', 'dE_dt')
+
+
+def stream_solve(fun: Callable, t_span: Tuple[float, float], y0: np.ndarray,
+                 t_eval: Sequence[float], directory, method: str = 'RK45',
+                 chunk: int = 64, meta: Optional[Dict] = None,
+                 on_step: Optional[Callable] = None, **options) -> "Trajectory":
+    """
+    Integrate dy/dt = fun(t, y) and stream y(t_eval) to disk.
+
+    Parameters:
+    -----------
+    fun : callable
+        RHS fun(t, y)
+    t_span : tuple
+        (t_start, t_end)
+    y0 : array
+        Initial state
+    t_eval : array
+        Sorted output times within t_span
+    directory : path-like
+        Output directory (created if needed)
+    method : str or OdeSolver class
+        Any `solve_ivp` method name
+    chunk : int
+        Rows written between flushes
+    meta : dict, optional
+        Extra metadata for meta.json
+    on_step : callable, optional
+        on_step(t, y) after the initial state and every accepted step
+        (e.g. a stability monitor)
+    options : dict
+        Solver options (rtol, atol, max_step, jac_sparsity, ...)
+
+    Returns:
+    --------
+    trajectory : Trajectory
+        Lazy handle on the written output
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    t0, t1 = t_span
+    t_eval = np.asarray(t_eval, dtype=float)
+    if np.any(np.diff(t_eval) < 0) or t_eval[0] < t0 or t_eval[-1] > t1:
+        raise ValueError("t_eval must be sorted and lie within t_span")
+    y0 = np.asarray(y0, dtype=float)
+    solver_cls = getattr(integrate, method) if isinstance(method, str) else method
+
+    np.save(directory / "t.npy", t_eval)
+    y_out = np.lib.format.open_memmap(directory / "y.npy", mode='w+',
+                                      dtype=np.float64, shape=(len(t_eval), y0.size))
+    k = int(np.searchsorted(t_eval, t0, side='right'))
+    y_out[:k] = y0
+    flushed = k
+
+    solver, n_steps, message, error = None, 0, '', None
+    try:
+        if on_step is not None:
+            on_step(t0, y0)
+        solver = solver_cls(fun, t0, y0, t1, **options)
+        while solver.status == 'running':
+            message = solver.step()
+            if solver.status == 'failed':
+                break
+            n_steps += 1
+            if on_step is not None:
+                on_step(solver.t, solver.y)
+            j = int(np.searchsorted(t_eval, solver.t, side='right'))
+            if j > k:
+                y_out[k:j] = solver.dense_output()(t_eval[k:j]).T
+                k = j
+            if k - flushed >= chunk:
+                y_out.flush()
+                flushed = k
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        # an interrupted run still leaves a readable trajectory of its first k rows
+        y_out.flush()
+        del y_out
+        success = error is None and solver.status == 'finished'
+        if error is not None:
+            message = f"{type(error).__name__}: {error}"
+        elif success:
+            message = 'The solver successfully reached the end of the integration interval.'
+        info = dict(meta or {})
+        info.update(
+            method=method if isinstance(method, str) else method.__name__,
+            t_span=[float(t0), float(t1)],
+            n_written=k,
+            n_steps=n_steps,
+            nfev=int(solver.nfev) if solver is not None else 0,
+            success=success,
+            message=str(message),
+        )
+        (directory / "meta.json").write_text(json.dumps(info, indent=2))
+    return Trajectory(directory)
+
+
+class Trajectory:
+    """
+    Read-only, memory-mapped view of a streamed trajectory.
+
+    `y` is (T, n), of which the first `len(self)` rows were written (all
+    of them unless the run stopped early); `field(name)` slices one block
+    of a state laid out as `meta['layout']` (Canon-A by default) without
+    reading the rest.
+    """
+
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.meta = json.loads((self.dir / "meta.json").read_text())
+        self.t = np.load(self.dir / "t.npy")
+        self.y = np.load(self.dir / "y.npy", mmap_mode='r')
+        self.layout = tuple(self.meta.get('layout', CANON_A_LAYOUT))
+
+    def __len__(self):
+        return self.meta['n_written']
+
+    @property
+    def success(self) -> bool:
+        return self.meta['success']
+
+    def field(self, name: str, times=slice(None)) -> np.ndarray:
+        """Written rows `times` of one field block, shape (T', n / len(layout))."""
+        n = self.y.shape[1] // len(self.layout)
+        k = self.layout.index(name)
+        return self.y[:len(self)][times, k * n:(k + 1) * n]
+
+    def at(self, t: float) -> np.ndarray:
+        """State at the written output time nearest to t."""
+        return self.y[int(np.argmin(np.abs(self.t[:len(self)] - t)))]
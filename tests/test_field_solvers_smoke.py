@@ -0,0 +1,266 @@
+"""Smoke tests for the MQGT_SCF_Simulator field solvers and forward models."""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+# Simulation modules use flat imports (mqgt_scf_simulation, ...)
+sim_dir = Path(__file__).parent.parent / "code" / "simulations"
+sys.path.insert(0, str(sim_dir))
+
+
+def _gaussian_state(x, amp_phi=1.0, amp_E=0.5):
+    N = len(x)
+    c = 0.5 * (x[0] + x[-1])
+    return np.concatenate([amp_phi * np.exp(-(x - c)**2), np.zeros(N),
+                           amp_E * np.exp(-(x - c + 2.0)**2), np.zeros(N)])
+
+
+def test_canon_A_rhs_and_sparsity():
+    """Compiled RHS matches the analytic Laplacian; Jacobian fits the pattern."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    sim = MQGT_SCF_Simulator(lambda_c=0.0, lambda_E=0.0, lambda_int=0.0)
+    N = 400
+    x = np.linspace(-10, 10, N)
+    y = _gaussian_state(x, amp_E=0.0)
+    out = np.empty(4 * N)
+    res = sim.field_equations_canon_A(0.0, y, x, out=out)
+    assert res is out
+
+    exact = (4 * x**2 - 2) * np.exp(-x**2) - sim.params['m_c']**2 * np.exp(-x**2)
+    assert np.max(np.abs(out[N:2*N] - exact)) < 5e-3
+
+    # finite-difference Jacobian vanishes outside the declared sparsity
+    sim = MQGT_SCF_Simulator(lambda_int=0.1)
+    N = 20
+    x = np.linspace(-5, 5, N)
+    y = _gaussian_state(x)
+    pattern = sim.canon_A_jac_sparsity(N).toarray() != 0
+    f0 = sim.field_equations_canon_A(0.0, y, x).copy()
+    for k in range(4 * N):
+        yp = y.copy()
+        yp[k] += 1e-6
+        col = sim.field_equations_canon_A(0.0, yp, x) - f0
+        assert np.all(col[~pattern[:, k]] == 0.0)
+
+    sol = sim.solve_field_equations((0.0, 1.0), y, x, method='BDF')
+    assert sol['success']
+
+
+def test_symplectic_energy_drift():
+    """Leapfrog/Yoshida keep Canon-A energy bounded; Yoshida is tighter."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    sim = MQGT_SCF_Simulator(m_c=1.0, m_E=0.5, lambda_int=0.1)
+    N = 200
+    x = np.linspace(-10, 10, N)
+    y0 = _gaussian_state(x)
+
+    drift = {}
+    for order in (2, 4):
+        sol = sim.evolve_symplectic((0.0, 20.0), y0, x, dt=0.05, order=order,
+                                    save_every=20)
+        assert sol['success']
+        assert sol['y'].shape == (4 * N, len(sol['t']))
+        assert np.isclose(sol['t'][-1], 20.0)
+        drift[order] = sol['energy_drift']
+    assert drift[2] < 1e-2
+    assert drift[4] < drift[2]
+
+
+def test_spectral_canon_A_3d(tmp_path):
+    """Spectral Laplacian is exact on a Fourier mode; slices stream to disk."""
+    from mqgt_spectral import SpectralCanonA
+
+    params = dict(m_c=1.0, m_E=0.5, lambda_c=0.1, lambda_E=0.1, lambda_int=0.1)
+    n, L = 16, 10.0
+    solver = SpectralCanonA(params, n, L)
+    x = np.arange(n) * solver.dx
+    X, Y, Z = np.meshgrid(x, x, x, indexing='ij')
+    f = np.sin(2 * np.pi * X / L) * np.cos(4 * np.pi * Z / L)
+    k2 = (2 * np.pi / L)**2 + (4 * np.pi / L)**2
+    assert np.allclose(solver.laplacian(f), -k2 * f, atol=1e-10)
+
+    r2 = (X - L / 2)**2 + (Y - L / 2)**2 + (Z - L / 2)**2
+    phi0, E0 = np.exp(-r2 / 2), 0.5 * np.exp(-r2 / 3)
+    res = solver.evolve(phi0, E0, 2.0, 0.1, path=tmp_path / "slices.npy",
+                        save_every=5, chunk=2)
+    slices = np.load(res['path'], mmap_mode='r')
+    assert slices.shape == (len(res['t']), 2, n, n)
+    assert np.allclose(slices[0, 0], phi0[:, :, n // 2])
+    assert res['energy_drift'] < 1e-2
+
+
+def test_kernel_convolutions_match_direct_sum():
+    """FFT and truncated point sums agree with the pairwise kernel sum."""
+    from mqgt_kernels import PointConvolver, convolve_periodic, kernel_values
+
+    rng = np.random.default_rng(0)
+    n, h = 20, 0.3
+    f = rng.random((n, n))
+    x = np.arange(n) * h
+    P = np.stack(np.meshgrid(x, x, indexing='ij'), axis=-1).reshape(-1, 2)
+    D = P[:, None, :] - P[None, :, :]
+    D = (D + n * h / 2) % (n * h) - n * h / 2
+    K = kernel_values('gaussian', np.sqrt((D**2).sum(-1)), 0.7)
+    direct = (K @ f.ravel()) * h * h
+    assert np.allclose(convolve_periodic(f, 'gaussian', 0.7, h).ravel(), direct)
+
+    pts = rng.random((500, 3)) * 4
+    v = rng.random(500)
+    d = np.linalg.norm(pts[:, None] - pts[None], axis=-1)
+    for kind, scale in (('gaussian', 0.3), ('yukawa', 3.0)):
+        with np.errstate(divide='ignore'):
+            K = kernel_values(kind, d, scale)
+        if kind == 'yukawa':
+            np.fill_diagonal(K, 0.0)
+        conv = PointConvolver(pts, kind, scale, tol=1e-10)
+        assert np.allclose(conv(v), K @ v, atol=1e-8)
+
+
+def test_canon_B_engine_energy():
+    """Canon-B accelerations are -dH/dq; leapfrog keeps the energy bounded."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    sim = MQGT_SCF_Simulator(variant='B', m_c=1.0, m_E=0.7, m_omega=0.5,
+                             lambda_int=0.1, alpha=0.05, beta=0.1, gamma=0.08,
+                             kappa=0.2, lambda_omega=0.3, ell_K=0.8)
+    shape = (24, 20)
+    eng = sim.canon_B_engine(shape, 0.4)
+    x = np.arange(24)[:, None] * 0.4 - 4.8
+    y = np.arange(20)[None, :] * 0.4 - 4.0
+    bump = np.exp(-(x**2 + y**2) / 2)
+    eng.set_fields(phi=bump, E=0.5 * bump, psi=0.3 * bump * np.exp(1j * x))
+
+    a = np.empty_like(eng.q)
+    eng.accel(eng.q, a)
+    idx = (2, 12, 10)
+    eng.state[0][idx] += 1e-6
+    h_plus = eng.energy()
+    eng.state[0][idx] -= 2e-6
+    h_minus = eng.energy()
+    eng.state[0][idx] += 1e-6
+    assert np.isclose(-(h_plus - h_minus) / 2e-6 / eng.dV, a[idx], rtol=1e-5)
+
+    res = eng.run(4.0, 0.05, save_every=20, snapshots=('psi',))
+    assert res['psi'].shape == (len(res['t']),) + shape
+    assert np.iscomplexobj(res['psi'])
+    assert res['energy_drift'] < 1e-2
+
+
+def test_solve_batch_matches_single_solves():
+    """Stacked parameter scan reproduces per-member solves."""
+    from mqgt_scf_batch import solve_batch
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    sim = MQGT_SCF_Simulator(m_c=1.0, m_E=0.5, lambda_int=0.1)
+    N = 60
+    x = np.linspace(-10, 10, N)
+    y0 = _gaussian_state(x)
+    m_c = np.array([0.5, 1.0, 2.0])
+    t_eval = np.linspace(0.0, 2.0, 5)
+    tol = dict(rtol=1e-9, atol=1e-12)
+
+    res = solve_batch(sim, {'m_c': m_c}, (0.0, 2.0), y0, x, t_eval=t_eval, **tol)
+    assert res['y'].shape == (3, 4 * N, 5)
+    assert res['finite'].all() and all(res['success'])
+    assert res['energy_drift'].shape == (3,)
+
+    single = MQGT_SCF_Simulator(m_c=2.0, m_E=0.5, lambda_int=0.1)
+    ref = single.solve_field_equations((0.0, 2.0), y0, x, t_eval=t_eval, **tol)
+    assert np.allclose(res['y'][2], ref['y'], atol=1e-7)
+
+
+def test_streamed_solve_matches_in_memory(tmp_path):
+    """Streaming to disk reproduces solve_ivp output at t_eval."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+    from mqgt_trajectory import Trajectory
+
+    sim = MQGT_SCF_Simulator(m_c=1.0, m_E=0.5, lambda_int=0.1)
+    N = 80
+    x = np.linspace(-10, 10, N)
+    y0 = _gaussian_state(x)
+    t_eval = np.linspace(0.0, 5.0, 26)
+
+    ref = sim.solve_field_equations((0.0, 5.0), y0, x, t_eval=t_eval)
+    res = sim.solve_field_equations((0.0, 5.0), y0, x, t_eval=t_eval,
+                                    stream=tmp_path / "traj", chunk=4)
+    assert res['success']
+    assert np.allclose(res['y'], ref['y'])
+
+    traj = Trajectory(tmp_path / "traj")
+    assert len(traj) == 26
+    assert np.allclose(traj.field('E', slice(3, 5)), ref['y'][2*N:3*N, 3:5].T)
+
+    # a run interrupted mid-way still leaves meta.json and its written rows
+    import pytest
+    from mqgt_trajectory import stream_solve
+
+    def stop(t, y):
+        if t > 2.0:
+            raise RuntimeError("stopped")
+
+    with pytest.raises(RuntimeError):
+        stream_solve(lambda t, y: -y, (0.0, 5.0), np.ones(4), t_eval, tmp_path / "cut",
+                     on_step=stop, rtol=1e-8, atol=1e-10)
+    cut = Trajectory(tmp_path / "cut")
+    assert not cut.success and "stopped" in cut.meta['message']
+    assert 0 < len(cut) < 26 and cut.t[len(cut) - 1] <= 2.0 + 1e-12
+    assert cut.field('phi').shape == (len(cut), 1)
+    assert np.allclose(cut.field('phi')[:, 0], np.exp(-t_eval[:len(cut)]), rtol=1e-6)
+    assert np.allclose(cut.at(5.0), cut.y[len(cut) - 1])
+
+
+def test_stability_monitor_aborts_blow_up():
+    """Monitor records health at its cadence and aborts a diverging run."""
+    import pytest
+    from mqgt_monitor import FieldHealthError, StabilityMonitor
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    N = 100
+    x = np.linspace(-10, 10, N)
+    y0 = _gaussian_state(x, amp_phi=2.0)
+
+    stable = MQGT_SCF_Simulator(m_c=1.0, m_E=0.5, lambda_int=0.1)
+    monitor = StabilityMonitor(cadence=10)
+    sol = stable.evolve_symplectic((0.0, 5.0), y0, x, dt=0.05, monitor=monitor)
+    health = sol['health']
+    assert list(health['step']) == list(range(10, 101, 10))
+    assert 0.0 < health['cfl_margin'][0] < 1.0
+    assert monitor.summary()['max_drift'] < 1e-2
+
+    # negative quartic coupling: the field runs away
+    unstable = MQGT_SCF_Simulator(m_c=1.0, m_E=0.5, lambda_int=0.1, lambda_c=-5.0)
+    with np.errstate(all='ignore'), pytest.raises(FieldHealthError) as err:
+        unstable.evolve_symplectic((0.0, 100.0), y0, x, dt=0.05,
+                                   monitor=StabilityMonitor(cadence=5, max_amplitude=1e3))
+    assert err.value.history['t'][-1] < 100.0
+
+
+def test_batched_forward_models():
+    """Array forward models broadcast and match the scalar versions."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+
+    sim = MQGT_SCF_Simulator(eta=1e-3)
+    amps, E = np.array([0.3, 0.7]), np.array([1.0, -1.0])
+    assert np.allclose(sim.born_rule_batch(amps, E),
+                       amps * np.exp(1e-3 * E) / np.sum(amps * np.exp(1e-3 * E)))
+    # log-space normalisation survives huge eta * E
+    p = sim.born_rule_batch([0.5, 0.5], [0.0, 1.0], eta=np.array([0.0, 1e4]))
+    assert np.allclose(p, [[0.5, 0.5], [0.0, 1.0]])
+
+    eta = np.linspace(0.0, 0.1, 50)
+    res = sim.qrng_forward_batch(10000, 0.0, 1.0, eta=eta, rng=np.random.default_rng(1))
+    assert res.shape == (50,)
+    assert np.all(res['N_0'] + res['N_1'] == 10000)
+    assert np.allclose(res['E_T'], eta)
+
+    higgs = sim.higgs_portal_batch(np.array([[0.0], [1e-3]]), np.array([0.1, 0.2, 0.3]))
+    assert higgs.shape == (2, 3)
+    ref = sim.higgs_portal_forward_model(1e-3, 0.2)
+    assert np.isclose(higgs['Gamma_inv'][1, 1], ref['Gamma_inv'])
+
+    force = sim.fifth_force_batch(np.linspace(1, 2, 4), 0.1, np.array([[1.0], [2.0]]))
+    assert force.shape == (2, 4)
+    assert np.allclose(force['V'][1], sim.fifth_force_potential(np.linspace(1, 2, 4), 0.1, 2.0))
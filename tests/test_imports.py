@@ -51,3 +51,13 @@ def test_reproduce_script_imports():
     assert hasattr(reproduce_all, 'check_dependencies')
     assert hasattr(reproduce_all, 'run_inference')
 
+
+
+def test_simulation_package_import_without_flat_path():
+    """simulations.mqgt_scf_simulation imports with only code/ on the path."""
+    import subprocess
+    code = ("import sys; sys.path[:] = [p for p in sys.path if not p.endswith('simulations')]; "
+            "import simulations.mqgt_scf_simulation as sim; sim.MQGT_SCF_Simulator(variant='A')")
+    res = subprocess.run([sys.executable, "-c", code], cwd=str(code_dir),
+                         capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
@@ -0,0 +1,249 @@
+"""Smoke tests for lattice-simulator tooling (ensembles, boundary tracing)."""
+
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+# Simulation modules use flat imports (mqgt_simulation, mqgt_ensemble, ...)
+sim_dir = Path(__file__).parent.parent / "code" / "simulations"
+sys.path.insert(0, str(sim_dir))
+
+
+def test_run_ensemble_small():
+    """Tiny lattice runs through the ensemble runner, reproducible per seed."""
+    from mqgt_ensemble import replicate, run_ensemble
+
+    configs = replicate({"steps": 3, "N": 40, "leak": 0.004}, seeds=[1, 1, 2])
+    results = run_ensemble(configs, processes=1)
+
+    assert len(results) == 3
+    for res in results:
+        assert 0.0 <= res["Aglob"] <= 1.0
+        assert np.isfinite(res["A_phiE"]) and np.isfinite(res["B_phiE"])
+    assert results[0] == results[1]
+
+    # a caller-owned pool (reused across batches) gives the same results
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pooled = run_ensemble(configs[:1], pool=pool) + run_ensemble(configs[2:], pool=pool)
+    assert pooled == [results[0], results[2]]
+
+
+def test_trace_boundary_synthetic():
+    """Tracer recovers a known linear boundary of a noisy classifier."""
+    from mqgt_phase_boundary import trace_boundary
+
+    def evaluate(x, y, seeds):
+        p = 1.0 / (1.0 + np.exp(-(y - (2.0 + x)) / 0.1))
+        draws = [np.random.default_rng([int(s), int(1e6 * x), int(1e6 * y)]).random()
+                 for s in seeds]
+        return np.array(draws) < p
+
+    res = trace_boundary(evaluate, (0.0, 2.0), (0.0, 6.0), n_x=5)
+
+    assert res["y"].shape == (5,)
+    assert np.all(np.isfinite(res["y"]))
+    assert np.all(res["y_lower"] <= res["y_upper"])
+    assert np.max(np.abs(res["y"] - (2.0 + res["x"]))) < 0.4
+    assert res["n_runs"] < res["grid_runs"]
+
+
+def test_abc_smc_recovers_synthetic_parameters():
+    """ABC-SMC concentrates on the generating parameters of a toy simulator."""
+    from mqgt_abc import abc_smc, weighted_summary
+
+    def simulate(thetas, seeds):
+        out = []
+        for th, s in zip(thetas, seeds):
+            r = np.random.default_rng(int(s))
+            out.append([th["collapse_bias"] + 0.05 * r.normal(),
+                        np.log(th["leak"]) + 0.05 * r.normal()])
+        return np.array(out)
+
+    priors = {
+        "collapse_bias": {"type": "uniform", "low": 0.0, "high": 6.0},
+        "leak": {"type": "log_uniform", "low": 1e-3, "high": 2.4e-2},
+    }
+    res = abc_smc(priors, [3.0, np.log(0.004)], simulate,
+                  n_particles=100, n_generations=4, seed=1)
+
+    assert res["particles"].shape == (100, 2)
+    assert np.isclose(res["weights"].sum(), 1.0)
+    assert all(e1 <= e0 for e0, e1 in zip(res["epsilons"], res["epsilons"][1:]))
+    post = weighted_summary(res)
+    assert abs(post["collapse_bias"]["mean"] - 3.0) < 0.5
+    assert np.all((res["particles"][:, 1] >= 1e-3) & (res["particles"][:, 1] <= 2.4e-2))
+
+    # the lattice simulator runs every batch on a caller-owned pool
+    from concurrent.futures import ThreadPoolExecutor
+    from mqgt_abc import lattice_simulator
+    thetas = [{"collapse_bias": 3.0, "leak": 0.004}, {"collapse_bias": 1.0, "leak": 0.01}]
+    serial = lattice_simulator(processes=1, steps=3, N=40)(thetas, [1, 2])
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pooled = lattice_simulator(pool=pool, steps=3, N=40)(thetas, [1, 2])
+    assert np.array_equal(serial, pooled)
+
+
+def test_event_log_matches_run_counters(tmp_path):
+    """Recorded events reproduce run_once's aggregate A-rate and tick windows."""
+    from mqgt_simulation import run_once
+    from mqgt_event_log import EventLog
+
+    res = run_once(seed=3, steps=6, N=40, event_log=tmp_path / "ev")
+    log = EventLog(tmp_path / "ev")
+
+    assert len(log) == 6 * 40
+    assert np.isclose(log.events["outcome"].mean(), res["Aglob"])
+    ticks, n_a, total = log.a_rate_by_tick()
+    assert list(ticks) == list(range(6)) and np.all(total == 40)
+    assert len(log.window(2, 4)) == 80
+    edges, a_r, tot_r = log.radial_profile(8)
+    assert tot_r.sum() == len(log) and a_r.sum() == n_a.sum()
+    assert np.all(np.abs(log.phi_eth_at_collapse()) <= 1.0 + 1e-3)
+
+    # a second run into the same directory is refused, not joined
+    with pytest.raises(FileExistsError):
+        run_once(seed=4, steps=2, N=40, event_log=tmp_path / "ev")
+    assert len(EventLog(tmp_path / "ev")) == 6 * 40
+
+
+def test_event_recorder_resume_checks_meta_and_ticks(tmp_path):
+    """resume=True continues a log only with equal metadata and later ticks."""
+    from mqgt_event_log import EventLog, EventRecorder
+
+    one, pA = np.ones(3, dtype=int), np.full(3, 0.5)
+    with EventRecorder(tmp_path, meta={"seed": 1}) as rec:
+        rec.append(0, one, one, one, pA)
+        rec.append(1, one, one, one, pA)
+    with pytest.raises(ValueError):
+        EventRecorder(tmp_path, meta={"seed": 2}, resume=True)
+    with EventRecorder(tmp_path, meta={"seed": 1}, resume=True) as rec:
+        with pytest.raises(ValueError):
+            rec.append(0, one, one, one, pA)
+        rec.append(2, one, one, one, pA)
+    log = EventLog(tmp_path)
+    assert len(log) == 9 and list(log.index["tick"]) == [0, 1, 2]
+    assert len(log.window(1, 3)) == 6
+
+
+def test_collapse_stats_reduce_across_replicas():
+    """Radial accumulators agree with run counters and sum across replicas."""
+    from mqgt_ensemble import replicate, run_ensemble
+    from mqgt_collapse_stats import CollapseStats
+
+    results = run_ensemble(
+        replicate({"steps": 4, "N": 40, "collapse_stats": True}, seeds=[1, 2]),
+        processes=1,
+    )
+    parts = [r["collapse_stats"] for r in results]
+    anear, afar = parts[0].near_far(16)
+    assert np.isclose(anear, results[0]["Anear"])
+    assert np.isclose(afar, results[0]["Afar"])
+
+    total = CollapseStats.reduce(parts)
+    centres, rate, counts = total.radial_profile()
+    assert counts.sum() == 2 * 4 * 40
+    assert total.cell_A.sum() == parts[0].cell_A.sum() + parts[1].cell_A.sum()
+    assert np.all((rate[counts > 0] >= 0) & (rate[counts > 0] <= 1))
+
+    # array form of add (one call per tick from both engines) matches per-event adds
+    rng = np.random.default_rng(0)
+    i, j, is_A = rng.integers(0, 40, 500), rng.integers(0, 40, 500), rng.random(500) < 0.4
+    one, many = CollapseStats((40, 40), (20, 20)), CollapseStats((40, 40), (20, 20))
+    for n in range(500):
+        one.add(i[n], j[n], is_A[n])
+    many.add(i, j, is_A)
+    assert np.array_equal(one.cell_A, many.cell_A) and np.array_equal(one.radial_A, many.radial_A)
+    assert np.array_equal(one.cell_total, many.cell_total)
+
+
+def test_tangent_gradients_match_finite_differences():
+    """Forward-mode d(gap)/d(param) agrees with central differences (CRN)."""
+    from mqgt_tangent import run_tangent
+
+    kw = dict(seed=3, steps=20, N=40)
+    res = run_tangent(wrt=["lam_coh", "eta_tel"], **kw)
+    h = 1e-5
+    for name, base in [("lam_coh", 0.16), ("eta_tel", 0.10)]:
+        up = run_tangent(wrt=[], **kw, **{name: base + h})
+        dn = run_tangent(wrt=[], **kw, **{name: base - h})
+        fd = (up["gap"] - dn["gap"]) / (2 * h)
+        assert np.isclose(res["d_gap"][name], fd, rtol=1e-4, atol=1e-8)
+
+
+def test_multi_outcome_collapse_sampling():
+    """Alias and cumulative samplers follow the tilted Born probabilities."""
+    from mqgt_multi_collapse import MultiOutcomeCollapse, OUTCOME_DTYPE, ab_outcomes
+    from mqgt_simulation import run_once
+
+    rng = np.random.default_rng(0)
+    K = 50
+    outcomes = np.zeros(K, dtype=OUTCOME_DTYPE)
+    phi = np.full((4, 4), 0.5)
+    eth = np.full((4, 4), 0.5)
+    i = np.zeros(1, dtype=np.int64)
+    for method in ("alias", "cumulative"):
+        eng = MultiOutcomeCollapse(outcomes, rng.random(K), rng.normal(size=K),
+                                   method=method)
+        p = eng.probabilities(phi, eth, i, i, kappa_bias=2.0)
+        k = eng.sample(p, np.zeros(200_000, dtype=np.int64), rng)
+        freq = np.bincount(k, minlength=K) / len(k)
+        assert np.isclose(p.sum(), 1.0)
+        assert np.max(np.abs(freq - p[0])) < 5e-3
+
+        # cached per-cell tables: a null outcome set leaves the fields frozen
+        rho = np.zeros((4, 4))
+        args = (rho, phi, eth, rho, 100_000, 2.0, rng, 1.0)
+        eng(*args)
+        cached = eng._prob.copy()
+        assert np.all(np.isfinite(eng._tilt))
+        eng.counts[:] = 0
+        eng(*args)
+        assert np.array_equal(eng._prob, cached)
+        freq = eng.counts / eng.counts.sum()
+        assert np.max(np.abs(freq - p[0])) < 1e-2
+        phi[1, 2] = 0.9
+        eng(*args)
+        changed = np.any(eng._prob != cached, axis=1)
+        assert np.array_equal(np.flatnonzero(changed), [1 * 4 + 2])
+        phi[1, 2] = 0.5
+
+    eng = MultiOutcomeCollapse(ab_outcomes(), [0.5, 0.5], [1.0, -1.0])
+    res = run_once(steps=3, N=40, collapse_engine=eng)
+    assert eng.counts.sum() == 3 * 40
+    assert np.isclose(res["Aglob"], eng.counts[0] / eng.counts.sum())
+
+
+def test_live_renderer_decimates_and_throttles():
+    """Renderer downsamples large fields and respects its time budget."""
+    import matplotlib
+    matplotlib.use("Agg")
+    from mqgt_render import LiveRenderer, decimate
+
+    field = np.arange(36, dtype=float).reshape(6, 6)
+    assert decimate(field, 2).shape == (3, 3)
+    assert decimate(field, 4, mode="max")[0, 0] == field[:4, :4].max()
+
+    big = [np.random.default_rng(k).random((2048, 2048)) for k in range(4)]
+    view = LiveRenderer(big, ["a", "b", "c", "d"], budget=0.01, figsize=(4, 4))
+    try:
+        assert all(f > 1 for f in view.factors)
+        assert view.ims[0].get_array().shape[0] < 2048
+        assert view.update(big, "step 0")
+        assert not view.update(big, "step 1")  # next refresh not yet due
+        assert view.title.get_text() == "step 0"
+    finally:
+        view.close()
+
+
+def test_run_once_health_monitor():
+    """Lattice runs report budget drift, amplitudes and the diffusion CFL margin."""
+    from mqgt_monitor import StabilityMonitor
+    from mqgt_simulation import run_once
+
+    res = run_once(steps=30, N=40, leak=0.004, monitor=StabilityMonitor(cadence=10))
+    health = res["health"]
+    assert list(health["step"]) == [0, 10, 20]
+    assert np.all(np.isfinite(health["energy"]))
+    assert np.allclose(health["cfl_margin"], 1.0 - 4 * 0.22 * 0.08)
@@ -0,0 +1,373 @@
+"""Smoke tests for the MQGT_SCF_Inference posterior samplers."""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+# Simulation modules use flat imports (mqgt_scf_simulation, ...)
+sim_dir = Path(__file__).parent.parent / "code" / "simulations"
+sys.path.insert(0, str(sim_dir))
+
+
+def _inference(channels=('qrng', 'higgs', 'cosmology')):
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+    from mqgt_scf_inference import MQGT_SCF_Inference
+
+    inference = MQGT_SCF_Inference(MQGT_SCF_Simulator(variant='A'))
+    inference.set_prior('eta', 'normal', mean=0.0, std=1e-2)
+    inference.set_prior('g_phi', 'uniform', low=0.0, high=1.0)
+    inference.set_prior('m_c', 'log_normal', mean=np.log(1e-3), std=1.0)
+    data = {
+        'qrng': {'N_0': 50300, 'N_1': 49700, 'E_0': 0.0, 'E_1': 1.0},
+        'higgs': {'Gamma_inv': 4.07e-3, 'sigma_Gamma': 1e-4},
+        'fifth_force': {},
+        'cosmology': {'w_obs': -0.95, 'sigma_w': 0.1},
+    }
+    for name in channels:
+        inference.add_channel_data(name, data[name])
+    return inference
+
+
+def test_compiled_posterior_matches_and_mcmc():
+    """Compiled log-posterior equals log_posterior; the chain fills arrays."""
+    inference = _inference(('qrng', 'higgs', 'fifth_force', 'cosmology'))
+    post = inference.compile_posterior(['eta', 'g_phi', 'm_c', 'theta'])
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        p = {'eta': rng.normal(0, 1e-2), 'g_phi': rng.uniform(-0.1, 1.0),
+             'm_c': np.exp(rng.normal(np.log(1e-3), 1.5)), 'theta': rng.normal()}
+        expected = inference.log_posterior(p)
+        got = post.logp(post.to_vector(p))
+        assert (expected == got == -np.inf) or np.isclose(got, expected, rtol=1e-10)
+
+    X = np.array([[0.0, 0.5, 1e-3, 0.3], [0.01, 2.0, 1e-3, 0.3]])
+    batch = post.logp_batch(X)
+    assert np.isclose(batch[0], post.logp(X[0])) and batch[1] == -np.inf
+
+    samples = _inference().mcmc_sample(n_samples=2000, n_warmup=200,
+                                       initial_params={'eta': -0.01, 'g_phi': 0.5},
+                                       seed=3)
+    assert samples['eta'].shape == (2000,)
+    # QRNG deficit of N_1 pulls eta negative (MLE about -0.012)
+    assert -0.03 < np.mean(samples['eta'][500:]) < 0.0
+
+
+def test_parallel_chains_stop_at_targets():
+    """Chains stop once ESS and split-R-hat targets are met; seeds reproduce."""
+    from mqgt_chains import ess, split_rhat
+
+    rng = np.random.default_rng(0)
+    white = rng.standard_normal((4, 1000, 2))
+    assert np.all(np.abs(split_rhat(white) - 1) < 0.01)
+    assert np.all(ess(white) > 3000)
+
+    inference = _inference()
+    start = {'eta': -0.01, 'g_phi': 0.5}
+    run = inference.mcmc_chains(n_chains=4, n_warmup=500, block=500, max_samples=20000,
+                                target_ess=200, max_rhat=1.05, initial_params=start,
+                                processes=2, seed=7)
+    assert run['converged']
+    n = run['samples']['eta'].shape[1]
+    assert n < 20000 and run['samples']['eta'].shape == (4, n)
+    assert run['ess']['eta'] >= 200 and run['rhat']['eta'] <= 1.05
+
+    again = inference.mcmc_chains(n_chains=4, n_warmup=500, block=500, max_samples=20000,
+                                  target_ess=200, max_rhat=1.05, initial_params=start,
+                                  processes=1, seed=7)
+    assert np.array_equal(again['samples']['eta'], run['samples']['eta'])
+
+
+def test_ensemble_sampler_default_priors():
+    """Stretch-move ensemble mixes across the badly scaled default priors."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+    from mqgt_scf_inference import MQGT_SCF_Inference
+
+    inference = MQGT_SCF_Inference(MQGT_SCF_Simulator(variant='A'))
+    inference.set_default_priors()
+    inference.add_channel_data('qrng', {'N_0': 50300, 'N_1': 49700, 'E_0': 0.0, 'E_1': 1.0})
+    run = inference.ensemble_sample(n_samples=600, n_warmup=300, seed=1)
+
+    eta = run['samples']['eta']
+    assert eta.shape == (600, 32)
+    assert 0.1 < np.mean(run['acceptance']) < 0.9
+    # QRNG is uninformative at N = 1e5: eta follows its N(0, 1e-5) prior
+    assert abs(np.mean(eta)) < 3e-6 and 0.7e-5 < np.std(eta) < 1.3e-5
+    assert np.all(run['samples']['g_phi'] >= 0) and np.all(run['samples']['m_c'] > 0)
+
+
+def _fd_grad(f, x, rel=1e-5):
+    h = np.abs(x) * rel
+    return np.array([(f(x + hk * e) - f(x - hk * e)) / (2 * hk) for hk, e in zip(h, np.eye(len(x)))])
+
+
+def test_analytic_gradients_and_hmc():
+    """Channel / prior gradients match finite differences; HMC samples the posterior."""
+    inference = _inference()
+    inference.set_prior('theta', 'uniform', low=0.0, high=1.5)
+    post = inference.compile_posterior(['eta', 'g_phi', 'm_c', 'theta'])
+    x = np.array([-0.004, 0.6, 2e-3, 0.7])
+    lp, grad = post.logp_grad(x)
+    assert lp == post.logp(x)
+    assert np.allclose(grad, _fd_grad(post.logp, x), rtol=1e-4)
+
+    # joint harness: QRNG, Higgs, fifth force (steep envelope edge), cosmology
+    sys.path.insert(0, str(Path(__file__).parent.parent / "code" / "inference"))
+    import mqgt_joint_harness as harness
+    data_dir = Path(__file__).parent.parent / "data" / "processed"
+    cfg = harness.default_config(str(data_dir))
+    cfg["priors"]["alpha_ff"]["high"] = 10.0
+    f = harness.joint_log_post_grad(cfg, 50123, 49877)
+    x = np.array([2e-6, 5e-3, 2.2e-3, 1.0, -0.9, -0.3])
+    lp, grad = f(x)
+    assert np.allclose(grad, _fd_grad(lambda y: f(y)[0], x), rtol=1e-4)
+
+    run = inference.hmc_sample(n_samples=1000, n_warmup=500, seed=0,
+                               initial_params={'eta': 0.0, 'g_phi': 0.5, 'm_c': 1e-3,
+                                               'theta': 0.7})
+    eta = run['samples']['eta']
+    assert run['n_divergent'] == 0 and 0.6 < run['accept_stat'] < 1.0
+    # Gaussian posterior: prior N(0, 1e-2) x QRNG likelihood (MLE -0.012, sd 0.0063)
+    assert abs(np.mean(eta) + 0.0086) < 0.0015 and abs(np.std(eta) - 0.0054) < 0.001
+    assert np.all((run['samples']['theta'] > 0) & (run['samples']['theta'] < 1.5))
+
+
+def test_fit_laplace_and_diagnostic():
+    """Laplace fit is exact for the Gaussian QRNG posterior, flags truncation."""
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+    from mqgt_scf_inference import MQGT_SCF_Inference
+
+    inference = MQGT_SCF_Inference(MQGT_SCF_Simulator(variant='A'))
+    inference.set_prior('eta', 'normal', mean=0.0, std=1e-2)
+    inference.add_channel_data('qrng', {'N_0': 50300, 'N_1': 49700, 'E_0': 0.0, 'E_1': 1.0})
+    fit = inference.fit_laplace(seed=0)
+    assert np.isclose(fit['map']['eta'], -0.00857, atol=2e-5)
+    assert np.isclose(fit['std']['eta'], 0.00535, atol=2e-5)
+    ci = fit['intervals']['eta']
+    assert np.isclose(ci['upper'] - ci['lower'], 2 * 1.96 * fit['std']['eta'], rtol=1e-3)
+    assert not fit['diagnostic']['mcmc_needed']
+
+    # the fifth-force bound m_c >= 1e-4 cuts the log-normal prior at its mode
+    inference.set_prior('m_c', 'log_normal', mean=np.log(1e-4), std=1.0)
+    inference.add_channel_data('fifth_force', {})
+    fit = inference.fit_laplace(initial_params={'eta': 0.0, 'm_c': 2e-4}, seed=0)
+    assert fit['map']['m_c'] >= 1e-4
+    assert fit['diagnostic']['mcmc_needed']
+
+
+def test_nested_sampling_evidence():
+    """Nested-sampling log Z matches grid integration; eta = 0 vs free eta."""
+    from scipy.special import logsumexp
+    from mqgt_scf_simulation import MQGT_SCF_Simulator
+    from mqgt_scf_inference import MQGT_SCF_Inference
+    from mqgt_nested import bayes_factor
+
+    free = _inference(('qrng', 'higgs'))
+    start = {'eta': 0.0, 'g_phi': 0.5, 'theta': 1.0}
+    run = free.nested_sample(n_live=300, initial_params=dict(start, m_c=1e-3), seed=1)
+
+    # m_c has a normalised prior and no likelihood here: it integrates out to 1
+    post = free.compile_posterior(['eta', 'g_phi', 'theta'])
+    eta, g = np.meshgrid(np.linspace(-0.05, 0.05, 401), np.linspace(0, 1, 201), indexing='ij')
+    grid = np.c_[eta.ravel(), g.ravel(), np.ones(eta.size)]
+    log_Z_grid = logsumexp(post.logp_batch(grid)) + np.log(0.1 / 400 * 1.0 / 200)
+    assert abs(run['log_evidence'] - log_Z_grid) < 4 * run['log_evidence_err'] + 0.05
+    assert np.isclose(np.sum(run['weights']), 1.0)
+
+    null = MQGT_SCF_Inference(MQGT_SCF_Simulator(variant='A'))
+    null.set_prior('g_phi', 'uniform', low=0.0, high=1.0)
+    null.data, null.channels = free.data, free.channels
+    run0 = null.nested_sample(n_live=300, initial_params=start, seed=2)
+    log_B, err = bayes_factor(run, run0)
+    # QRNG deficit of 2 sigma favours free eta by about log B = 0.6
+    assert 0.6 - 4 * err - 0.1 < log_B < 0.6 + 4 * err + 0.1
+
+
+def test_channel_registry_batch_and_skipping():
+    """Registered channels are evaluated in batches, skipped when unchanged in a cache."""
+    from mqgt_channels import CHANNELS, register_channel
+
+    inference = _inference(('qrng', 'higgs', 'fifth_force', 'cosmology'))
+    p = {'eta': -0.004, 'g_phi': 0.6, 'theta': 0.3, 'm_c': 2e-3}
+    data = inference.data
+    from scipy import stats
+    p1 = 1.0 / (1.0 + np.exp(-p['eta']))
+    gamma = 4.07e-3 + p['g_phi']**2 * np.sin(p['theta'])**2 * 1e-3
+    expected = (stats.binom.logpmf(49700, 100000, p1)
+                + stats.norm.logpdf(4.07e-3, gamma, 1e-4)
+                + stats.norm.logpdf(-0.95, -1.0, 0.1))
+    assert np.isclose(inference.log_likelihood(p), expected, rtol=1e-10)
+    assert np.isclose(inference.likelihood_qrng(p['eta'], data['qrng']),
+                      stats.binom.logpmf(49700, 100000, p1), rtol=1e-10)
+    assert inference.likelihood_fifth_force(1.0, p['m_c'], data['fifth_force']) == -np.inf
+    ll, grad = inference.log_likelihood_grad(p)
+    fd = _fd_grad(lambda x: inference.log_likelihood(dict(p, eta=x[0], g_phi=x[1])),
+                  np.array([p['eta'], p['g_phi']]))
+    assert np.allclose([grad['eta'], grad['g_phi']], fd, rtol=1e-4)
+
+    calls = []
+
+    def stellar(data, m_c):
+        calls.append(len(m_c))
+        return -0.5 * ((np.log10(m_c) - data['log10_m']) / 0.5)**2
+
+    register_channel('stellar_smoke', ('m_c',), stellar, defaults={'m_c': 1e-3})
+    try:
+        inference.add_channel_data('stellar_smoke', {'log10_m': -3.0})
+        rng = np.random.default_rng(0)
+        batch = {'eta': rng.normal(0, 1e-2, 50), 'g_phi': np.full(50, 0.5),
+                 'm_c': np.full(50, 2e-3)}
+        cache = {}
+        first = inference.log_likelihood_batch(batch, cache=cache)
+        batch['eta'] = batch['eta'] + 1e-3
+        second = inference.log_likelihood_batch(batch, cache=cache)
+        batch['m_c'] = batch['m_c'].copy()
+        batch['m_c'][:4] = 5e-3
+        third = inference.log_likelihood_batch(batch, cache=cache)
+        assert calls == [50, 50]
+        assert not np.allclose(first, second)
+        assert np.allclose(third, inference.log_likelihood_batch(batch))
+        assert calls == [50, 50, 50]
+        single = [inference.log_likelihood({k: v[i] for k, v in batch.items()}) for i in range(3)]
+        assert np.allclose(inference.log_likelihood_batch(batch)[:3], single)
+
+        # every sampler falls back to the registry for the custom channel
+        start = {'eta': 0.0, 'g_phi': 0.5, 'm_c': 1e-3}
+        run = inference.ensemble_sample(n_samples=200, n_warmup=200, seed=2,
+                                        initial_params=start)
+        log_m = np.log10(run['samples']['m_c'])
+        assert abs(np.mean(log_m) + 3.0) < 0.3 and np.std(log_m) < 0.7
+        inference.nested_sample(n_live=50, walk_steps=10, dlogz=0.5, seed=0,
+                                initial_params=start)
+        post = inference.compile_posterior(list(start))
+        x = np.array([-0.004, 0.6, 2e-3])
+        lp, grad = post.logp_grad(x)
+        assert np.isclose(lp, post.logp(x))
+        assert np.allclose(grad, _fd_grad(post.logp, x), rtol=1e-4)
+        chain = inference.mcmc_sample(n_samples=300, n_warmup=100, initial_params=start,
+                                      seed=0)
+        assert chain['m_c'].shape == (300,) and np.all(chain['m_c'] > 0)
+        run = inference.hmc_sample(n_samples=200, n_warmup=200, seed=0,
+                                   initial_params=start)
+        log_m = np.log10(run['samples']['m_c'])
+        assert abs(np.mean(log_m) + 3.0) < 0.3 and run['n_divergent'] < 10
+        fit = inference.fit_laplace(initial_params=start, n_check=200, seed=0)
+        assert fit['diagnostic']['positive_definite']
+        assert abs(np.log10(fit['map']['m_c']) + 3.0) < 0.3
+    finally:
+        CHANNELS.pop('stellar_smoke')
+
+
+def test_compiled_densities_match_registry():
+    """The numba channel kernels agree with the numpy registry at random points."""
+    inference = _inference(('qrng', 'higgs', 'fifth_force', 'cosmology'))
+    inference.set_prior('theta', 'uniform', low=0.0, high=1.5)
+    inference.set_prior('alpha', 'uniform', low=0.0, high=1e-9)
+    names = ['eta', 'g_phi', 'theta', 'alpha', 'm_c']
+    rng = np.random.default_rng(7)
+    n = 500
+    X = np.column_stack([rng.normal(0.0, 1e-2, n), rng.random(n), 1.5 * rng.random(n),
+                         10**rng.uniform(-12, -9, n), 10**rng.uniform(-5, -2, n)])
+    for channels in (['qrng'], ['higgs'], ['fifth_force'], ['cosmology'],
+                     ['qrng', 'higgs', 'fifth_force', 'cosmology']):
+        inference.channels = channels
+        post = inference.compile_posterior(names)
+        registry = inference.log_likelihood_batch(post.to_dict(X))
+        assert np.allclose(post.log_likelihood_batch(X), registry, rtol=1e-10, atol=1e-10)
+        assert np.allclose(post.logp_batch(X), inference.log_posterior_batch(post.to_dict(X)),
+                           rtol=1e-10, atol=1e-10)
+        for x in X[:20]:
+            assert np.isclose(post.log_likelihood(x), inference.log_likelihood(post.to_dict(x)),
+                              rtol=1e-10, atol=1e-10)
+            ll, grad = inference.log_likelihood_grad(post.to_dict(x))
+            if not np.isfinite(ll):
+                continue
+            _, g_post = post.logp_grad(x)
+            g_prior = np.zeros_like(x)
+            g_prior[0] = -x[0] / 1e-2**2
+            g_prior[4] = -((np.log(x[4]) - np.log(1e-3)) + 1.0) / x[4]
+            assert np.allclose(g_post - g_prior, post.to_vector(grad), rtol=1e-8, atol=1e-8)
+
+
+def test_posterior_cache_reuse_and_extension(tmp_path):
+    """Cached chains are reused, truncated and extended instead of rerun."""
+    sys.path.insert(0, str(Path(__file__).parent.parent / "code" / "inference"))
+    import pytest
+    from mqgt_posterior_cache import PosteriorCache
+
+    cache = PosteriorCache(tmp_path / "cache")
+    inference = _inference()
+    start = {'eta': -0.01, 'g_phi': 0.5}
+    first = inference.mcmc_sample(n_samples=2000, n_warmup=500, seed=3,
+                                  initial_params=start, cache=cache)
+    assert len(list((tmp_path / "cache").glob("*/*.npz"))) == 1
+
+    again = inference.mcmc_sample(n_samples=2000, n_warmup=500, seed=3,
+                                  initial_params=start, cache=cache)
+    short = inference.mcmc_sample(n_samples=500, n_warmup=500, seed=3,
+                                  initial_params=start, cache=cache)
+    longer = inference.mcmc_sample(n_samples=3000, n_warmup=500, seed=3,
+                                   initial_params=start, cache=cache)
+    for name in first:
+        assert np.array_equal(again[name], first[name])
+        assert np.array_equal(short[name], first[name][:500])
+        assert np.array_equal(longer[name][:2000], first[name])
+        assert len(longer[name]) == 3000
+    assert not np.array_equal(longer['eta'][2000:], first['eta'][:1000])
+
+    # new data or priors give a new entry
+    inference.add_channel_data('qrng', {'N_0': 50000, 'N_1': 50000, 'E_0': 0.0, 'E_1': 1.0})
+    inference.mcmc_sample(n_samples=100, n_warmup=10, seed=3,
+                          initial_params=start, cache=cache)
+    assert len(list((tmp_path / "cache").glob("*/*.npz"))) == 2
+    with pytest.raises(ValueError):
+        inference.mcmc_sample(n_samples=100, initial_params=start, cache=cache)
+
+
+def test_reweight_to_new_data_and_priors():
+    """Stored draws are reweighted to new counts / priors; a collapsed ESS reruns."""
+    inference = _inference()
+    start = {'eta': -0.01, 'g_phi': 0.5}
+    samples = inference.mcmc_sample(n_samples=20000, n_warmup=1000, seed=5,
+                                    initial_params=start)
+
+    # new QRNG session: Gaussian posterior with mean -0.0029, sd 0.0053
+    new = {'qrng': {'N_0': 50100, 'N_1': 49900, 'E_0': 0.0, 'E_1': 1.0}}
+    run = inference.reweight(samples, data=new)
+    assert not run['rerun'] and run['ess_fraction'] > 0.3
+    assert np.isclose(run['weights'].sum(), 1.0)
+    assert abs(run['mean']['eta'] + 0.0029) < 0.001 and abs(run['std']['eta'] - 0.0053) < 0.001
+    assert inference.data['qrng']['N_1'] == 49700
+
+    # narrower g_phi prior: excluded draws get zero weight
+    run = inference.reweight(samples, priors={'g_phi': {'type': 'uniform', 'low': 0.0,
+                                                        'high': 0.5}})
+    assert np.all(run['weights'][samples['g_phi'] > 0.5] == 0)
+    assert run['mean']['g_phi'] < 0.5
+
+    # a strongly shifted session leaves a few effective draws: resample instead
+    far = {'qrng': {'N_0': 52000, 'N_1': 48000, 'E_0': 0.0, 'E_1': 1.0}}
+    run = inference.reweight(samples, data=far, seed=1, n_warmup=1000)
+    assert run['rerun'] and run['ess_fraction'] < 0.1
+    assert abs(run['mean']['eta'] + 0.057) < 0.005
+
+    # multi-chain draws (chains, n) are flattened; a custom channel reruns via the registry
+    from mqgt_channels import CHANNELS, register_channel
+    chains = inference.mcmc_chains(n_chains=4, n_warmup=500, block=1000, max_samples=3000,
+                                   target_ess=400, max_rhat=1.05, initial_params=start,
+                                   seed=2)
+    run = inference.reweight(chains['samples'], data=new)
+    assert run['weights'].shape == (chains['samples']['eta'].size,)
+    assert run['samples']['eta'].shape == run['weights'].shape
+    assert abs(run['mean']['eta'] + 0.0029) < 0.002
+
+    def eta_bound(data, eta):
+        return -0.5 * ((eta - data['eta']) / 1e-3)**2
+
+    register_channel('eta_bound_smoke', ('eta',), eta_bound, defaults={'eta': 0.0})
+    try:
+        run = inference.reweight(chains['samples'], data={'eta_bound_smoke': {'eta': 0.02}},
+                                 seed=1, n_warmup=500)
+        assert run['rerun'] and run['samples']['eta'].shape == run['weights'].shape
+        assert abs(run['mean']['eta'] - 0.02) < 0.002
+    finally:
+        CHANNELS.pop('eta_bound_smoke')